@@ -1,8 +1,48 @@
-from flask import Flask, url_for, request
-from flask import render_template
-from board import Board
-from solver import solve
+from flask import Flask, abort, url_for, request
+from flask import Response, jsonify, make_response, render_template
+from flask import stream_with_context
+from board import BOARD_CLASSES
+import bulk
+from cache import PageCache, SolutionCache
+import canonical
+import dispatch
+import hashlib
+import hints
+import itertools
+import json
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+import Queue
+import solver
+from solver import DEFAULT_ENGINE
 import string
+import threading
+
+# Error codes in JSON API results, by error message from solve
+API_ERROR_CODES = {
+    solver.DUPLICATE_VALUES: 'duplicate_values',
+    solver.NO_SOLUTION: 'no_solution',
+    solver.MULTIPLE_SOLUTIONS: 'multiple_solutions',
+    solver.TOO_HARD: 'search_limit',
+    solver.TIMED_OUT: 'search_limit',
+    dispatch.BUSY: 'busy',
+}
+# Error code for items that aren't valid puzzle strings
+INVALID_PUZZLE = 'invalid_puzzle'
+# Error code for NDJSON lines that aren't valid JSON
+INVALID_JSON = 'invalid_json'
+# Part of every page ETag. Change it when grid.html changes, so that
+#   browsers and caches fetch pages again rather than revalidate them.
+PAGE_VERSION = 1
+
+# Request argument names of the grid page's cells, "00" to "88", in order
+CELL_ARGS = tuple(str(row) + str(col) for row in xrange(9) for col in xrange(9))
+# Puzzle string character for each valid cell argument value
+_CELL_VALUES = dict((digit, digit) for digit in string.digits)
+_CELL_VALUES[""] = "0"
+# Board classes other than 9x9, by the length of their puzzle strings
+LARGE_BOARDS = dict((cls.geometry.cells, cls) for size, cls in BOARD_CLASSES.items()
+                    if size != 9)
 
 def build_puzzle_string(request_args):
     """Returns a tuple of (puzzle_string, error_message).
@@ -16,41 +56,192 @@ def build_puzzle_string(request_args):
     This function does not consider whether the resulting puzzle string
         is valid or has only a single solution.
     """
-    board_letters = []
-    digits = set(string.digits)
+    get = request_args.get
+    board_letters = [_CELL_VALUES.get(get(name, ""), None) for name in CELL_ARGS]
     error = ""
-    for row in xrange(9):
-        for col in xrange(9):
-            cell = request_args.get(str(row) + str(col), '')
-            if cell == "" or cell == "0":
-                board_letters.append("0")
-            elif cell not in digits: # '0' is in digits, so check that first
-                error = cell + " is not a number in the range 0-9. "
-                board_letters.append("0")
-            else:
-                board_letters.append(cell)
+    if None in board_letters:
+        for i, letter in enumerate(board_letters):
+            if letter is None:
+                error = get(CELL_ARGS[i]) + " is not a number in the range 0-9. "
+                board_letters[i] = "0"
     return ("".join(board_letters), error)
 
+def normalize_puzzle_string(puzz_string):
+    """Returns a tuple of (puzzle_string, error_message).
+
+    A puzzle string of up to 81 digits is padded with trailing zeroes to
+        81 digits. Strings for larger boards, such as 256 characters for
+        16x16, must be complete, and are upper-cased.
+    The second element in the tuple is an error message if the string is
+        too long or has invalid characters, or an empty string otherwise.
+
+    This function does not consider whether the resulting puzzle string
+        is valid or has only a single solution.
+    """
+    cls = LARGE_BOARDS.get(len(puzz_string))
+    if cls is not None:
+        if (set(puzz_string.upper()) - set(cls.geometry.chars)) != set():
+            return (puzz_string, "That string contains characters other than " +
+                    cls.geometry.chars + ". ")
+        return (str(puzz_string.upper()), "")
+    if len(puzz_string) > 81:
+        return (puzz_string, "Puzzle strings must contain no more than 81 characters. ")
+    try:
+        digits = str(puzz_string)
+    except UnicodeError:
+        digits = None
+    if digits is None or digits.translate(None, string.digits):
+        return (puzz_string, "That string contains non-numeric characters. ")
+    puzz_string = digits
+    # Pad short string with trailing zeroes
+    return (puzz_string + "0" * (81 - len(puzz_string)), "")
+
 app = Flask(__name__)
+# Default settings, which a Python file named by the SUDOKU_SETTINGS
+#   environment variable can override for each deployment.
+# SOLVER_ENGINE is the name of a search engine in solver.ENGINES, and
+#   SOLVER_TIE_BREAK how its search chooses between equally constrained
+#   cells, one of propagation.TIE_BREAKS.
+# SOLVER_MAX_NODES and SOLVER_TIMEOUT limit the search for each puzzle
+#   to a number of search nodes and a number of seconds (None for no limit).
+# SOLVER_STATS turns on the search totals served at /stats.
+# API_MAX_WORKERS caps the puzzles one /api/solve request can have on
+#   the dispatcher's pool at once.
+# SOLVER_WORKERS is the number of processes in a pool shared by every
+#   request that solves one puzzle at a time (0 solves in the request
+#   thread), and SOLVER_QUEUE_SIZE the number of distinct puzzles that
+#   may wait for or be in the pool before requests get status 503.
+# SOLUTION_CACHE_SIZE is the number of results kept in memory (0 turns
+#   the cache off), SOLUTION_CACHE_TTL is the number of seconds they stay
+#   valid (None for no limit), and SOLUTION_CACHE_PATH names an SQLite
+#   file that keeps them across restarts (None for memory only).
+# PAGE_MAX_AGE is the number of seconds browsers and shared caches may
+#   reuse a puzzle page for before checking its ETag again, and
+#   PAGE_CACHE_SIZE the number of rendered pages kept (0 turns it off).
+# HINT_SESSIONS is the number of /api/hint sessions kept, and
+#   HINT_SESSION_TTL the number of seconds an unused one is kept.
+app.config.from_mapping(
+    SOLVER_ENGINE=DEFAULT_ENGINE,
+    SOLVER_TIE_BREAK='any',
+    SOLVER_MAX_NODES=None,
+    SOLVER_TIMEOUT=5.0,
+    SOLVER_STATS=True,
+    API_MAX_WORKERS=multiprocessing.cpu_count(),
+    SOLVER_WORKERS=0,
+    SOLVER_QUEUE_SIZE=64,
+    SOLUTION_CACHE_SIZE=1024,
+    SOLUTION_CACHE_TTL=None,
+    SOLUTION_CACHE_PATH=None,
+    PAGE_MAX_AGE=86400,
+    PAGE_CACHE_SIZE=256,
+    HINT_SESSIONS=1000,
+    HINT_SESSION_TTL=3600,
+)
+app.config.from_envvar('SUDOKU_SETTINGS', silent=True)
+solution_cache = SolutionCache(app.config['SOLUTION_CACHE_SIZE'],
+                               app.config['SOLUTION_CACHE_TTL'],
+                               app.config['SOLUTION_CACHE_PATH'])
+# Rendered puzzle pages by ETag
+page_cache = PageCache(app.config['PAGE_CACHE_SIZE'])
+# Pool for solves outside the request threads, or None to solve in them
+dispatcher = None
+if app.config['SOLVER_WORKERS']:
+    dispatcher = dispatch.Dispatcher(app.config['SOLVER_WORKERS'],
+                                     app.config['SOLVER_QUEUE_SIZE'],
+                                     app.config['SOLVER_ENGINE'],
+                                     app.config['SOLVER_TIE_BREAK'])
+hint_sessions = hints.SessionStore(app.config['HINT_SESSIONS'],
+                                   app.config['HINT_SESSION_TTL'])
+
+# Threads that wait on the dispatcher for /api/solve requests with
+#   workers above 1, started on first use
+_api_threads = None
+_api_threads_lock = threading.Lock()
+
+# Search stats added up over every solve in this process. Solves in
+#   dispatcher worker processes are not counted.
+solver_totals = solver.SolveStats()
+_totals_lock = threading.Lock()
+
+def record_solve_stats(stats):
+    """Adds one search's SolveStats to solver_totals."""
+    with _totals_lock:
+        solver_totals.add(stats)
+
+if app.config['SOLVER_STATS']:
+    solver.add_stats_hook(record_solve_stats)
+
+def search_limits():
+    """Returns the (max_nodes, timeout) search limits for each puzzle."""
+    return (app.config['SOLVER_MAX_NODES'], app.config['SOLVER_TIMEOUT'])
+
+def solve_puzzle_string(puzzle_string):
+    """Returns a tuple of (solution_string, error_message) for a puzzle.
+
+    puzzle_string must be an 81-character string of digits, or a complete
+        string for a larger board from normalize_puzzle_string.
+    One of the two elements is None: the solution string if the puzzle
+        has exactly one solution, or otherwise the error message from solve.
+    Results are kept in solution_cache under the puzzle's canonical form,
+        so popular puzzles, and every puzzle equivalent to one by symmetry,
+        are solved once. Larger boards are cached as they are.
+    A search that runs past the SOLVER_MAX_NODES or SOLVER_TIMEOUT limits
+        gives the solver.TOO_HARD or solver.TIMED_OUT error, which is not
+        cached, since it may succeed under other limits or load.
+    With SOLVER_WORKERS set, the solve runs on the dispatcher's pool, and
+        this raises dispatch.Busy if the pool's queue is full.
+    """
+    if len(puzzle_string) == 81:
+        canonical_string, transform = canonical.canonicalize(puzzle_string)
+    else:
+        canonical_string, transform = puzzle_string, None
+    result = solution_cache.get(canonical_string)
+    if result is None and dispatcher is not None:
+        result = dispatcher.solve(canonical_string, search_limits())
+        if result[1] in (solver.TOO_HARD, solver.TIMED_OUT):
+            return result
+        solution_cache.put(canonical_string, result)
+    elif result is None:
+        budget = solver.SearchBudget(*search_limits())
+        try:
+            solved = solver.solve_string(canonical_string,
+                                         app.config['SOLVER_ENGINE'], budget,
+                                         tie_break=app.config['SOLVER_TIE_BREAK'])
+            result = (solved.to_puzzle_string(), None)
+        except ValueError as e:
+            result = (None, str(e))
+        except solver.SearchLimitExceeded as e:
+            return None, str(e)
+        solution_cache.put(canonical_string, result)
+    solution, error = result
+    if solution is not None and transform is not None:
+        solution = canonical.invert(transform, solution)
+    return solution, error
+
+@app.errorhandler(dispatch.Busy)
+def busy(e):
+    """Answers a request that found the dispatcher's queue full."""
+    if request.path.startswith('/api/'):
+        return jsonify(error=str(e), code=API_ERROR_CODES[dispatch.BUSY]), 503
+    return render_template('grid.html', error=str(e)), 503
+
 @app.route('/')
 def index():
     if not request.args:
         print "Didn't find a request."
         return render_template('grid.html')
-    digits = set(string.digits)
     BASE_ERROR = "<br>Please change the numbers and try again."
     error = '' # Error message to output on page, if there is one
     puzz_string = ""
     if 'puzzle' in request.args:
-        puzz_string = request.args.get('puzzle')
-        if len(puzz_string) > 81:
-            error = "Puzzle strings must contain no more than 81 characters. " + BASE_ERROR
-        elif (set(puzz_string) - digits) != set():
-            error = "That string contains non-numeric characters. " + BASE_ERROR
-        elif len(puzz_string) < 81:
-            # Pad short string with trailing zeroes
-            puzz_string += "0" * (81 - len(puzz_string))
-        board_array = Board.string_to_array(puzz_string)
+        puzz_string, error = normalize_puzzle_string(request.args.get('puzzle'))
+        if error:
+            error += BASE_ERROR
+        elif len(puzz_string) != 81:
+            # The grid page only has 9x9 cells
+            error = ("This page can only show 9x9 puzzles. "
+                     "Larger puzzles can be solved through /api/solve.")
+            puzz_string = ""
     else:
         # Handle cell-by-cell arguments
         # If request.args has non-puzzle items, but not 81 of them, it seems
@@ -59,14 +250,287 @@ def index():
         puzz_string, error = build_puzzle_string(request.args)
         if error:
             error += BASE_ERROR
-        # Create the rest of the board even if some of it was invalid
-        board_array = Board.string_to_array(puzz_string)
+    # The page depends only on the puzzle string and any error so far, so
+    #   a repeat view is answered from its ETag or the page cache
+    etag = page_etag(puzz_string, error)
+    if request.if_none_match.contains(etag):
+        return _cacheable(Response(status=304), etag)
+    page = page_cache.get(etag)
+    if page is not None:
+        return _cacheable(make_response(page), etag)
+    cacheable = True
     if not error:
-        b = Board(board_array)
+        solved, solve_error = solve_puzzle_string(puzz_string)
+        if solve_error:
+            error = solve_error + " " + BASE_ERROR
+            # Search limits may be met another time
+            cacheable = solve_error not in (solver.TOO_HARD, solver.TIMED_OUT)
+    if error: # Different from the above check because solve() might raise an error
+        page = render_template('grid.html', puzzle_string=puzz_string, error=error)
+    else:
+        page = render_template('grid.html', puzzle_string=solved, solved=True)
+    if not cacheable:
+        response = make_response(page)
+        response.cache_control.no_store = True
+        return response
+    page_cache.put(etag, page)
+    return _cacheable(make_response(page), etag)
+
+def page_etag(puzzle_string, error):
+    """Returns the ETag of the puzzle page for a normalized puzzle string.
+
+    error is the error message found while reading the request, if any,
+        since the page shows it.
+    """
+    key = u"\0".join([unicode(PAGE_VERSION), puzzle_string, error])
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+def _cacheable(response, etag):
+    """Adds the ETag and Cache-Control headers of a puzzle page to response."""
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = app.config['PAGE_MAX_AGE']
+    return response
+
+def _api_line(index, puzzle, solution, error, code=None):
+    """Returns one NDJSON result line for /api/solve.
+
+    If code is None, the error code is looked up from the error message.
+    """
+    result = {'index': index, 'puzzle': puzzle}
+    if error is None:
+        result.update(status='solved', solution=solution)
+    else:
+        if code is None:
+            code = API_ERROR_CODES.get(error, INVALID_PUZZLE)
+        result.update(status='error', error=error.strip(), code=code)
+    return json.dumps(result, sort_keys=True) + "\n"
+
+def _solve_or_busy(puzzle):
+    """Returns solve_puzzle_string(puzzle), or the busy error if the pool is full.
+
+    This is for streamed responses, whose status has already been sent.
+    """
+    try:
+        return solve_puzzle_string(puzzle)
+    except dispatch.Busy as e:
+        return None, str(e)
+
+def _get_api_threads():
+    global _api_threads
+    with _api_threads_lock:
+        if _api_threads is None:
+            _api_threads = ThreadPool(app.config['API_MAX_WORKERS'])
+        return _api_threads
+
+def _solve_into(done, index, puzzle):
+    """Puts the BulkResult for one puzzle, or the exception raised, on done."""
+    try:
+        done.put(bulk.BulkResult(index, puzzle, *_solve_or_busy(puzzle)))
+    except Exception as e:
+        done.put(e)
+
+def _solve_concurrently(puzzles, workers):
+    """Yields a BulkResult for each (index, puzzle) pair as its solve finishes.
+
+    Up to workers puzzles are solved at once, each by solve_puzzle_string
+        on a shared thread that waits on the dispatcher, so the solution
+        cache, the dispatcher's queue bound, and its merging all apply.
+    """
+    threads = _get_api_threads()
+    done = Queue.Queue()
+    pending = 0
+    for index, puzzle in puzzles:
+        if pending >= workers:
+            result = done.get()
+            pending -= 1
+            if isinstance(result, Exception):
+                raise result
+            yield result
+        threads.apply_async(_solve_into, [done, index, puzzle])
+        pending += 1
+    while pending:
+        result = done.get()
+        pending -= 1
+        if isinstance(result, Exception):
+            raise result
+        yield result
+
+class _BadLine(object):
+    """Stands in for an NDJSON line that could not be decoded."""
+
+    def __init__(self, line):
+        self.line = line
+
+def _api_items():
+    """Yields (index, item) for each item in an /api/solve request body.
+
+    The body is either a JSON array, or NDJSON with one JSON value per
+        line, which is read as a stream. Lines that aren't valid JSON
+        are yielded as _BadLine items.
+
+    Raises:
+        ValueError: The body is a JSON document but not a JSON array.
+    """
+    if request.mimetype == 'application/json':
+        items = json.loads(request.get_data(as_text=True))
+        if not isinstance(items, list):
+            raise ValueError("Request body must be a JSON array of puzzle strings.")
+        for index, item in enumerate(items):
+            yield index, item
+        return
+    index = 0
+    for line in request.stream:
+        if line.strip():
+            try:
+                item = json.loads(line)
+            except ValueError:
+                item = _BadLine(line.strip().decode('utf-8', 'replace'))
+            yield index, item
+            index += 1
+
+@app.route('/api/solve', methods=['POST'])
+def api_solve():
+    """Solves a batch of puzzle strings, streaming NDJSON results.
+
+    The request body is a JSON array (with Content-Type application/json)
+        or NDJSON stream of puzzle strings.
+    Each result is a JSON object on its own line, with the item's index,
+        puzzle, and status, and either its solution or an error message
+        and code. Codes are the values of API_ERROR_CODES, or INVALID_PUZZLE.
+
+    With the workers query parameter above 1 and SOLVER_WORKERS set, up
+        to that many puzzles (at most API_MAX_WORKERS) are solved on the
+        dispatcher's pool at once, and results stream back as each one
+        finishes, rather than in order. Without a dispatcher, puzzles are
+        solved one at a time in the request thread.
+    """
+    workers = min(request.args.get('workers', 1, type=int),
+                  app.config['API_MAX_WORKERS'])
+    items = _api_items()
+    # Read one item now so that a malformed body fails before streaming
+    try:
+        first = [next(items)]
+    except StopIteration:
+        first = []
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+    def results():
+        invalid = []
+        def puzzles():
+            for index, item in itertools.chain(first, items):
+                code = INVALID_PUZZLE
+                if isinstance(item, _BadLine):
+                    puzzle, error = item.line, "Lines must be valid JSON."
+                    code = INVALID_JSON
+                elif isinstance(item, basestring):
+                    puzzle, error = normalize_puzzle_string(item)
+                else:
+                    puzzle, error = item, "Puzzles must be strings."
+                if error:
+                    invalid.append(_api_line(index, puzzle, None, error, code))
+                else:
+                    yield index, puzzle
+        if workers > 1 and dispatcher is not None:
+            solved = _solve_concurrently(puzzles(), workers)
+        else:
+            solved = (bulk.BulkResult(index, puzzle, *_solve_or_busy(puzzle))
+                      for index, puzzle in puzzles())
+        for result in solved:
+            while invalid:
+                yield invalid.pop(0)
+            yield _api_line(*result)
+        while invalid:
+            yield invalid.pop(0)
+
+    return Response(stream_with_context(results()), mimetype='application/x-ndjson')
+
+def _hint_state(hint_session, **fields):
+    """Returns a JSON response with a hint session's board and fields."""
+    return jsonify(board=hint_session.board.to_puzzle_string(),
+                   solved=hint_session.solved(), **fields)
+
+def _hint_session(session_id):
+    """Returns the hint session with session_id, or aborts with 404."""
+    session = hint_sessions.get(session_id)
+    if session is None:
+        abort(404)
+    return session
+
+@app.route('/api/hint', methods=['POST'])
+def api_hint_start():
+    """Starts a hint session for the JSON body's "puzzle" string.
+
+    The puzzle must have exactly one solution. The response has the
+        session's id, which names it in the other /api/hint URLs, and its
+        board. Errors give status 400 with an error message and code.
+    """
+    body = request.get_json(silent=True)
+    puzzle = body.get('puzzle') if isinstance(body, dict) else None
+    if not isinstance(puzzle, basestring):
+        return jsonify(error="Request body must be a JSON object with a "
+                             "puzzle string.", code=INVALID_PUZZLE), 400
+    puzzle, error = normalize_puzzle_string(puzzle)
+    if error:
+        return jsonify(error=error.strip(), code=INVALID_PUZZLE), 400
+    solution, error = solve_puzzle_string(puzzle)
+    if error:
+        return jsonify(error=error, code=API_ERROR_CODES.get(error)), 400
+    session = hints.HintSession(puzzle, solution)
+    return _hint_state(session, session=hint_sessions.add(session))
+
+@app.route('/api/hint/<session_id>/place', methods=['POST'])
+def api_hint_place(session_id):
+    """Places a number in a hint session's board.
+
+    The JSON body has the row and col (counting from 0) and the number,
+        which is 0 to empty the cell again. The response says whether the
+        number is correct, without giving the right one.
+    """
+    session = _hint_session(session_id)
+    body = request.get_json(silent=True)
+    try:
+        row, col, number = [int(body[key]) for key in ('row', 'col', 'number')]
+    except (KeyError, TypeError, ValueError):
+        return jsonify(error="Request body must be a JSON object with row, "
+                             "col, and number."), 400
+    with session.lock:
         try:
-            solved = solve(b)
+            correct = session.place(row, col, number)
         except ValueError as e:
-            error = str(e) + " " + BASE_ERROR
-    if error: # Different from the above check because solve() might raise an error
-        return render_template('grid.html', puzzle_string=puzz_string, error=error)
-    return render_template('grid.html', puzzle_string=solved.to_puzzle_string(), solved=True)
\ No newline at end of file
+            return jsonify(error=str(e)), 400
+        return _hint_state(session, correct=correct)
+
+@app.route('/api/hint/<session_id>/next', methods=['POST'])
+def api_hint_next(session_id):
+    """Makes the next deduction in a hint session and returns it.
+
+    The hint has the technique used, the unit it was found in, and the
+        placements or eliminations it made, which are kept in the session.
+        If numbers placed by hand leave no solution, the status is 409 and
+        the response lists the cells with wrong numbers.
+    """
+    session = _hint_session(session_id)
+    with session.lock:
+        try:
+            hint = session.next_hint()
+        except ValueError as e:
+            return jsonify(error=str(e), wrong=session.wrong_cells()), 409
+        return _hint_state(session, hint=hint and hint._asdict())
+
+@app.route('/api/hint/<session_id>', methods=['DELETE'])
+def api_hint_end(session_id):
+    """Ends a hint session."""
+    if not hint_sessions.remove(session_id):
+        abort(404)
+    return '', 204
+
+@app.route('/stats')
+def stats():
+    """Returns the app's counters as JSON."""
+    with _totals_lock:
+        totals = solver_totals.as_dict()
+    return jsonify(solution_cache=solution_cache.stats(),
+                   page_cache=page_cache.stats(), solver=totals,
+                   dispatcher=dispatcher and dispatcher.stats())
\ No newline at end of file
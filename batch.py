@@ -0,0 +1,152 @@
+"""Vectorized solving for large batches of puzzle strings.
+
+Puzzles are loaded into an (N, 81) array of cell values, and candidate
+masks, duplicate checks, and naked and hidden singles are computed for
+the whole batch at once with NumPy. Singles are forced moves, so a
+puzzle they fill in completely has exactly one solution. Only the
+puzzles that singles can't finish are passed to solver.solve one at a
+time.
+"""
+from collections import namedtuple
+import numpy as np
+from board import Board, ALL_DIGITS, BOARD_SIZE, CELL_UNITS, MASK_DIGITS, UNITS
+import solver
+
+# The result of solving one puzzle string in a batch. solution is the
+#   solved puzzle string, or None if the puzzle could not be solved, in
+#   which case error has the ValueError message solver.solve would raise.
+BatchResult = namedtuple('BatchResult', 'solution error')
+
+# Number of puzzles propagated together by iter_solve
+CHUNK_SIZE = 10000
+
+_UNITS = np.array(UNITS)
+_CELL_UNITS = np.array(CELL_UNITS)
+_DIGITS = np.arange(1, BOARD_SIZE + 1, dtype=np.uint16)
+# Bits set in each digit mask, and the only digit of each one-digit mask
+_POPCOUNT = np.array([len(digits) for digits in MASK_DIGITS], dtype=np.uint8)
+_FIRST_DIGIT = np.array([digits[0] if digits else 0 for digits in MASK_DIGITS],
+                        dtype=np.uint8)
+
+# Propagation results for each puzzle
+_OPEN = 0
+_SOLVED = 1
+_FAILED = 2
+
+def solve_many(puzzle_strings, engine=None):
+    """Solves each puzzle string, as solver.solve would.
+
+    Args:
+        puzzle_strings: An iterable of 81-character puzzle strings.
+        engine: The name of the solver engine for the puzzles that need
+            a search, or None for solver.DEFAULT_ENGINE.
+
+    Returns:
+        A list with a BatchResult for each puzzle string, in order.
+    """
+    return list(iter_solve(puzzle_strings, engine))
+
+def iter_solve(puzzle_strings, engine=None, chunk_size=CHUNK_SIZE):
+    """Yields a BatchResult for each puzzle string, in order.
+
+    Puzzles are read and solved chunk_size at a time, so the input can
+    be a stream too large to hold in memory.
+    """
+    chunk = []
+    for puzzle in puzzle_strings:
+        chunk.append(puzzle)
+        if len(chunk) >= chunk_size:
+            for result in _solve_chunk(chunk, engine):
+                yield result
+            chunk = []
+    for result in _solve_chunk(chunk, engine):
+        yield result
+
+def _solve_chunk(puzzle_strings, engine):
+    """Returns a list of BatchResults for a list of puzzle strings."""
+    results = [None] * len(puzzle_strings)
+    rows = []
+    cells = []
+    for i, puzzle in enumerate(puzzle_strings):
+        try:
+            cells.append(Board.string_to_cells(puzzle))
+        except ValueError as e:
+            results[i] = BatchResult(None, str(e))
+            continue
+        rows.append(i)
+    if not rows:
+        return results
+    grid = np.frombuffer(bytearray().join(cells), dtype=np.uint8)
+    grid = grid.reshape(len(rows), BOARD_SIZE * BOARD_SIZE).copy()
+    duplicates = _has_duplicates(grid)
+    status = np.full(len(rows), _FAILED, dtype=np.uint8)
+    status[~duplicates] = _propagate(grid, np.flatnonzero(~duplicates))
+    for row, i in enumerate(rows):
+        if duplicates[row]:
+            results[i] = BatchResult(None, solver.DUPLICATE_VALUES)
+        elif status[row] == _FAILED:
+            results[i] = BatchResult(None, solver.NO_SOLUTION)
+        else:
+            puzzle = (grid[row] + ord("0")).tostring()
+            if status[row] == _SOLVED:
+                results[i] = BatchResult(puzzle, None)
+                continue
+            # Singles got stuck, so search from where they left off
+            try:
+                solved = solver.solve(Board.from_string(puzzle), engine)
+                results[i] = BatchResult(solved.to_puzzle_string(), None)
+            except ValueError as e:
+                results[i] = BatchResult(None, str(e))
+    return results
+
+def _digit_counts(grid):
+    """Returns an (N, 27, 9) array of how often each digit is in each unit."""
+    return (grid[:, _UNITS, None] == _DIGITS).sum(axis=2)
+
+def _has_duplicates(grid):
+    """Returns a boolean array of the puzzles that repeat a digit in a unit."""
+    return (_digit_counts(grid) > 1).any(axis=(1, 2))
+
+def _propagate(grid, active):
+    """Fills in naked and hidden singles for the puzzles in rows active of grid.
+
+    Every round places all the singles found in each puzzle at once.
+    Forced moves that conflict show up in the next round as duplicates
+    or as cells with no candidates.
+
+    Returns:
+        An array with the _OPEN, _SOLVED, or _FAILED status of each row
+        in active.
+    """
+    status = np.full(len(active), _OPEN, dtype=np.uint8)
+    # Positions in status of the puzzles still making progress
+    positions = np.arange(len(active))
+    while positions.size:
+        puzzles = grid[active[positions]]
+        counts = _digit_counts(puzzles)
+        failed = (counts > 1).any(axis=(1, 2))
+        bits = np.where(puzzles, np.left_shift(1, puzzles.astype(np.uint16)), 0)
+        used = np.bitwise_or.reduce(bits[:, _UNITS], axis=2)
+        empty = puzzles == 0
+        candidates = ALL_DIGITS & ~np.bitwise_or.reduce(used[:, _CELL_UNITS], axis=2)
+        candidates = np.where(empty, candidates, 0)
+        failed |= (empty & (candidates == 0)).any(axis=1)
+        # places[p, u, i, d] is set if digit d + 1 can go in cell i of unit u
+        places = ((candidates[:, :, None] >> _DIGITS) & 1).astype(np.uint8)[:, _UNITS]
+        place_counts = places.sum(axis=2)
+        # Some digit that isn't in a unit has nowhere left to go in it
+        failed |= ((place_counts == 0) & (counts == 0)).any(axis=(1, 2))
+        solved = ~empty.any(axis=1) & ~failed
+
+        moves = np.zeros_like(puzzles)
+        naked = empty & (_POPCOUNT[candidates] == 1)
+        moves[naked] = _FIRST_DIGIT[candidates[naked]]
+        puzzle, unit, digit = np.nonzero(place_counts == 1)
+        spot = places[puzzle, unit, :, digit].argmax(axis=1)
+        moves[puzzle, _UNITS[unit, spot]] = digit + 1
+        grid[active[positions]] = np.where(moves, moves, puzzles)
+
+        status[positions[failed]] = _FAILED
+        status[positions[solved]] = _SOLVED
+        positions = positions[moves.any(axis=1) & ~failed]
+    return status
@@ -0,0 +1,26 @@
+"""Benchmarks for the Sudoku solver.
+
+Run each benchmark from the repository root as a module, for example:
+    python -m bench.allocations
+
+bench.suite times the solver on the puzzle corpora in bench/corpora and
+compares the results with a saved baseline:
+    python -m bench.suite --output baseline.json
+    python -m bench.suite --baseline baseline.json
+
+bench.serving measures requests per second through the app, with the
+solver's results already cached.
+
+bench.branching compares search node counts and times for each way of
+choosing the cell to branch on.
+"""
+
+# Puzzle strings for the boards used in tests/test_solver.py, from easy
+#   to the "World's Hardest Sudoku".
+SAMPLE_PUZZLES = [
+    ("easy", "000090052010000304002315009008746030070901020090253700400538200203000060150060000"),
+    ("medium", "406000000000900801800075020005060008260090034900020700010250007609003000000000103"),
+    ("hard", "890034000000008200400200009030000025007060400510000060100003004009700000000610072"),
+    ("expert", "060020000002000005000035800500074006000000098039500010050060000000007040048000200"),
+    ("hardest", "100007090030020008009600500005300900010080002600004000300000010040000007007000300"),
+]
@@ -0,0 +1,127 @@
+"""Compares allocations of the in-place solver with copy-per-branch search.
+
+Before the search kept an undo trail, fill_board and count_solutions
+called copy.deepcopy on the board for every branch they tried. This
+benchmark replays that strategy, counts its copies and the container
+objects each one allocates, and times it against the in-place solver.
+
+Usage:
+    python -m bench.allocations
+"""
+import copy
+import gc
+import sys
+import time
+
+from board import Board
+from bench import SAMPLE_PUZZLES
+import solver
+
+def _find_empty_spots(board):
+    return [divmod(index, 9) for index, number in enumerate(board.cells)
+            if not number]
+
+def _fill_simple(board):
+    """Fills every spot that has only one possible move, as the old solver did."""
+    while True:
+        set_value = False
+        for row, col in _find_empty_spots(board):
+            remaining = board.valid_moves(row, col)
+            if not remaining:
+                return None
+            elif len(remaining) == 1:
+                board.place(row, col, remaining.pop())
+                set_value = True
+        if not set_value:
+            return board
+
+def _next_move(board):
+    """Returns (row, col, options) for a most constrained spot, or None."""
+    next_move = None
+    for row, col in _find_empty_spots(board):
+        remaining = board.valid_moves(row, col)
+        if next_move is None or len(remaining) < len(next_move[2]):
+            next_move = (row, col, remaining)
+    return next_move
+
+class _CopyCounter(object):
+    """Copy-per-branch search, as the solver worked before the undo trail."""
+
+    def __init__(self):
+        self.copies = 0
+
+    def _copy(self, board):
+        self.copies += 1
+        return copy.deepcopy(board)
+
+    def fill_board(self, board):
+        if not _fill_simple(board):
+            return None
+        next_move = _next_move(board)
+        if not next_move:
+            return board
+        row, col, options = next_move
+        for option in options:
+            board_copy = self._copy(board)
+            board_copy.place(row, col, option)
+            end_result = self.fill_board(board_copy)
+            if end_result:
+                return end_result
+        return None
+
+    def count_solutions(self, board):
+        if not _fill_simple(board):
+            return 0
+        for row, col in _find_empty_spots(board):
+            solutions = 0
+            for move in board.valid_moves(row, col):
+                board_copy = self._copy(board)
+                board_copy.place(row, col, move)
+                if self.fill_board(board_copy):
+                    solutions += 1
+                    if solutions >= 2:
+                        return solutions
+        return 1
+
+    def solve(self, board):
+        self.count_solutions(board)
+        return self.fill_board(board)
+
+def _copy_footprint(board):
+    """Returns (containers, bytes) allocated by one deep copy of board."""
+    board_copy = copy.deepcopy(board)
+    seen = set()
+    pending = [board_copy]
+    total_bytes = 0
+    while pending:
+        obj = pending.pop()
+        # Classes are shared between copies, not copied
+        if (id(obj) in seen or not gc.is_tracked(obj) or
+                isinstance(obj, type)):
+            continue
+        seen.add(id(obj))
+        total_bytes += sys.getsizeof(obj)
+        pending.extend(gc.get_referents(obj))
+    return len(seen), total_bytes
+
+def _timed(function, puzzle):
+    board = Board(Board.string_to_array(puzzle))
+    start = time.time()
+    result = function(board)
+    return result, time.time() - start
+
+def main():
+    print "{:<8} {:>8} {:>12} {:>12} {:>10} {:>10}".format(
+        "puzzle", "copies", "containers", "bytes", "copy ms", "trail ms")
+    for name, puzzle in SAMPLE_PUZZLES:
+        counter = _CopyCounter()
+        legacy, legacy_time = _timed(counter.solve, puzzle)
+        result, trail_time = _timed(solver.solve, puzzle)
+        assert legacy.to_puzzle_string() == result.to_puzzle_string()
+        containers, size = _copy_footprint(Board(Board.string_to_array(puzzle)))
+        print "{:<8} {:>8} {:>12} {:>12} {:>10.1f} {:>10.1f}".format(
+            name, counter.copies, counter.copies * containers,
+            counter.copies * size, legacy_time * 1000, trail_time * 1000)
+
+if __name__ == "__main__":
+    main()
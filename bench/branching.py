@@ -0,0 +1,78 @@
+"""Compares ways of choosing the cell to branch on in the search.
+
+Before the Propagator kept empty cells in buckets by candidate count,
+most_constrained scanned every empty cell for each search node. This
+benchmark replays that scan alongside each of propagation.TIE_BREAKS,
+and reports the search nodes and time each takes to check the puzzles
+of the chosen corpora for a unique solution.
+
+Usage:
+    python -m bench.branching [--corpus NAME ...] [--repeat N]
+"""
+import argparse
+import time
+
+from bench.suite import CORPORA, load_corpus
+from board import Board
+from propagation import Propagator, TIE_BREAKS
+import solver
+
+STRATEGIES = ('scan',) + TIE_BREAKS
+
+class _ScanPropagator(Propagator):
+    """A Propagator that finds the most constrained cell by scanning, as before."""
+
+    def most_constrained(self):
+        best = None
+        fewest = self.size + 1
+        candidates = self.candidates
+        popcount = self.popcount
+        for cell in self.empty_cells():
+            count = popcount[candidates[cell]]
+            if count < fewest:
+                best = cell
+                fewest = count
+                if count <= 2:
+                    break
+        return best
+
+def _search(puzzle, strategy):
+    """Returns (nodes, seconds) for counting puzzle's solutions up to 2."""
+    board = Board.from_string(puzzle)
+    start = time.time()
+    if strategy == 'scan':
+        propagator = _ScanPropagator(board)
+    else:
+        propagator = Propagator(board, strategy)
+    stats = solver.SolveStats()
+    solver._search(propagator, 2, lambda solved: None, None, stats)
+    return stats.nodes, time.time() - start
+
+def run(corpus, strategy, repeat):
+    """Returns (total nodes, best total seconds of repeat runs) for a corpus."""
+    puzzles = [puzzle for puzzle in load_corpus(corpus)
+               if Board.from_string(puzzle)._is_valid_board()]
+    best = None
+    for _ in xrange(repeat):
+        results = [_search(puzzle, strategy) for puzzle in puzzles]
+        seconds = sum(elapsed for _, elapsed in results)
+        best = seconds if best is None else min(best, seconds)
+    return sum(nodes for nodes, _ in results), best
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Branching strategy comparison.")
+    parser.add_argument('--corpus', action='append', choices=CORPORA,
+                        help="Corpus to run; repeat for several "
+                             "(default: medium, hard, and hardest).")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="Runs of each corpus, keeping the fastest "
+                             "(default: %(default)s).")
+    args = parser.parse_args(argv)
+    print "{:<8} {:<8} {:>10} {:>10}".format("corpus", "strategy", "nodes", "seconds")
+    for corpus in args.corpus or ('medium', 'hard', 'hardest'):
+        for strategy in STRATEGIES:
+            nodes, seconds = run(corpus, strategy, args.repeat)
+            print "{:<8} {:<8} {:>10} {:>10.3f}".format(corpus, strategy, nodes, seconds)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Measures requests per second through the app's request handling.
+
+Each scenario sends requests through Flask's test client, so the
+numbers include routing, argument parsing, validation, the solution
+cache, and template rendering, but no network. Every puzzle is
+requested once before timing, so the timed requests are served from the
+solution cache and measure the request path rather than the search.
+
+The "decode" scenario times only the step from a puzzle string to a
+validated board, without Flask.
+
+Usage:
+    python -m bench.serving [--scenario NAME ...] [--requests N]
+"""
+import argparse
+import time
+import urllib
+
+import app
+from bench import SAMPLE_PUZZLES
+import solver
+
+SCENARIOS = ('puzzle', 'cells', 'invalid', 'decode')
+
+_PUZZLES = [puzzle for name, puzzle in SAMPLE_PUZZLES]
+
+def _cell_query(puzzle):
+    return urllib.urlencode([("{}{}".format(*divmod(cell, 9)), number)
+                             for cell, number in enumerate(puzzle)])
+
+def _decode(puzzle):
+    puzzle, error = app.normalize_puzzle_string(puzzle)
+    if not error:
+        solver.decode_board(puzzle)
+
+def _requests(scenario):
+    """Returns a function that makes one request for a puzzle, for scenario."""
+    client = app.app.test_client()
+    if scenario == 'puzzle':
+        return lambda puzzle: client.get('/?puzzle=' + puzzle)
+    elif scenario == 'cells':
+        queries = dict((puzzle, _cell_query(puzzle)) for puzzle in _PUZZLES)
+        return lambda puzzle: client.get('/?' + queries[puzzle])
+    elif scenario == 'invalid':
+        return lambda puzzle: client.get('/?puzzle=' + puzzle[:-1] + "x")
+    return _decode
+
+def run(scenario, count):
+    """Returns requests per second for count requests of scenario."""
+    request = _requests(scenario)
+    for puzzle in _PUZZLES:
+        request(puzzle)
+    start = time.time()
+    for i in xrange(count):
+        request(_PUZZLES[i % len(_PUZZLES)])
+    return count / (time.time() - start)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="App request throughput.")
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS,
+                        help="Scenario to run; repeat for several (default: all).")
+    parser.add_argument('--requests', type=int, default=2000,
+                        help="Requests to time for each scenario (default: %(default)s).")
+    args = parser.parse_args(argv)
+    for scenario in args.scenario or SCENARIOS:
+        print "{:<8} {:>10.1f} requests/s".format(scenario, run(scenario, args.requests))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""Times the solver on the bundled puzzle corpora and tracks regressions.
+
+Each corpus in bench/corpora is run through solver.solve,
+solver.count_solutions, and solver.fill_board, in its own process so
+that its peak memory is measured on its own. For each corpus and
+operation the report has latency percentiles, throughput, and how many
+puzzles raised an error; boards with duplicate values are skipped by
+count_solutions and fill_board, which require a valid board.
+
+Results can be saved as JSON and compared with a saved baseline. Any
+median latency, throughput, or corpus peak memory that is worse than
+the baseline by more than the threshold is reported, and the exit
+status is 1.
+
+Usage:
+    python -m bench.suite [--corpus NAME ...] [--operation NAME ...]
+                          [--engine NAME] [--repeat N]
+                          [--output FILE] [--baseline FILE] [--threshold F]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+
+from board import Board
+import solver
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpora')
+CORPORA = ('easy', 'medium', 'hard', 'hardest', 'invalid')
+OPERATIONS = ('solve', 'count_solutions', 'fill_board')
+PERCENTILES = (50, 90, 99)
+
+# Stats of each operation compared with the baseline, and whether a
+#   higher value is better
+_COMPARED = (('p50_ms', False), ('per_second', True))
+# Stats of each corpus compared with the baseline, likewise
+_CORPUS_COMPARED = (('peak_rss_kb', False),)
+
+def load_corpus(name):
+    """Returns the puzzle strings in a corpus, skipping blanks and # comments."""
+    with open(os.path.join(CORPUS_DIR, name + '.txt')) as lines:
+        return [line.strip() for line in lines
+                if line.strip() and not line.startswith('#')]
+
+def percentile(ordered, percent):
+    """Returns the nearest-rank percentile of a sorted, non-empty list."""
+    rank = int(round(percent / 100.0 * len(ordered)))
+    return ordered[max(rank, 1) - 1]
+
+def _run_once(operation, board, engine):
+    """Runs operation on board, returning True if it raised a ValueError."""
+    try:
+        if operation == 'solve':
+            solver.solve(board, engine)
+        elif operation == 'count_solutions':
+            solver.count_solutions(board, engine)
+        else:
+            solver.fill_board(board, engine)
+    except ValueError:
+        return True
+    return False
+
+def _time_operation(operation, puzzles, engine, repeat):
+    """Returns the stats for running operation on each puzzle repeat times."""
+    times = []
+    errors = skipped = 0
+    for puzzle in puzzles:
+        board = Board.from_string(puzzle)
+        if operation != 'solve' and not board._is_valid_board():
+            skipped += 1
+            continue
+        for _ in xrange(repeat):
+            start = time.time()
+            failed = _run_once(operation, board, engine)
+            times.append(time.time() - start)
+        errors += failed
+    result = {'puzzles': len(puzzles) - skipped, 'errors': errors,
+              'skipped': skipped}
+    if times:
+        times.sort()
+        total = sum(times)
+        result['mean_ms'] = total / len(times) * 1000
+        for percent in PERCENTILES:
+            result['p{}_ms'.format(percent)] = percentile(times, percent) * 1000
+        result['max_ms'] = times[-1] * 1000
+        result['per_second'] = len(times) / total if total else 0.0
+    return result
+
+def run_corpus(task):
+    """Runs the (corpus, operations, engine, repeat) task, returning its results."""
+    name, operations, engine, repeat = task
+    puzzles = load_corpus(name)
+    results = dict((operation, _time_operation(operation, puzzles, engine, repeat))
+                   for operation in operations)
+    # Kilobytes on Linux
+    results['peak_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return name, results
+
+def run(corpora=CORPORA, operations=OPERATIONS, engine=None, repeat=1):
+    """Returns a JSON-ready report of every corpus and operation.
+
+    Each corpus runs in a new process, one at a time, so that timings
+    don't compete and each peak memory figure covers only its corpus.
+    """
+    results = {}
+    for name in corpora:
+        pool = multiprocessing.Pool(1)
+        try:
+            name, results[name] = pool.apply(
+                run_corpus, [(name, list(operations), engine, repeat)])
+        finally:
+            pool.terminate()
+            pool.join()
+    return {
+        'engine': engine or solver.DEFAULT_ENGINE,
+        'repeat': repeat,
+        'python': platform.python_version(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+
+def compare(report, baseline, threshold=0.1):
+    """Returns a message for each stat in report worse than baseline.
+
+    Args:
+        report: A report from run.
+        baseline: An earlier report from run to compare against.
+        threshold: The fraction by which a stat may be worse before it
+            counts as a regression.
+    """
+    regressions = []
+    for name, operations in sorted(report['results'].iteritems()):
+        old_operations = baseline['results'].get(name, {})
+        regressions.extend(_regressions(name, operations, old_operations,
+                                        _CORPUS_COMPARED, threshold))
+        for operation, stats in sorted(operations.iteritems()):
+            old = old_operations.get(operation)
+            if not isinstance(stats, dict) or not old:
+                continue
+            regressions.extend(_regressions(name + " " + operation, stats, old,
+                                            _COMPARED, threshold))
+    return regressions
+
+def _regressions(label, stats, old, compared, threshold):
+    """Returns a message for each of the compared stats worse than in old."""
+    regressions = []
+    for key, higher_is_better in compared:
+        if key not in stats or not old.get(key):
+            continue
+        change = float(stats[key] - old[key]) / old[key]
+        if higher_is_better:
+            change = -change
+        if change > threshold:
+            regressions.append("{} {}: {:.3f} -> {:.3f} ({:.0%} worse)".format(
+                label, key, old[key], stats[key], change))
+    return regressions
+
+def format_report(report):
+    """Returns the report as a table, one line per corpus and operation."""
+    lines = ["{:<8} {:<16} {:>6} {:>6} {:>9} {:>9} {:>9} {:>9} {:>10} {:>9}".format(
+        "corpus", "operation", "count", "errors", "p50 ms", "p90 ms", "p99 ms",
+        "max ms", "per second", "peak KB")]
+    for name in CORPORA:
+        operations = report['results'].get(name)
+        if operations is None:
+            continue
+        for operation in OPERATIONS:
+            stats = operations.get(operation)
+            if stats is None:
+                continue
+            if 'p50_ms' not in stats:
+                lines.append("{:<8} {:<16} {:>6} {:>6}".format(
+                    name, operation, stats['puzzles'], stats['errors']))
+                continue
+            lines.append("{:<8} {:<16} {:>6} {:>6} {:>9.2f} {:>9.2f} {:>9.2f} "
+                         "{:>9.2f} {:>10.1f} {:>9}".format(
+                name, operation, stats['puzzles'], stats['errors'],
+                stats['p50_ms'], stats['p90_ms'], stats['p99_ms'],
+                stats['max_ms'], stats['per_second'], operations['peak_rss_kb']))
+    return "\n".join(lines)
+
+def _parser():
+    parser = argparse.ArgumentParser(description="Solver benchmark suite.")
+    parser.add_argument('--corpus', action='append', choices=CORPORA,
+                        help="Corpus to run; repeat for several (default: all).")
+    parser.add_argument('--operation', action='append', choices=OPERATIONS,
+                        help="Operation to time; repeat for several (default: all).")
+    parser.add_argument('--engine', choices=sorted(solver.ENGINES),
+                        default=solver.DEFAULT_ENGINE,
+                        help="Search engine (default: %(default)s).")
+    parser.add_argument('--repeat', type=int, default=1,
+                        help="Times to run each puzzle (default: 1).")
+    parser.add_argument('--output', help="File to save the results to as JSON.")
+    parser.add_argument('--baseline', help="JSON results file to compare against.")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="Fraction worse than the baseline that counts "
+                             "as a regression (default: %(default)s).")
+    return parser
+
+def main(argv=None):
+    args = _parser().parse_args(argv)
+    report = run(args.corpus or CORPORA, args.operation or OPERATIONS,
+                 args.engine, args.repeat)
+    print format_report(report)
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = compare(report, json.load(baseline), args.threshold)
+        for regression in regressions:
+            print "REGRESSION:", regression
+        if regressions:
+            return 1
+        print "No regressions against", args.baseline
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
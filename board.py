@@ -1,12 +1,133 @@
 from math import sqrt
 import itertools
 
-# This program only handles 9x9 standard-sized boards
+# Boards are N^2 x N^2 for a box size of N. The standard 9x9 board has
+#   its own Board class, specialized on the module-level tables below;
+#   Board16 and Board25 share a generic implementation in SizedBoard.
 BOARD_SIZE = 9
 BOX_SIZE = 3
 
+# Puzzle string characters for the numbers 0 (a blank) to 25. Numbers
+#   past 9 are written as letters, so a 16x16 board uses 0-9 and A-G.
+ALPHABET = "0123456789ABCDEFGHIJKLMNOP"
+
+# Largest board size for which every digit mask gets a table entry up front
+_MAX_TABLE_SIZE = 9
+
+class _MaskTable(dict):
+    """A lookup table, indexed like a list, that fills itself in on use.
+
+    Boards too big to tabulate every digit mask use these instead of lists.
+    """
+
+    def __init__(self, function):
+        super(_MaskTable, self).__init__()
+        self.function = function
+
+    def __missing__(self, mask):
+        value = self[mask] = self.function(mask)
+        return value
+
+class Geometry(object):
+    """The sizes and lookup tables for boards with a given box size.
+
+    The tables let the board and solver index through them instead of
+    doing arithmetic and range checks. Cells are numbered from left to
+    right, then top to bottom, and boxes are numbered the same way.
+    Units are numbered with the rows first, then the columns, then the
+    boxes, and each one is a tuple of its cells.
+
+    Digit n is stored as bit (1 << n) in the row, column, and box masks,
+    so bit 0 is never set.
+    """
+
+    def __init__(self, box_size):
+        size = box_size * box_size
+        cells = xrange(size * size)
+        self.box_size = box_size
+        self.size = size
+        self.cells = size * size
+        self.all_digits = sum(1 << n for n in xrange(1, size + 1))
+        # The tuple of digits in each mask, and the number of bits set in
+        #   each digit mask or unit position mask
+        if size <= _MAX_TABLE_SIZE:
+            self.mask_digits = [_digits(mask, size)
+                                for mask in xrange(self.all_digits + 1)]
+            self.popcount = [bin(mask).count('1') for mask in xrange(self.all_digits + 1)]
+        else:
+            self.mask_digits = _MaskTable(lambda mask: _digits(mask, size))
+            self.popcount = _MaskTable(lambda mask: bin(mask).count('1'))
+        self.cell_row = tuple(cell // size for cell in cells)
+        self.cell_col = tuple(cell % size for cell in cells)
+        self.cell_box = tuple(self.cell_row[cell] // box_size * box_size +
+                              self.cell_col[cell] // box_size for cell in cells)
+        self.box_unit_start = 2 * size
+        self.units = tuple(tuple(cell for cell in cells if key[cell] == number)
+                           for key in (self.cell_row, self.cell_col, self.cell_box)
+                           for number in xrange(size))
+        # The row, column, and box unit numbers of each cell
+        self.cell_units = tuple((self.cell_row[cell], size + self.cell_col[cell],
+                                 self.box_unit_start + self.cell_box[cell])
+                                for cell in cells)
+        # The other cells that share a unit with each cell
+        self.peers = tuple(tuple(sorted(set(other for unit in self.cell_units[cell]
+                                            for other in self.units[unit]) - set([cell])))
+                           for cell in cells)
+        # Box number for the row and column of each box's upper left cell
+        self.box_starts = dict(((self.cell_row[cell], self.cell_col[cell]),
+                                self.cell_box[cell]) for cell in cells
+                               if self.cell_row[cell] % box_size == 0 and
+                               self.cell_col[cell] % box_size == 0)
+        self.positions = frozenset(xrange(size))
+        # Puzzle string characters, and translation tables between them
+        #   and cell values; lowercase letters are read as uppercase
+        self.chars = ALPHABET[:size + 1]
+        values = dict((char, value) for value, char in enumerate(self.chars))
+        values.update((char.lower(), value) for char, value in values.items())
+        self.valid_chars = "".join(values)
+        self.char_values = "".join(chr(values.get(chr(i), 0)) for i in xrange(256))
+        self.value_chars = "".join(self.chars[i] if i <= size else "?"
+                                   for i in xrange(256))
+
+def _digits(mask, size):
+    return tuple(n for n in xrange(1, size + 1) if mask & (1 << n))
+
+GEOMETRY = Geometry(BOX_SIZE)
+
+# The 9x9 tables, which the Board class and the solver's 9x9 fast path
+#   use directly
+ALL_DIGITS = GEOMETRY.all_digits
+# Maps every possible mask to the tuple of digits it contains
+MASK_DIGITS = GEOMETRY.mask_digits
+CELL_ROW = GEOMETRY.cell_row
+CELL_COL = GEOMETRY.cell_col
+CELL_BOX = GEOMETRY.cell_box
+BOX_UNIT_START = GEOMETRY.box_unit_start
+UNITS = GEOMETRY.units
+# The row, column, and box unit numbers of each cell
+CELL_UNITS = GEOMETRY.cell_units
+# The 20 other cells that share a unit with each cell
+PEERS = GEOMETRY.peers
+_BOX_STARTS = GEOMETRY.box_starts
+_POSITIONS = GEOMETRY.positions
+
+# Translation tables from 9x9 puzzle string characters to cell values
+_DIGIT_CHARS = "0123456789"
+_CHAR_VALUES = "".join(chr(i - ord("0")) if "0" <= chr(i) <= "9" else chr(0)
+                       for i in xrange(256))
+
 class Board(object):
-    """Represents a Sudoku board."""
+    """Represents a standard 9x9 Sudoku board.
+
+    The numbers are stored in a flat bytearray of 81 cells, one byte per
+    cell, numbered from left to right and then top to bottom.
+    Subclasses of SizedBoard represent the other board sizes.
+    """
+
+    __slots__ = ('cells', 'row_masks', 'col_masks', 'box_masks')
+
+    # The sizes and lookup tables for this class of board
+    geometry = GEOMETRY
 
     def __init__(self, board_array):
         """Creates a new Sudoku puzzle board.
@@ -25,8 +146,111 @@ class Board(object):
             ValueError: board_array is not a valid board configuration.
         """
         # Raises an exception if not valid
-        assert Board._is_valid_start_board(board_array)
-        self.board = board_array
+        assert type(self)._is_valid_start_board(board_array)
+        self.cells = bytearray(number for row in board_array for number in row)
+        self._build_masks()
+
+    @classmethod
+    def from_string(cls, board_string):
+        """Creates a new Board straight from a puzzle string.
+
+        This is equivalent to Board(Board.string_to_array(board_string)),
+        without building the 2D list in between.
+        Does not test whether the board has duplicate values.
+
+        Args:
+            board_string: An 81-character string of digits, in the format
+                described in string_to_array.
+
+        Raises:
+            ValueError: board_string is not valid.
+        """
+        board = cls.__new__(cls)
+        board.cells = cls.string_to_cells(board_string)
+        board._build_masks()
+        return board
+
+    @classmethod
+    def decode(cls, board_string):
+        """Creates a Board from a puzzle string and checks it in one pass.
+
+        This is from_string and _is_valid_board together, with the check
+        for duplicates made while the digit masks are built.
+
+        Returns:
+            A tuple of (board, valid), where valid is False if a number
+            repeats in a row, column, or box.
+
+        Raises:
+            ValueError: board_string is not valid.
+        """
+        board = cls.__new__(cls)
+        board.cells = cls.string_to_cells(board_string)
+        return board, board._build_masks()
+
+    @staticmethod
+    def string_to_cells(board_string):
+        """Converts a board string into a flat bytearray of 81 cell values.
+
+        This function does not check the validity of the board.
+
+        Args:
+            board_string: An 81-character string of digits, in the format
+                described in string_to_array.
+
+        Raises:
+            ValueError: board_string is not valid.
+        """
+        if len(board_string) != BOARD_SIZE * BOARD_SIZE:
+            raise ValueError("Board string must be 81 characters")
+        try:
+            cells = bytearray(board_string, "ascii")
+        except UnicodeError:
+            cells = None
+        if cells is None or cells.translate(None, _DIGIT_CHARS):
+            raise ValueError("Board string must contain only digits")
+        return cells.translate(_CHAR_VALUES)
+
+    def copy(self):
+        """Returns a new Board with the same numbers as this one."""
+        cls = type(self)
+        board = cls.__new__(cls)
+        board.cells = bytearray(self.cells)
+        board.row_masks = self.row_masks[:]
+        board.col_masks = self.col_masks[:]
+        board.box_masks = self.box_masks[:]
+        return board
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    def __getstate__(self):
+        return self.to_puzzle_string()
+
+    def __setstate__(self, board_string):
+        self.cells = bytearray(board_string, "ascii").translate(
+            self.geometry.char_values)
+        self._build_masks()
+
+    def __getitem__(self, index):
+        """Returns the number in the cell at the flat index 0 <= index < 81,
+        or below the number of cells for other board sizes."""
+        return self.cells[index]
+
+    @property
+    def board(self):
+        """A 9x9 (or board size) 2D list of this Board's numbers.
+
+        The list is built on each access, so changing it does not change
+        the Board; use place and clear for that.
+        """
+        cells = self.cells
+        size = self.geometry.size
+        return [list(cells[start:start + size])
+                for start in xrange(0, size * size, size)]
 
     def __str__(self):
         return "\n".join(" ".join(str(x) for x in row) for row in self.board)
@@ -36,11 +260,11 @@ class Board(object):
 
         This differs from the __str__ method in that it doesn't contain whitespace.
         """
-        return "".join(str(x) for row in self.board for x in row)
+        return str(self.cells.translate(self.geometry.value_chars))
 
-    @staticmethod
-    def string_to_array(board_string):
-        """Converts a board string into 9x9 board array format.
+    @classmethod
+    def string_to_array(cls, board_string):
+        """Converts a board string into 9x9 (or board size) array format.
 
         This function does not check the validity of the board array.
 
@@ -50,6 +274,7 @@ class Board(object):
                 first character on the top row (the upper left number),
                 the last character is the last character on the bottom row
                 (the bottom right number), and zeroes represent empty spaces.
+                Numbers past 9 are the letters in ALPHABET.
 
         Returns:
             A 2D array for use with the Board constructor.
@@ -57,15 +282,22 @@ class Board(object):
         Raises:
             ValueError: board_string is not valid.
     """
-        if len(board_string) != 81:
-            raise ValueError("Board string must be 81 characters")
+        size = cls.geometry.size
+        if len(board_string) != size * size:
+            raise ValueError("Board string must be {} characters".format(size * size))
+        values = dict((char, value) for value, char in enumerate(cls.geometry.chars))
         rows = []
-        for row_start in xrange(0, 73, 9):
-            rows.append([int(num) for num in board_string[row_start:row_start + 9]])
+        for row_start in xrange(0, size * (size - 1) + 1, size):
+            try:
+                rows.append([values[char.upper()] for char
+                             in board_string[row_start:row_start + size]])
+            except KeyError:
+                raise ValueError("Board string has a character outside " +
+                                 cls.geometry.chars)
         return rows
 
-    @staticmethod
-    def _is_valid_start_board(board_array):
+    @classmethod
+    def _is_valid_start_board(cls, board_array):
         """Confirms that a board array is in valid Sudoku format.
 
         Does not confirm whether it is possible to solve this board.
@@ -79,15 +311,16 @@ class Board(object):
 
             ValueError: board_array is not a valid board configuration.
         """
+        size = cls.geometry.size
         if type(board_array) not in (list, tuple):
             raise TypeError("Board must be a 2D list or tuple")
-        if len(board_array) != BOARD_SIZE:
-            raise ValueError("Board must contain {} squares".format(BOARD_SIZE))
-        valid_values = set(xrange(BOARD_SIZE + 1))
+        if len(board_array) != size:
+            raise ValueError("Board must contain {} squares".format(size))
+        valid_values = set(xrange(size + 1))
         for sublist in board_array:
             if type(sublist) not in (list, tuple):
                 raise TypeError("Board must contain only lists or tuples")
-            if len(sublist) != BOARD_SIZE:
+            if len(sublist) != size:
                 raise ValueError("Board boxes must be square")
             for item in sublist:
                 if item not in valid_values:
@@ -113,38 +346,90 @@ class Board(object):
         """
         # We can't use _numbers_in_row, _numbers_in_column,or _numbers_in_box
         #   for these because those don't check for duplicates.
-        # Check rows
-        for i in xrange(BOARD_SIZE):
-            row_numbers = set()
-            for number in self.board[i]:
-                if number in row_numbers:
-                    return False
-                if number: # Don't add 0
-                    row_numbers.add(number)
-        # Check columns
-        for j in xrange(BOARD_SIZE):
-            col_numbers = set()
-            for i in xrange(BOARD_SIZE):
-                number = self.board[i][j]
-                if number in col_numbers:
-                    return False
-                if number: # Don't add 0
-                    col_numbers.add(number)
-        # Check boxes
-        # Start at upper left of each box, then move one box width in each direction
-        move_range = xrange(0, BOARD_SIZE, BOX_SIZE)
-        boxes = [(x, y) for x in move_range for y in move_range]
-        for box_x, box_y in boxes:
-            box_numbers = set()
-            for i in xrange(box_x, box_x + BOX_SIZE):
-                for j in xrange(box_y, box_y + BOX_SIZE):
-                    number = self.board[i][j]
-                    if number in box_numbers:
+        cells = self.cells
+        # Check rows, then columns, then boxes
+        for unit in self.geometry.units:
+            seen = 0
+            for cell in unit:
+                number = cells[cell]
+                if number: # Don't count 0 as a repeat
+                    bit = 1 << number
+                    if seen & bit:
                         return False
-                    if number: # Don't add 0
-                        box_numbers.add(number)
+                    seen |= bit
         return True
 
+    def _build_masks(self):
+        """Builds the row, column, and box digit masks from self.cells.
+
+        The masks let valid_moves run in constant time. They are kept up to
+        date by place and clear, so cells should not be assigned directly.
+
+        Returns:
+            True if no number repeats in a row, column, or box, as for
+            _is_valid_board, and False otherwise.
+        """
+        geometry = self.geometry
+        cell_row, cell_col, cell_box = (geometry.cell_row, geometry.cell_col,
+                                        geometry.cell_box)
+        self.row_masks = row_masks = [0] * geometry.size
+        self.col_masks = col_masks = [0] * geometry.size
+        self.box_masks = box_masks = [0] * geometry.size
+        valid = True
+        for cell, number in enumerate(self.cells):
+            if number:
+                bit = 1 << number
+                row, col, box = cell_row[cell], cell_col[cell], cell_box[cell]
+                if (row_masks[row] | col_masks[col] | box_masks[box]) & bit:
+                    valid = False
+                row_masks[row] |= bit
+                col_masks[col] |= bit
+                box_masks[box] |= bit
+        return valid
+
+    def place(self, row, column, number):
+        """Plays number at the empty position row, column.
+
+        Does not check whether the move is valid; callers should choose
+        number from valid_moves or candidate_mask.
+        """
+        self.place_at(row * self.geometry.size + column, number)
+
+    def place_at(self, cell, number):
+        """Plays number at the empty cell with flat index cell."""
+        bit = 1 << number
+        self.cells[cell] = number
+        self.row_masks[CELL_ROW[cell]] |= bit
+        self.col_masks[CELL_COL[cell]] |= bit
+        self.box_masks[CELL_BOX[cell]] |= bit
+
+    def clear(self, row, column):
+        """Empties the position at row, column, undoing a call to place."""
+        self.clear_at(row * self.geometry.size + column)
+
+    def clear_at(self, cell):
+        """Empties the cell with flat index cell, undoing a call to place_at."""
+        keep = ~(1 << self.cells[cell])
+        self.cells[cell] = 0
+        self.row_masks[CELL_ROW[cell]] &= keep
+        self.col_masks[CELL_COL[cell]] &= keep
+        self.box_masks[CELL_BOX[cell]] &= keep
+
+    def candidate_mask(self, row, column):
+        """Returns the valid moves for the given position as a digit mask.
+
+        This is the unchecked fast path behind valid_moves: it does not
+        confirm that the position is in range or empty. The digits in
+        the mask can be listed with MASK_DIGITS.
+        """
+        return self.candidate_mask_at(row * self.geometry.size + column)
+
+    def candidate_mask_at(self, cell):
+        """Returns the candidate_mask for the cell with flat index cell."""
+        return ALL_DIGITS & ~(self.row_masks[CELL_ROW[cell]] |
+                              self.col_masks[CELL_COL[cell]] |
+                              self.box_masks[CELL_BOX[cell]])
+
     def _numbers_in_row(self, row):
         """Returns a set of the numbers in this row.
 
@@ -163,7 +448,7 @@ class Board(object):
         """
         if not self._valid_pos(row):
             raise IndexError("Row {} is not a valid integer".format(row))
-        return set(self.board[row]) - set([0])
+        return set(self.cells[cell] for cell in self.geometry.units[row]) - set([0])
 
     def _numbers_in_column(self, col):
         """Returns a set of the numbers in this column.
@@ -183,11 +468,8 @@ class Board(object):
         """
         if not self._valid_pos(col):
             raise IndexError("Column {} is not a valid integer".format(col))
-        col_numbers = set()
-        for i in xrange(BOARD_SIZE):
-            if self.board[i][col]:
-                col_numbers.add(self.board[i][col])
-        return col_numbers
+        geometry = self.geometry
+        return set(self.cells[cell] for cell in geometry.units[geometry.size + col]) - set([0])
 
     def _numbers_in_box(self, box_start_row, box_start_col):
         """Returns a set of the numbers in the given box.
@@ -218,18 +500,14 @@ class Board(object):
                for this board.
         """
         # Don't use _valid_pos; box requirements are more specific
-        size = BOARD_SIZE
-        for start in (box_start_row, box_start_col):
-            # Avoid hardcoding valid positions of (0, 3, 6)
-            if (not (self._valid_pos(box_start_row) and self._valid_pos(box_start_col)) or
-                not (0 <= start < size and start % BOX_SIZE == 0)):
+        geometry = self.geometry
+        box = geometry.box_starts.get((box_start_row, box_start_col))
+        if box is None:
+            for start in (box_start_row, box_start_col):
+                if start not in geometry.positions or start % geometry.box_size:
                     raise IndexError("Invalid box start number: {}".format(start))
-        box_numbers = set()
-        for i in xrange(box_start_row, box_start_row + BOX_SIZE):
-            for j in xrange(box_start_col, box_start_col + BOX_SIZE):
-                if self.board[i][j]:
-                    box_numbers.add(self.board[i][j])
-        return box_numbers
+        unit = geometry.units[geometry.box_unit_start + box]
+        return set(self.cells[cell] for cell in unit) - set([0])
 
     def valid_moves(self, row, column):
         """Returns the valid moves for the given position.
@@ -250,21 +528,14 @@ class Board(object):
         """
         if not (self._valid_pos(row) and self._valid_pos(column)):
             raise IndexError("Invalid row or column index.")
-        if self.board[row][column]:
+        cell = row * self.geometry.size + column
+        number = self.cells[cell]
+        if number:
             raise IndexError(
                 "Non-zero number already at position {},{}: {}".format(
-                    row, column, self.board[row][column])
+                    row, column, number)
                 )
-        used_numbers = self._numbers_in_row(row)
-        # Combine all the used numbers together because we don't care where
-        # they were used, just that they are no longer possible
-        used_numbers.update(self._numbers_in_column(column))
-        # Round row and column numbers down to box start positions
-        # TODO: Can I just do mod here?
-        x = row / BOX_SIZE * BOX_SIZE
-        y = column / BOX_SIZE * BOX_SIZE
-        used_numbers.update(self._numbers_in_box(x, y))
-        return set(xrange(1, BOARD_SIZE + 1)) - used_numbers
+        return set(self.geometry.mask_digits[self.candidate_mask_at(cell)])
 
     def _valid_pos(self, index):
         """Checks whether the given index is valid for this Board.
@@ -279,4 +550,102 @@ class Board(object):
         Returns:
             True iff index is a valid row or column index.
         """
-        return index in xrange(BOARD_SIZE)
\ No newline at end of file
+        return index in self.geometry.positions
+
+class SizedBoard(Board):
+    """A Board of a size other than 9x9.
+
+    Subclasses set geometry to the tables for their size. The methods
+    here replace the ones that Board specializes on the 9x9 tables.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def string_to_cells(cls, board_string):
+        """Converts a board string into a flat bytearray of cell values.
+
+        This function does not check the validity of the board.
+
+        Args:
+            board_string: A string of one character from the board's
+                alphabet for each cell, in the format described in
+                string_to_array.
+
+        Raises:
+            ValueError: board_string is not valid.
+        """
+        geometry = cls.geometry
+        if len(board_string) != geometry.cells:
+            raise ValueError("Board string must be {} characters".format(geometry.cells))
+        try:
+            cells = bytearray(board_string, "ascii")
+        except UnicodeError:
+            cells = None
+        if cells is None or cells.translate(None, geometry.valid_chars):
+            raise ValueError("Board string must contain only " + geometry.chars)
+        return cells.translate(geometry.char_values)
+
+    def place_at(self, cell, number):
+        """Plays number at the empty cell with flat index cell."""
+        geometry = self.geometry
+        bit = 1 << number
+        self.cells[cell] = number
+        self.row_masks[geometry.cell_row[cell]] |= bit
+        self.col_masks[geometry.cell_col[cell]] |= bit
+        self.box_masks[geometry.cell_box[cell]] |= bit
+
+    def clear_at(self, cell):
+        """Empties the cell with flat index cell, undoing a call to place_at."""
+        geometry = self.geometry
+        keep = ~(1 << self.cells[cell])
+        self.cells[cell] = 0
+        self.row_masks[geometry.cell_row[cell]] &= keep
+        self.col_masks[geometry.cell_col[cell]] &= keep
+        self.box_masks[geometry.cell_box[cell]] &= keep
+
+    def candidate_mask_at(self, cell):
+        """Returns the candidate_mask for the cell with flat index cell."""
+        geometry = self.geometry
+        return geometry.all_digits & ~(self.row_masks[geometry.cell_row[cell]] |
+                                       self.col_masks[geometry.cell_col[cell]] |
+                                       self.box_masks[geometry.cell_box[cell]])
+
+class Board16(SizedBoard):
+    """A 16x16 board, with 4x4 boxes and the numbers 1-9 and A-G."""
+
+    __slots__ = ()
+    geometry = Geometry(4)
+
+class Board25(SizedBoard):
+    """A 25x25 board, with 5x5 boxes and the numbers 1-9 and A-P."""
+
+    __slots__ = ()
+    geometry = Geometry(5)
+
+# Board classes by board size
+BOARD_CLASSES = dict((cls.geometry.size, cls) for cls in (Board, Board16, Board25))
+# Board classes by the length of their puzzle strings
+_CLASSES_BY_CELLS = dict((cls.geometry.cells, cls) for cls in BOARD_CLASSES.values())
+
+def board_from_string(board_string):
+    """Creates a Board of whichever size matches the length of board_string.
+
+    An 81-character string makes a 9x9 Board, a 256-character string a
+    Board16, and a 625-character string a Board25.
+
+    Raises:
+        ValueError: board_string is not a valid puzzle string of any size.
+    """
+    cls = _CLASSES_BY_CELLS.get(len(board_string), Board)
+    return cls.from_string(board_string)
+
+def decode_board_string(board_string):
+    """Returns (board, valid) for a puzzle string of any size, as for Board.decode.
+
+    Raises:
+        ValueError: board_string is not a valid puzzle string of any size.
+    """
+    cls = _CLASSES_BY_CELLS.get(len(board_string), Board)
+    return cls.decode(board_string)
+
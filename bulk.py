@@ -0,0 +1,127 @@
+"""Streams many puzzle strings through the solver on a pool of processes.
+
+Puzzles are read lazily and only a bounded number are in flight at a
+time, so results can be written as they finish without holding the
+whole input in memory.
+"""
+from collections import namedtuple
+import multiprocessing
+import threading
+import time
+import solver
+
+# The result of solving one input line. index is the 1-based line number,
+#   and solution is the solved puzzle string, or None if the puzzle could
+#   not be solved, in which case error has the error message.
+BulkResult = namedtuple('BulkResult', 'index puzzle solution error')
+
+# Puzzles allowed in flight for each worker, counted in chunks
+_PENDING_CHUNKS = 4
+
+def read_puzzles(lines):
+    """Yields (line number, puzzle string) for each non-blank line."""
+    for index, line in enumerate(lines, 1):
+        puzzle = line.strip()
+        if puzzle:
+            yield index, puzzle
+
+def solve_item(item):
+    """Solves an (index, puzzle, engine, limits, tie_break) item.
+
+    limits is None, or a (max_nodes, timeout) pair for the puzzle's
+    solver.SearchBudget. A puzzle that uses up its budget is an error.
+
+    Returns:
+        A BulkResult.
+    """
+    index, puzzle, engine, limits, tie_break = item
+    budget = None if limits is None else solver.SearchBudget(*limits)
+    try:
+        solved = solver.solve_string(puzzle, engine, budget, None, tie_break)
+    except (ValueError, solver.SearchLimitExceeded) as e:
+        return BulkResult(index, puzzle, None, str(e))
+    return BulkResult(index, puzzle, solved.to_puzzle_string(), None)
+
+def solve_stream(items, workers=1, chunk_size=1, ordered=True, engine=None,
+                 limits=None, tie_break='any'):
+    """Yields a BulkResult for each (index, puzzle) item.
+
+    Args:
+        items: An iterable of (index, puzzle string) pairs, such as the
+            output of read_puzzles. It is consumed lazily.
+        workers: The number of worker processes. With 1, puzzles are
+            solved in this process.
+        chunk_size: The number of puzzles sent to a worker at a time.
+        ordered: If True, results come out in input order. Otherwise
+            each result comes out as soon as it is ready.
+        engine: The name of the solver engine, or None for the default.
+        limits: A (max_nodes, timeout) pair limiting the search for each
+            puzzle, as for solver.SearchBudget, or None for no limits.
+        tie_break: How the backtrack engine chooses between equally
+            constrained cells, one of propagation.TIE_BREAKS.
+    """
+    tasks = ((index, puzzle, engine, limits, tie_break)
+             for index, puzzle in items)
+    return map_stream(solve_item, tasks, workers, chunk_size, ordered)
+
+def map_stream(function, tasks, workers=1, chunk_size=1, ordered=True):
+    """Yields function(task) for each task, on a pool of workers processes.
+
+    Tasks are read lazily, and only a bounded number are in flight at a
+    time. function runs in the worker processes, so it must be a
+    module-level function that can be pickled, and so must the tasks.
+    The other arguments are as for solve_stream.
+    """
+    if workers <= 1:
+        for task in tasks:
+            yield function(task)
+        return
+    # The pool reads tasks on its own thread as fast as it can, so the
+    #   semaphore holds it back until enough results have been taken
+    pending = threading.BoundedSemaphore(workers * chunk_size * _PENDING_CHUNKS)
+
+    def throttled():
+        for task in tasks:
+            pending.acquire()
+            yield task
+
+    pool = multiprocessing.Pool(workers)
+    try:
+        if ordered:
+            results = pool.imap(function, throttled(), chunk_size)
+        else:
+            results = pool.imap_unordered(function, throttled(), chunk_size)
+        for result in results:
+            pending.release()
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+class Summary(object):
+    """Counts results as they stream past, and reports throughput."""
+
+    def __init__(self):
+        self.solved = 0
+        self.errors = 0
+        self.start = time.time()
+
+    def add(self, result):
+        if result.error is None:
+            self.solved += 1
+        else:
+            self.errors += 1
+
+    def report(self):
+        elapsed = time.time() - self.start
+        total = self.solved + self.errors
+        rate = total / elapsed if elapsed else 0.0
+        return "{} puzzles ({} solved, {} errors) in {:.2f}s, {:.1f} puzzles/s".format(
+            total, self.solved, self.errors, elapsed, rate)
+
+def format_result(result):
+    """Returns a tab-separated output line for a BulkResult."""
+    if result.error is None:
+        return "{}\t{}\tsolved\t{}".format(result.index, result.puzzle, result.solution)
+    return "{}\t{}\terror\t{}".format(result.index, result.puzzle, result.error)
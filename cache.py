@@ -0,0 +1,177 @@
+"""A bounded, least-recently-used cache of solver results.
+
+Results are keyed by the normalized 81-character puzzle string, and
+each one is a (solution, error) pair: the solved puzzle string and
+None, or None and the error message from solver.solve. Entries can
+expire after a time to live, and can be backed by an SQLite file so
+that they survive worker restarts and are shared between workers.
+
+PageCache keeps rendered pages the same way, in memory only.
+"""
+from collections import OrderedDict
+import sqlite3
+import threading
+import time
+
+class SolutionCache(object):
+    """An LRU cache of (solution, error) results with hit and miss counts."""
+
+    def __init__(self, max_size=1024, ttl=None, path=None):
+        """Creates a new, empty cache.
+
+        Args:
+            max_size: The number of results to keep in memory. The least
+                recently used result is evicted when the cache is full.
+                A max_size of 0 turns the cache off.
+            ttl: The number of seconds a result stays valid, or None to
+                keep results until they are evicted.
+            path: The file name of an SQLite database to back the cache,
+                or None to keep results only in memory. The database
+                also keeps at most max_size results, dropping the ones
+                stored longest ago, and drops expired results when they
+                are read.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        # Puzzle string -> (time stored, result), oldest use first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path and max_size:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS solutions ("
+                             "puzzle TEXT PRIMARY KEY, solution TEXT, "
+                             "error TEXT, stored REAL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS solutions_stored "
+                             "ON solutions (stored)")
+            self._db.commit()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, puzzle):
+        """Returns the cached result for puzzle, or None if there isn't one."""
+        if not self.max_size:
+            return None
+        with self._lock:
+            entry = self._entries.pop(puzzle, None)
+            if entry is None and self._db is not None:
+                entry = self._load(puzzle)
+            if entry is not None and self._expired(entry[0]):
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            # Reinsert to mark as most recently used
+            self._entries[puzzle] = entry
+            self._evict()
+            return entry[1]
+
+    def put(self, puzzle, result):
+        """Stores a (solution, error) result for puzzle."""
+        if not self.max_size:
+            return
+        entry = (time.time(), tuple(result))
+        with self._lock:
+            self._entries.pop(puzzle, None)
+            self._entries[puzzle] = entry
+            self._evict()
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?)",
+                                 (puzzle,) + entry[1] + (entry[0],))
+                # Keep only the max_size most recently stored rows
+                self._db.execute("DELETE FROM solutions WHERE rowid IN ("
+                                 "SELECT rowid FROM solutions ORDER BY stored DESC "
+                                 "LIMIT -1 OFFSET ?)", (self.max_size,))
+                self._db.commit()
+
+    def stats(self):
+        """Returns a dictionary of the cache's size and counters."""
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+    def _expired(self, stored):
+        return self.ttl is not None and time.time() - stored > self.ttl
+
+    def _evict(self):
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _load(self, puzzle):
+        row = self._db.execute("SELECT stored, solution, error FROM solutions "
+                               "WHERE puzzle = ?", (puzzle,)).fetchone()
+        if row is None:
+            return None
+        if self._expired(row[0]):
+            self._db.execute("DELETE FROM solutions WHERE puzzle = ?", (puzzle,))
+            self._db.commit()
+            self.expirations += 1
+            return None
+        solution, error = row[1], row[2]
+        return (row[0], (solution and str(solution), error and str(error)))
+
+class PageCache(object):
+    """An LRU cache of rendered pages by key, with hit and miss counts.
+
+    Pages are kept only in memory. The methods are thread safe.
+    """
+
+    def __init__(self, max_size=256):
+        """Creates a new, empty cache.
+
+        Args:
+            max_size: The number of pages to keep. A max_size of 0 turns
+                the cache off.
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        # Key -> page, oldest use first
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._pages)
+
+    def get(self, key):
+        """Returns the page stored under key, or None if there isn't one."""
+        if not self.max_size:
+            return None
+        with self._lock:
+            page = self._pages.pop(key, None)
+            if page is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._pages[key] = page
+            return page
+
+    def put(self, key, page):
+        """Stores page under key, evicting the least recently used if full."""
+        if not self.max_size:
+            return
+        with self._lock:
+            self._pages.pop(key, None)
+            self._pages[key] = page
+            while len(self._pages) > self.max_size:
+                self._pages.popitem(last=False)
+
+    def stats(self):
+        """Returns a dictionary of the cache's size and counters."""
+        with self._lock:
+            return {'size': len(self._pages), 'max_size': self.max_size,
+                    'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,155 @@
+"""Canonical forms of puzzle strings under Sudoku symmetries.
+
+Relabeling the digits, transposing the grid, reordering the bands (and
+stacks), and reordering the rows within a band (and columns within a
+stack) all turn a puzzle into an equivalent one, whose solution is the
+same transform of the original solution. Rotations and reflections are
+combinations of these.
+
+canonicalize picks one representative of each puzzle's equivalence
+class and returns the Transform that reaches it, so a cache can store
+one solve for every equivalent puzzle and map the answer back with
+invert.
+
+To stay cheap, lines are first ordered by invariants that don't change
+under the symmetries (how many clues each line has in each band or
+stack, and how common its digits are). Only lines that tie on those
+invariants have their orders tried exhaustively, up to a fixed number
+of candidates. Beyond that limit two equivalent puzzles can get
+different canonical forms, which only costs a cache miss.
+"""
+from collections import namedtuple
+import itertools
+from board import BOARD_SIZE, BOX_SIZE
+
+# A transform maps puzzle strings to puzzle strings: cell i of the result
+#   is digits[number] for the number in cell cells[i] of the input.
+Transform = namedtuple('Transform', 'cells digits')
+
+# Orders tried for the rows, and separately for the columns, of each
+#   orientation
+ORDER_LIMIT = 12
+
+_CELLS = BOARD_SIZE * BOARD_SIZE
+_TRANSPOSED = tuple(col * BOARD_SIZE + row
+                    for row in xrange(BOARD_SIZE) for col in xrange(BOARD_SIZE))
+
+def apply(transform, puzzle):
+    """Returns puzzle with transform applied."""
+    digits = transform.digits
+    return "".join(str(digits[int(puzzle[cell])]) for cell in transform.cells)
+
+def invert(transform, puzzle):
+    """Returns the puzzle that transform maps to puzzle.
+
+    If puzzle is the solution of a canonical form, this is the solution
+    of the original puzzle.
+    """
+    numbers = [0] * len(transform.digits)
+    for number, mapped in enumerate(transform.digits):
+        numbers[mapped] = number
+    result = [None] * _CELLS
+    for i, cell in enumerate(transform.cells):
+        result[cell] = str(numbers[int(puzzle[i])])
+    return "".join(result)
+
+def canonicalize(puzzle):
+    """Returns (canonical puzzle string, Transform) for a puzzle string.
+
+    Args:
+        puzzle: An 81-character string of digits.
+
+    Returns:
+        The canonical form of puzzle, and the Transform that maps puzzle
+        (and its solution) to that form.
+    """
+    values = [int(number) for number in puzzle]
+    best = None
+    for orientation in (tuple(xrange(_CELLS)), _TRANSPOSED):
+        grid = [values[cell] for cell in orientation]
+        row_keys, col_keys = _line_keys(grid)
+        row_orders = itertools.islice(_orders(row_keys), ORDER_LIMIT)
+        col_orders = list(itertools.islice(_orders(col_keys), ORDER_LIMIT))
+        for rows in row_orders:
+            for cols in col_orders:
+                cells = [orientation[row * BOARD_SIZE + col]
+                         for row in rows for col in cols]
+                candidate = _relabeled(values, cells)
+                if best is None or candidate[0] < best[0]:
+                    best = candidate
+    return best[0], Transform(*best[1:])
+
+def _relabeled(values, cells):
+    """Returns (puzzle string, cells, digits) with digits numbered by first use."""
+    digits = [0] * (BOARD_SIZE + 1)
+    next_digit = 1
+    result = []
+    for cell in cells:
+        number = values[cell]
+        if number and not digits[number]:
+            digits[number] = next_digit
+            next_digit += 1
+        result.append(digits[number])
+    # Digits missing from the puzzle take the remaining labels in order
+    for number in xrange(1, BOARD_SIZE + 1):
+        if not digits[number]:
+            digits[number] = next_digit
+            next_digit += 1
+    return "".join(str(number) for number in result), tuple(cells), tuple(digits)
+
+def _line_keys(grid):
+    """Returns keys for the rows and columns that the symmetries preserve.
+
+    Each line's key counts its clues in each band or stack, and how often
+    its digits appear in the puzzle. One round of refinement then adds the
+    keys of the crossing lines its clues lie on.
+    """
+    frequency = [0] * (BOARD_SIZE + 1)
+    for number in grid:
+        frequency[number] += 1
+    rows = [[(col, grid[row * BOARD_SIZE + col]) for col in xrange(BOARD_SIZE)
+             if grid[row * BOARD_SIZE + col]] for row in xrange(BOARD_SIZE)]
+    cols = [[(row, grid[row * BOARD_SIZE + col]) for row in xrange(BOARD_SIZE)
+             if grid[row * BOARD_SIZE + col]] for col in xrange(BOARD_SIZE)]
+
+    def base_key(clues):
+        segments = [0] * BOX_SIZE
+        for position, _ in clues:
+            segments[position // BOX_SIZE] += 1
+        return (len(clues), tuple(sorted(segments)),
+                tuple(sorted(frequency[number] for _, number in clues)))
+
+    def refined_key(clues, base, crossing):
+        segments = [[] for _ in xrange(BOX_SIZE)]
+        for position, _ in clues:
+            segments[position // BOX_SIZE].append(crossing[position])
+        return (base, tuple(sorted(tuple(sorted(segment)) for segment in segments)))
+
+    row_base = [base_key(clues) for clues in rows]
+    col_base = [base_key(clues) for clues in cols]
+    return ([refined_key(rows[i], row_base[i], col_base) for i in xrange(BOARD_SIZE)],
+            [refined_key(cols[i], col_base[i], row_base) for i in xrange(BOARD_SIZE)])
+
+def _orders(keys):
+    """Yields orders of the 9 lines sorted by band key, then by line key.
+
+    Bands are groups of BOX_SIZE lines that must stay together. Every
+    order of bands or lines with equal keys is yielded.
+    """
+    bands = [range(band * BOX_SIZE, (band + 1) * BOX_SIZE)
+             for band in xrange(BOX_SIZE)]
+    band_keys = [tuple(sorted(keys[line] for line in band)) for band in bands]
+    band_choices = _tied_orders(range(BOX_SIZE), band_keys)
+    line_choices = [_tied_orders(band, keys) for band in bands]
+    for band_order in band_choices:
+        for line_orders in itertools.product(*line_choices):
+            yield [line for band in band_order for line in line_orders[band]]
+
+def _tied_orders(items, keys):
+    """Returns every order of items sorted by keys, permuting only ties."""
+    ordered = sorted(items, key=keys.__getitem__)
+    groups = [list(group) for _, group in
+              itertools.groupby(ordered, key=keys.__getitem__)]
+    return [[item for part in parts for item in part]
+            for parts in itertools.product(*[list(itertools.permutations(group))
+                                             for group in groups])]
@@ -0,0 +1,104 @@
+"""Sorts puzzles into classes without solving them.
+
+Each puzzle is answered with the least work that settles its class:
+    malformed: Not a puzzle string of any board size. Nothing else is done.
+    duplicates: A number repeats in a row, column, or box. This is found
+        while the string is decoded, in the same pass.
+    no_solution: The search found no solution.
+    multiple_solutions: The search stopped at a second solution.
+    unique: The search found exactly one solution.
+    search_limit: The search used up its limits before settling the
+        count. This only happens when limits are given.
+
+The search only counts solutions, so no solved board is copied, and it
+stops at the second solution. With the backtrack engine, a board that
+propagation proves unsolvable stops before any guess.
+"""
+from collections import Counter, namedtuple
+import time
+from board import decode_board_string
+import bulk
+import solver
+
+MALFORMED = 'malformed'
+DUPLICATES = 'duplicates'
+NO_SOLUTION = 'no_solution'
+MULTIPLE_SOLUTIONS = 'multiple_solutions'
+UNIQUE = 'unique'
+SEARCH_LIMIT = 'search_limit'
+CLASSES = (MALFORMED, DUPLICATES, NO_SOLUTION, MULTIPLE_SOLUTIONS, UNIQUE,
+           SEARCH_LIMIT)
+
+# The class of one input puzzle. index is its 1-based line number, and
+#   detail is the error message for malformed and search_limit, or None.
+Classification = namedtuple('Classification', 'index puzzle status detail')
+
+# Class for each number of solutions counted
+_BY_COUNT = (NO_SOLUTION, UNIQUE, MULTIPLE_SOLUTIONS)
+
+def classify(puzzle, engine=None, limits=None):
+    """Returns (class, detail) for a puzzle string.
+
+    Args:
+        puzzle: A puzzle string of any supported board size.
+        engine: The name of the solver engine, or None for the default.
+        limits: A (max_nodes, timeout) pair limiting the search, as for
+            solver.SearchBudget, or None for no limits.
+
+    Returns:
+        One of CLASSES, and the error message for MALFORMED and
+        SEARCH_LIMIT, or None.
+    """
+    try:
+        board, valid = decode_board_string(puzzle)
+    except ValueError as e:
+        return MALFORMED, str(e)
+    if not valid:
+        return DUPLICATES, None
+    budget = None if limits is None else solver.SearchBudget(*limits)
+    try:
+        count = solver.count_solutions(board, engine, budget)
+    except solver.SearchLimitExceeded as e:
+        return SEARCH_LIMIT, str(e)
+    return _BY_COUNT[count], None
+
+def classify_item(item):
+    """Classifies one (index, puzzle, engine, limits) item."""
+    index, puzzle, engine, limits = item
+    return Classification(index, puzzle, *classify(puzzle, engine, limits))
+
+def classify_stream(items, workers=1, chunk_size=64, ordered=True, engine=None,
+                    limits=None):
+    """Yields a Classification for each (index, puzzle) item.
+
+    The arguments are as for bulk.solve_stream. Most puzzles classify
+    quickly, so the default chunk_size is larger.
+    """
+    tasks = ((index, puzzle, engine, limits) for index, puzzle in items)
+    return bulk.map_stream(classify_item, tasks, workers, chunk_size, ordered)
+
+class Summary(object):
+    """Counts classifications as they stream past, and reports throughput."""
+
+    def __init__(self):
+        self.counts = Counter()
+        self.start = time.time()
+
+    def add(self, result):
+        self.counts[result.status] += 1
+
+    def report(self):
+        elapsed = time.time() - self.start
+        total = sum(self.counts.itervalues())
+        rate = total / elapsed if elapsed else 0.0
+        classes = ", ".join("{} {}".format(self.counts[status], status)
+                            for status in CLASSES if self.counts[status])
+        return "{} puzzles ({}) in {:.2f}s, {:.1f} puzzles/s".format(
+            total, classes or "none", elapsed, rate)
+
+def format_result(result):
+    """Returns a tab-separated output line for a Classification."""
+    fields = [result.index, result.puzzle, result.status]
+    if result.detail is not None:
+        fields.append(result.detail)
+    return "\t".join(str(field) for field in fields)
@@ -0,0 +1,211 @@
+"""Command-line tools for the Sudoku solver.
+
+Usage:
+    python cli.py solve [FILE] [--workers N] [--chunk-size N] [--unordered]
+                        [--max-nodes N] [--timeout SECONDS]
+    python cli.py generate [--count N] [--difficulty LEVEL] [--workers N]
+                           [--seed SEED]
+    python cli.py convert INPUT OUTPUT
+    python cli.py classify [FILE] [--workers N] [--chunk-size N] [--unordered]
+                           [--max-nodes N] [--timeout SECONDS] [--summary-only]
+
+Puzzles are read one per line from FILE, or from standard input if FILE
+is missing or '-'. Each result is written to standard output as soon as
+it is ready, as tab-separated fields:
+    line number, puzzle, "solved" or "error", solution or error message
+FILE may also be a binary puzzle file (see puzzlefile.py), whose
+puzzles are numbered from 1 in place of line numbers.
+A throughput summary is written to standard error at the end.
+
+generate writes puzzles with unique solutions, one per line, as they are
+made, in the same format that solve reads.
+
+classify reads puzzles as solve does, and writes each one's class
+(malformed, duplicates, no_solution, multiple_solutions, unique, or
+search_limit) in place of "solved" or "error", followed by the error
+message for malformed and search_limit puzzles. It does only the work
+each class needs, and counts solutions without building them.
+
+convert turns a file of puzzle strings, one per line, into a binary
+puzzle file, or a binary puzzle file back into puzzle strings.
+"""
+import argparse
+import multiprocessing
+import sys
+import time
+import bulk
+import classify
+import generator
+import propagation
+import puzzlefile
+import solver
+
+def _open_input(path):
+    if path == '-':
+        return sys.stdin
+    return open(path)
+
+def _open_puzzles(path):
+    """Opens a text or binary puzzle file, for reading with _read_puzzles."""
+    if path != '-' and puzzlefile.is_puzzle_file(path):
+        return puzzlefile.PuzzleFile(path)
+    return _open_input(path)
+
+def _read_puzzles(source):
+    if isinstance(source, puzzlefile.PuzzleFile):
+        return source.items()
+    return bulk.read_puzzles(source)
+
+def _solve(args):
+    summary = bulk.Summary()
+    with _open_puzzles(args.file) as source:
+        results = bulk.solve_stream(_read_puzzles(source), args.workers,
+                                    args.chunk_size, not args.unordered,
+                                    args.engine, (args.max_nodes, args.timeout),
+                                    args.tie_break)
+        for result in results:
+            summary.add(result)
+            sys.stdout.write(bulk.format_result(result) + "\n")
+            sys.stdout.flush()
+    sys.stderr.write(summary.report() + "\n")
+    return 0
+
+def _classify(args):
+    summary = classify.Summary()
+    with _open_puzzles(args.file) as source:
+        results = classify.classify_stream(_read_puzzles(source), args.workers,
+                                           args.chunk_size, not args.unordered,
+                                           args.engine, (args.max_nodes, args.timeout))
+        for result in results:
+            summary.add(result)
+            if not args.summary_only:
+                sys.stdout.write(classify.format_result(result) + "\n")
+                sys.stdout.flush()
+    sys.stderr.write(summary.report() + "\n")
+    return 0
+
+def _generate(args):
+    start = time.time()
+    puzzles = generator.generate(args.count, args.difficulty, args.workers,
+                                 args.seed, args.engine)
+    made = 0
+    for made, result in enumerate(puzzles, 1):
+        sys.stdout.write(result.puzzle + "\n")
+        sys.stdout.flush()
+    elapsed = time.time() - start
+    sys.stderr.write("{} {} puzzles in {:.2f}s, {:.1f} puzzles/s\n".format(
+        made, args.difficulty, elapsed, made / elapsed if elapsed else 0.0))
+    return 0
+
+def _convert(args):
+    start = time.time()
+    source = _open_puzzles(args.input)
+    if isinstance(source, puzzlefile.PuzzleFile):
+        with source, open(args.output, 'w') as output:
+            for puzzle in source:
+                output.write(puzzle + "\n")
+            count = len(source)
+    else:
+        # Line number of the puzzle being written, for errors
+        line = [0]
+        def puzzles():
+            for line[0], puzzle in bulk.read_puzzles(source):
+                yield puzzle
+        with source:
+            try:
+                count = puzzlefile.write_puzzles(args.output, puzzles())
+            except ValueError as e:
+                sys.stderr.write("{}:{}: {}\n".format(args.input, line[0], e))
+                return 1
+    elapsed = time.time() - start
+    sys.stderr.write("{} puzzles in {:.2f}s\n".format(count, elapsed))
+    return 0
+
+def _positive(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError("{} is not a positive integer".format(value))
+    return number
+
+def _parser():
+    parser = argparse.ArgumentParser(description="Sudoku solver tools.")
+    commands = parser.add_subparsers(dest='command')
+    solve = commands.add_parser('solve', help="Solve puzzles, one per line.")
+    solve.add_argument('file', nargs='?', default='-',
+                       help="File of puzzle strings, or - for standard input.")
+    solve.add_argument('--workers', type=_positive,
+                       default=multiprocessing.cpu_count(),
+                       help="Number of worker processes (default: one per CPU).")
+    solve.add_argument('--chunk-size', type=_positive, default=16,
+                       help="Puzzles sent to a worker at a time (default: 16).")
+    solve.add_argument('--unordered', action='store_true',
+                       help="Write results as they finish instead of in input order.")
+    solve.add_argument('--engine', choices=sorted(solver.ENGINES),
+                       default=solver.DEFAULT_ENGINE,
+                       help="Search engine (default: %(default)s).")
+    solve.add_argument('--tie-break', choices=propagation.TIE_BREAKS,
+                       default='any',
+                       help="How the backtrack engine picks between equally "
+                            "constrained cells (default: %(default)s).")
+    solve.add_argument('--max-nodes', type=_positive,
+                       help="Search nodes allowed for each puzzle (default: no limit).")
+    solve.add_argument('--timeout', type=float,
+                       help="Seconds allowed for each puzzle (default: no limit).")
+    solve.set_defaults(run=_solve)
+    classify_parser = commands.add_parser(
+        'classify', help="Classify puzzles without solving them.")
+    classify_parser.add_argument('file', nargs='?', default='-',
+                                 help="File of puzzle strings or binary puzzle "
+                                      "file, or - for standard input.")
+    classify_parser.add_argument('--workers', type=_positive,
+                                 default=multiprocessing.cpu_count(),
+                                 help="Number of worker processes (default: one per CPU).")
+    classify_parser.add_argument('--chunk-size', type=_positive, default=64,
+                                 help="Puzzles sent to a worker at a time (default: 64).")
+    classify_parser.add_argument('--unordered', action='store_true',
+                                 help="Write results as they finish instead of "
+                                      "in input order.")
+    classify_parser.add_argument('--engine', choices=sorted(solver.ENGINES),
+                                 default=solver.DEFAULT_ENGINE,
+                                 help="Search engine (default: %(default)s).")
+    classify_parser.add_argument('--max-nodes', type=_positive,
+                                 help="Search nodes allowed for each puzzle "
+                                      "(default: no limit).")
+    classify_parser.add_argument('--timeout', type=float,
+                                 help="Seconds allowed for each puzzle (default: no limit).")
+    classify_parser.add_argument('--summary-only', action='store_true',
+                                 help="Write only the summary, to standard error.")
+    classify_parser.set_defaults(run=_classify)
+    generate = commands.add_parser('generate',
+                                   help="Generate puzzles with unique solutions.")
+    generate.add_argument('--count', type=_positive, default=1,
+                          help="Number of puzzles to generate (default: 1).")
+    generate.add_argument('--difficulty', choices=generator.DIFFICULTIES,
+                          default='medium',
+                          help="Difficulty of the puzzles (default: %(default)s).")
+    generate.add_argument('--workers', type=_positive,
+                          default=multiprocessing.cpu_count(),
+                          help="Number of worker processes (default: one per CPU).")
+    generate.add_argument('--seed',
+                          help="Seed for a reproducible run (default: random).")
+    generate.add_argument('--engine', choices=sorted(solver.ENGINES),
+                          default=solver.DEFAULT_ENGINE,
+                          help="Search engine for uniqueness checks "
+                               "(default: %(default)s).")
+    generate.set_defaults(run=_generate)
+    convert = commands.add_parser('convert',
+                                  help="Convert between puzzle strings and a "
+                                       "binary puzzle file.")
+    convert.add_argument('input',
+                         help="Binary puzzle file, or file of puzzle strings "
+                              "(- for standard input).")
+    convert.add_argument('output', help="File to write.")
+    convert.set_defaults(run=_convert)
+    return parser
+
+def main(argv=None):
+    args = _parser().parse_args(argv)
+    return args.run(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
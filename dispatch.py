@@ -0,0 +1,102 @@
+"""Hands single-puzzle solves from request threads to a process pool.
+
+A Dispatcher keeps one pool of worker processes for the app, so a hard
+puzzle ties up a worker process rather than a request thread holding
+the GIL. The request thread waits on the result without using the CPU.
+
+Identical puzzles that are already being solved are merged: the later
+requests wait on the solve that is in flight rather than starting one
+of their own. To bound the backlog, a Dispatcher takes only so many
+distinct puzzles at once and raises Busy for any more, which the app
+answers with status 503.
+"""
+import multiprocessing
+import threading
+import bulk
+
+class Busy(Exception):
+    """Raised when a Dispatcher already has as many solves as it can take."""
+
+BUSY = "The server is busy. Please try again soon."
+
+class Dispatcher(object):
+    """Solves puzzles on a shared pool of processes, merging duplicates.
+
+    The methods are thread safe.
+    """
+
+    def __init__(self, workers, max_pending, engine=None, tie_break='any'):
+        """Creates a dispatcher. The pool is started on first use.
+
+        Args:
+            workers: The number of worker processes.
+            max_pending: The number of distinct puzzles that may be queued
+                or solving at once.
+            engine: The name of the solver engine, or None for the default.
+            tie_break: How the backtrack engine chooses between equally
+                constrained cells, one of propagation.TIE_BREAKS.
+        """
+        self.workers = workers
+        self.max_pending = max_pending
+        self.engine = engine
+        self.tie_break = tie_break
+        self.merged = 0
+        self.rejected = 0
+        # Puzzle string -> AsyncResult of its solve
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = multiprocessing.Pool(self.workers)
+        return self._pool
+
+    def solve(self, puzzle, limits=None):
+        """Returns (solution string, error message) for a puzzle string.
+
+        If the same puzzle is already being solved, this waits for that
+        solve's result, whatever its limits.
+
+        Args:
+            puzzle: A complete puzzle string for board.board_from_string.
+            limits: A (max_nodes, timeout) pair limiting the search, as
+                for solver.SearchBudget, or None for no limits.
+
+        Raises:
+            Busy: max_pending puzzles are already in flight.
+        """
+        with self._lock:
+            result = self._in_flight.get(puzzle)
+            owner = result is None
+            if owner:
+                if len(self._in_flight) >= self.max_pending:
+                    self.rejected += 1
+                    raise Busy(BUSY)
+                result = self._get_pool().apply_async(
+                    bulk.solve_item, [(0, puzzle, self.engine, limits, self.tie_break)])
+                self._in_flight[puzzle] = result
+            else:
+                self.merged += 1
+        try:
+            solved = result.get()
+        finally:
+            if owner:
+                with self._lock:
+                    del self._in_flight[puzzle]
+        return solved.solution, solved.error
+
+    def stats(self):
+        """Returns a dictionary of the dispatcher's counters."""
+        with self._lock:
+            return {'workers': self.workers, 'max_pending': self.max_pending,
+                    'pending': len(self._in_flight), 'merged': self.merged,
+                    'rejected': self.rejected}
+
+    def close(self):
+        """Stops the worker processes."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.terminate()
+            pool.join()
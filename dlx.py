@@ -0,0 +1,209 @@
+"""Exact cover solver for Sudoku boards using Dancing Links (Algorithm X).
+
+A Sudoku solution is an exact cover of four kinds of constraints: every
+cell holds one number, and every number appears once in each row,
+column, and box. Each possible move (row, column, number) covers one
+constraint of each kind. The constraints are the columns of a sparse
+0/1 matrix, the moves are its rows, and the matrix is stored as circular
+doubly-linked lists in flat integer arrays so that removing and
+restoring a column during the search is a few list assignments.
+"""
+import time
+
+# Constraint kinds, numbered in the order their keys are offset: the
+#   constraints of a board with C cells are numbered kind * C + offset
+_CELL = 0
+_ROW = 1
+_COL = 2
+_BOX = 3
+
+class _DancingLinks(object):
+    """The exact cover matrix for the empty positions of one board.
+
+    Only the moves that are valid on the board are added as rows, and
+    only the constraints that the board's numbers don't already satisfy
+    are added as columns.
+    """
+
+    def __init__(self, board):
+        # Node 0 is the root; column headers come next, then the move nodes.
+        # left, right, up, and down link the nodes of the matrix,
+        #   column holds each node's column header, and size holds the
+        #   number of nodes remaining in each column.
+        geometry = board.geometry
+        size, count = geometry.size, geometry.cells
+        constraints = {}
+        moves = []
+        for cell, number in enumerate(board.cells):
+            if number:
+                continue
+            for number in geometry.mask_digits[board.candidate_mask_at(cell)]:
+                keys = (_CELL * count + cell,
+                        _ROW * count + geometry.cell_row[cell] * size + number - 1,
+                        _COL * count + geometry.cell_col[cell] * size + number - 1,
+                        _BOX * count + geometry.cell_box[cell] * size + number - 1)
+                for key in keys:
+                    if key not in constraints:
+                        constraints[key] = len(constraints) + 1
+                moves.append(((cell, number),
+                              [constraints[key] for key in keys]))
+        # Every empty cell needs a cell constraint, even with no moves left
+        for cell, number in enumerate(board.cells):
+            if not number and _CELL * count + cell not in constraints:
+                constraints[_CELL * count + cell] = len(constraints) + 1
+        headers = len(constraints) + 1
+        self.left = [i - 1 for i in xrange(headers)]
+        self.right = [i + 1 for i in xrange(headers)]
+        self.left[0] = headers - 1
+        self.right[headers - 1] = 0
+        self.up = range(headers)
+        self.down = range(headers)
+        self.column = range(headers)
+        self.size = [0] * headers
+        # The move each node belongs to
+        self.moves = [None] * headers
+        for move, columns in moves:
+            first = len(self.column)
+            for offset, col in enumerate(columns):
+                node = first + offset
+                self.left.append(first + (offset - 1) % len(columns))
+                self.right.append(first + (offset + 1) % len(columns))
+                # Add the node to the bottom of its column
+                self.up.append(self.up[col])
+                self.down.append(col)
+                self.down[self.up[col]] = node
+                self.up[col] = node
+                self.column.append(col)
+                self.size[col] += 1
+                self.moves.append(move)
+
+    def _cover(self, col):
+        """Removes col and every row that satisfies it from the matrix."""
+        left, right, up, down = self.left, self.right, self.up, self.down
+        column, size = self.column, self.size
+        right[left[col]] = right[col]
+        left[right[col]] = left[col]
+        i = down[col]
+        while i != col:
+            j = right[i]
+            while j != i:
+                down[up[j]] = down[j]
+                up[down[j]] = up[j]
+                size[column[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def _uncover(self, col):
+        """Restores col after a call to _cover, in reverse order."""
+        left, right, up, down = self.left, self.right, self.up, self.down
+        column, size = self.column, self.size
+        i = up[col]
+        while i != col:
+            j = left[i]
+            while j != i:
+                size[column[j]] += 1
+                down[up[j]] = j
+                up[down[j]] = j
+                j = left[j]
+            i = up[i]
+        right[left[col]] = col
+        left[right[col]] = col
+
+    def search(self, limit, record, chosen, budget=None, stats=None):
+        """Counts exact covers of the matrix, stopping at limit.
+
+        chosen is the list of move nodes picked so far; each cover found
+        is passed to record as that list. budget.spend is called for each
+        node of the search, if there is a budget, and node and guess
+        counts are added to stats, if given.
+        """
+        if budget is not None:
+            budget.spend()
+        if stats is not None:
+            stats.nodes += 1
+            stats.max_depth = max(stats.max_depth, len(chosen))
+        right, down, column, size = self.right, self.down, self.column, self.size
+        if right[0] == 0:
+            record(chosen)
+            return 1
+        # Choose the column with the fewest remaining rows
+        col = right[0]
+        best = col
+        while col != 0:
+            if size[col] < size[best]:
+                best = col
+            col = right[col]
+        if not size[best]:
+            # Unsatisfiable constraint
+            return 0
+        self._cover(best)
+        solutions = 0
+        node = down[best]
+        while node != best:
+            chosen.append(node)
+            j = right[node]
+            while j != node:
+                self._cover(column[j])
+                j = right[j]
+            found = self.search(limit - solutions, record, chosen, budget, stats)
+            solutions += found
+            if stats is not None:
+                stats.guessed += 1
+                if not found:
+                    stats.backtracks += 1
+            j = self.left[node]
+            while j != node:
+                self._uncover(column[j])
+                j = self.left[j]
+            chosen.pop()
+            if solutions >= limit:
+                break
+            node = down[node]
+        self._uncover(best)
+        return solutions
+
+def search(board, limit, record, budget=None, stats=None, tie_break=None):
+    """Counts solutions for this board with Dancing Links, stopping at limit.
+
+    Each solution is played onto board, passed to record, and then
+    cleared, so record must copy the board if it keeps it.
+    The board is left as it was passed in.
+
+    Args:
+        board: The Board to search. It must not have duplicate values.
+        limit: The positive integer number of solutions after which to
+            stop searching.
+        record: A function called with each solved board.
+        budget: A solver.SearchBudget limiting the search, or None.
+        stats: A solver.SolveStats to add this search's stats to, or None.
+        tie_break: Ignored. It is accepted so that every engine takes
+            the same arguments; the search picks columns, not cells.
+
+    Returns:
+        The number of solutions found, which is at most limit.
+
+    Raises:
+        solver.SearchLimitExceeded: The search used up budget. The board
+            is only changed while record runs, so it is left as it was.
+    """
+    if stats is not None:
+        started = time.time()
+    matrix = _DancingLinks(board)
+    if stats is not None:
+        stats.candidate_calls += sum(1 for number in board.cells if not number)
+        searching = time.time()
+        stats.phase_times['setup'] += searching - started
+
+    def record_cover(chosen):
+        moves = [matrix.moves[node] for node in chosen]
+        for cell, number in moves:
+            board.place_at(cell, number)
+        record(board)
+        for cell, _ in moves:
+            board.clear_at(cell)
+
+    try:
+        return matrix.search(limit, record_cover, [], budget, stats)
+    finally:
+        if stats is not None:
+            stats.phase_times['search'] += time.time() - searching
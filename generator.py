@@ -0,0 +1,160 @@
+"""Generates puzzles with unique solutions at a target difficulty.
+
+Each puzzle starts from a full grid built by a search that tries
+candidates in random order. Clues are then removed one at a time in
+random order, and a removal is kept only if the puzzle still has one
+solution and is no harder than the target. Since the full grid is a
+known solution, uniqueness only needs a search for a solution with a
+different number in the emptied cell, which stops at the first one.
+
+Difficulty is graded by what propagation needs to solve the puzzle:
+    easy: Naked and hidden singles alone.
+    medium: Pairs, pointing, or claiming as well as singles.
+    hard: Propagation alone can't finish, so the solver has to guess.
+
+Every puzzle gets its own random seed, derived from the run's seed and
+the puzzle's index, so a seeded run gives the same puzzles in the same
+order however many processes generate them.
+"""
+from collections import namedtuple
+import hashlib
+import random
+from board import BOARD_SIZE, Board
+import bulk
+from propagation import Propagator
+import solver
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
+
+# One generated puzzle. index counts puzzles from 0, and clues is the
+#   number of filled cells in puzzle.
+GeneratedPuzzle = namedtuple('GeneratedPuzzle',
+                             'index puzzle solution difficulty clues')
+
+# Rules that propagation may use in an easy puzzle
+_SINGLES = frozenset(['naked_single', 'hidden_single'])
+
+def random_grid(rng, board_class=Board):
+    """Returns a full, valid Board built with candidates tried in random order.
+
+    Args:
+        rng: A random.Random to draw from.
+        board_class: The class of board to fill, such as board.Board16.
+    """
+    board = board_class.from_string("0" * board_class.geometry.cells)
+    _random_fill(Propagator(board), rng)
+    return board
+
+def _random_fill(propagator, rng):
+    """Fills the propagator's board, returning False if it can't be filled."""
+    if not propagator.propagate():
+        return False
+    cell = propagator.most_constrained()
+    if cell is None:
+        return True
+    options = list(propagator.mask_digits[propagator.candidates[cell]])
+    rng.shuffle(options)
+    for option in options:
+        mark = propagator.mark()
+        if propagator.assign(cell, option) and _random_fill(propagator, rng):
+            return True
+        propagator.undo(mark)
+    return False
+
+def grade(board):
+    """Returns the difficulty of a board with a unique solution.
+
+    The board is left as it was passed in.
+    """
+    propagator = Propagator(board)
+    try:
+        if not propagator.propagate() or propagator.empty_cells():
+            return 'hard'
+        if set(propagator.counts) <= _SINGLES:
+            return 'easy'
+        return 'medium'
+    finally:
+        propagator.undo(0)
+
+def _only_solution(board, cell, number, engine):
+    """Returns True if number is the only way to fill the emptied cell.
+
+    board must have a solution with number in cell, which is empty.
+    """
+    for other in board.geometry.mask_digits[board.candidate_mask_at(cell)]:
+        if other == number:
+            continue
+        board.place_at(cell, other)
+        try:
+            if solver.search(board, 1, engine).count:
+                return False
+        finally:
+            board.clear_at(cell)
+    return True
+
+def make_puzzle(rng, difficulty='hard', engine=None):
+    """Returns (puzzle string, solution string) for one puzzle.
+
+    Clues are removed until no more can go without losing uniqueness or
+    making the puzzle harder than difficulty. The result can still be
+    easier than difficulty; generate retries until it isn't.
+    """
+    limit = DIFFICULTIES.index(difficulty)
+    board = random_grid(rng)
+    solution = board.to_puzzle_string()
+    cells = range(BOARD_SIZE * BOARD_SIZE)
+    rng.shuffle(cells)
+    for cell in cells:
+        number = board.cells[cell]
+        board.clear_at(cell)
+        if (not _only_solution(board, cell, number, engine) or
+                DIFFICULTIES.index(grade(board)) > limit):
+            board.place_at(cell, number)
+    return board.to_puzzle_string(), solution
+
+def generate_one(task):
+    """Generates the puzzle for one (index, seed, difficulty, engine) task.
+
+    The puzzle's random seed comes from the run's seed and its index.
+    """
+    index, seed, difficulty, engine = task
+    # Python 2 seeds from a string with hash(), which varies with
+    #   PYTHONHASHSEED and word size, so seed with an integer digest
+    key = "{}:{}".format(seed, index)
+    rng = random.Random(int(hashlib.sha256(key).hexdigest(), 16))
+    while True:
+        puzzle, solution = make_puzzle(rng, difficulty, engine)
+        if grade(Board.from_string(puzzle)) == difficulty:
+            return GeneratedPuzzle(index, puzzle, solution, difficulty,
+                                   BOARD_SIZE * BOARD_SIZE - puzzle.count("0"))
+
+def generate(count, difficulty='hard', workers=1, seed=None, engine=None):
+    """Yields count GeneratedPuzzles in index order as they are made.
+
+    Args:
+        count: The number of puzzles to make, or None to go on forever.
+        difficulty: One of DIFFICULTIES.
+        workers: The number of worker processes. With 1, puzzles are
+            made in this process.
+        seed: A value that makes the run reproducible, or None for a
+            random run.
+        engine: The name of the solver engine for uniqueness checks,
+            or None for the default.
+
+    Raises:
+        ValueError: difficulty is not one of DIFFICULTIES.
+    """
+    if difficulty not in DIFFICULTIES:
+        raise ValueError("Difficulty must be one of: " + ", ".join(DIFFICULTIES))
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(64)
+    indexes = xrange(count) if count is not None else _count()
+    tasks = ((index, seed, difficulty, engine) for index in indexes)
+    for result in bulk.map_stream(generate_one, tasks, workers, 1, True):
+        yield result
+
+def _count():
+    index = 0
+    while True:
+        yield index
+        index += 1
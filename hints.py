@@ -0,0 +1,226 @@
+"""Step-by-step hints for a puzzle that someone is solving by hand.
+
+A HintSession keeps a Propagator for the puzzle between requests. The
+numbers the solver places are played on it as they come, and each hint
+makes the next single deduction from the candidates left by the ones
+before, so nothing is solved again from scratch. When the rules can't
+make progress, a hint reveals the solution's number for the cell with
+the fewest candidates.
+
+Sessions are kept in a SessionStore, which drops the least recently
+used ones when full.
+"""
+from collections import OrderedDict, namedtuple
+import threading
+import time
+import uuid
+from board import board_from_string
+from propagation import Propagator
+
+# One deduction. technique is a rule name from propagation.RULES, or
+#   REVEAL; unit names the row, column, or box it was found in, or is
+#   None. placements is a list of (row, column, number), and eliminations
+#   a list of (row, column, numbers removed from the cell's candidates).
+Hint = namedtuple('Hint', 'technique unit placements eliminations')
+
+# Technique for a hint that reveals a number from the solution
+REVEAL = 'reveal'
+
+WRONG_MOVES = ("The puzzle can't be solved from here, because some of the "
+               "numbers placed are wrong.")
+
+class HintSession(object):
+    """The candidate state of one puzzle as it is solved by hand.
+
+    Methods are not thread safe; hold lock around each use.
+    """
+
+    def __init__(self, puzzle, solution):
+        """Starts a session.
+
+        Args:
+            puzzle: The puzzle string, which must have no duplicate values.
+            solution: The puzzle's solution string.
+        """
+        self.puzzle = puzzle
+        self.solution = solution
+        self.lock = threading.Lock()
+        # Numbers placed since the start, by hand or by hints, as
+        #   (cell, number) in order
+        self.moves = []
+        self._start()
+
+    def _start(self):
+        board = board_from_string(self.puzzle)
+        for cell, number in self.moves:
+            board.place_at(cell, number)
+        self.propagator = Propagator(board)
+        # Whether the moves are known to leave no solution. The
+        #   propagator has dropped its queue by then, so no more hints
+        #   are given until a move is taken back.
+        self._contradiction = False
+
+    @property
+    def board(self):
+        """The Board with the puzzle's numbers and every number placed since."""
+        return self.propagator.board
+
+    def solved(self):
+        """Returns True if the board is full and matches the solution."""
+        return self.board.to_puzzle_string() == self.solution
+
+    def wrong_cells(self):
+        """Returns (row, column) for each placed number that isn't in the solution."""
+        geometry = self.board.geometry
+        return [divmod(cell, geometry.size) for cell, number in self.moves
+                if self.solution[cell] != geometry.chars[number]]
+
+    def place(self, row, column, number):
+        """Plays number at row, column, or empties the cell if number is 0.
+
+        Returns:
+            True if number is the solution's number for the cell (or 0),
+            False otherwise.
+
+        Raises:
+            ValueError: The cell is one of the puzzle's numbers, the number
+                is out of range or already in the cell's row, column, or
+                box, or the cell is already filled.
+        """
+        board = self.board
+        size = board.geometry.size
+        if not (0 <= row < size and 0 <= column < size and 0 <= number <= size):
+            raise ValueError("Row, column, and number must be in range.")
+        cell = row * size + column
+        if self.puzzle[cell] != "0":
+            raise ValueError("That cell is part of the puzzle.")
+        if not number:
+            self.moves = [move for move in self.moves if move[0] != cell]
+            self._start()
+            return True
+        if board.cells[cell]:
+            raise ValueError("That cell is already filled.")
+        if not board.candidate_mask_at(cell) & (1 << number):
+            raise ValueError("That number is already in the cell's row, column, or box.")
+        self.moves.append((cell, number))
+        if not self.propagator.assign(cell, number):
+            # Start again so the next hint sees the contradiction whole
+            self._start()
+        return self.solution[cell] == board.geometry.chars[number]
+
+    def next_hint(self):
+        """Makes the next deduction and returns it as a Hint.
+
+        Placements the hint makes are played on the board.
+
+        Returns:
+            The Hint, or None if the board is already full.
+
+        Raises:
+            ValueError: Numbers placed by hand make the puzzle unsolvable.
+                This is raised again on every later call until a number
+                is taken back.
+        """
+        propagator = self.propagator
+        if self._contradiction:
+            raise ValueError(WRONG_MOVES)
+        if not propagator.empty_cells():
+            return None
+        mark = propagator.mark()
+        deduction = propagator.step()
+        if deduction is False:
+            self._contradiction = True
+            raise ValueError(WRONG_MOVES)
+        if deduction is None:
+            return self._reveal()
+        technique, unit = deduction
+        return self._describe(technique, unit, propagator.trail[mark:])
+
+    def _reveal(self):
+        propagator = self.propagator
+        cell = propagator.most_constrained()
+        geometry = self.board.geometry
+        number = geometry.chars.index(self.solution[cell])
+        if not propagator.candidates[cell] & (1 << number):
+            # The moves have ruled out the solution's number, or every number
+            self._contradiction = True
+            raise ValueError(WRONG_MOVES)
+        mark = propagator.mark()
+        self.moves.append((cell, number))
+        propagator.assign(cell, number)
+        return self._describe(REVEAL, None, propagator.trail[mark:])
+
+    def _describe(self, technique, unit, changes):
+        """Returns a Hint for the trail entries one deduction made."""
+        geometry = self.board.geometry
+        size = geometry.size
+        placements = []
+        removed = OrderedDict()
+        for cell, old_mask, filled in changes:
+            if filled:
+                number = self.board.cells[cell]
+                placements.append(divmod(cell, size) + (number,))
+                if technique != REVEAL:
+                    self.moves.append((cell, number))
+            elif cell not in removed:
+                removed[cell] = old_mask
+        eliminations = []
+        if not placements:
+            candidates = self.propagator.candidates
+            eliminations = [divmod(cell, size) +
+                            (list(geometry.mask_digits[old_mask & ~candidates[cell]]),)
+                            for cell, old_mask in removed.iteritems()]
+        return Hint(technique, _unit_name(unit, geometry), placements, eliminations)
+
+def _unit_name(unit, geometry):
+    """Returns a name like "row 1" for a unit number, counting from 1."""
+    if unit is None:
+        return None
+    kind, number = divmod(unit, geometry.size)
+    return "{} {}".format(("row", "column", "box")[kind], number + 1)
+
+class SessionStore(object):
+    """HintSessions by id, dropping the least recently used when full."""
+
+    def __init__(self, max_size=1000, ttl=None):
+        """Creates an empty store.
+
+        Args:
+            max_size: The number of sessions to keep.
+            ttl: The number of seconds an unused session is kept, or None
+                to keep sessions until they are dropped for space.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        # Session id -> (time last used, session), oldest use first
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def add(self, session):
+        """Stores session and returns its new id."""
+        session_id = uuid.uuid4().hex
+        with self._lock:
+            self._sessions[session_id] = (time.time(), session)
+            while len(self._sessions) > self.max_size:
+                self._sessions.popitem(last=False)
+        return session_id
+
+    def get(self, session_id):
+        """Returns the session with session_id, or None if there isn't one."""
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+            if entry is None:
+                return None
+            if self.ttl is not None and time.time() - entry[0] > self.ttl:
+                return None
+            # Reinsert to mark as most recently used
+            self._sessions[session_id] = (time.time(), entry[1])
+            return entry[1]
+
+    def remove(self, session_id):
+        """Drops the session with session_id, returning True if there was one."""
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
@@ -0,0 +1,178 @@
+"""Searches one hard puzzle on several processes.
+
+bulk.solve_stream spreads many puzzles over a pool, which does nothing
+for a single puzzle that takes a long time, such as a 17-clue or nearly
+empty board. Here the top levels of one puzzle's search tree are
+expanded into independent subproblems, each a board with a few more
+cells filled, and the pool searches them. There are several times as
+many subproblems as workers, and each worker takes the next one as soon
+as it is free, so a worker that draws a quick subproblem goes on to
+take work that would otherwise wait for a busy one.
+
+As soon as the answer is settled, which is the first solution for
+fill_board and the second for count_solutions and solve, the pool is
+terminated, stopping the searches that are still running.
+
+This is opt-in: the functions here mirror the ones in solver, with a
+workers argument. They can't be used from inside another pool's worker,
+such as in bulk.solve_stream, since pool workers can't start processes.
+"""
+import multiprocessing
+import time
+from board import board_from_string
+from propagation import Propagator
+import solver
+
+# Subproblems made for each worker
+TASKS_PER_WORKER = 8
+# Levels of the search tree expanded at most, to bound the splitting
+MAX_SPLIT_DEPTH = 6
+
+def split(board, tasks, limit=None):
+    """Expands the top of board's search tree into subproblems.
+
+    Levels of the tree are expanded, each by propagating and then trying
+    every candidate of the most constrained cell, until there are at
+    least tasks subproblems, MAX_SPLIT_DEPTH levels have been expanded,
+    or limit solutions have turned up. The board is not changed.
+
+    Args:
+        board: A Board with no duplicate values.
+        tasks: The number of subproblems wanted.
+        limit: The number of solutions at which to stop, or None.
+
+    Returns:
+        A pair of lists of puzzle strings: the subproblems, whose
+        solutions together are the board's solutions not in the second
+        list, and the solutions found while expanding.
+    """
+    frontier = [board.to_puzzle_string()]
+    solved = []
+    for _ in xrange(MAX_SPLIT_DEPTH):
+        if len(frontier) >= tasks:
+            break
+        expanded = []
+        for puzzle in frontier:
+            propagator = Propagator(board_from_string(puzzle))
+            if not propagator.propagate():
+                continue
+            cell = propagator.most_constrained()
+            if cell is None:
+                solved.append(propagator.board.to_puzzle_string())
+                if limit is not None and len(solved) >= limit:
+                    return [], solved
+                continue
+            for option in propagator.mask_digits[propagator.candidates[cell]]:
+                mark = propagator.mark()
+                if propagator.assign(cell, option):
+                    expanded.append(propagator.board.to_puzzle_string())
+                propagator.undo(mark)
+        frontier = expanded
+    return frontier, solved
+
+def search_task(task):
+    """Searches one (puzzle, limit, engine, max_nodes, deadline) subproblem.
+
+    deadline is a time.time() value, or None.
+
+    Returns:
+        A (number of solutions, first solution string or None, error
+        message or None) tuple, where the error is that of a
+        SearchLimitExceeded.
+    """
+    puzzle, limit, engine, max_nodes, deadline = task
+    timeout = None if deadline is None else deadline - time.time()
+    budget = solver.SearchBudget(max_nodes, timeout)
+    try:
+        result = solver.search(board_from_string(puzzle), limit, engine, budget)
+    except solver.SearchLimitExceeded as e:
+        return 0, None, str(e)
+    solution = result.solution
+    return (result.count, solution and solution.to_puzzle_string(), None)
+
+def search(board, limit=2, workers=None, engine=None, limits=None):
+    """Searches for solutions to board on workers processes, as solver.search.
+
+    Solutions come from whichever subproblem finishes first, so with
+    several solutions, the one found may differ from solver.search's.
+
+    Args:
+        board: The Board to search. It must not have duplicate values,
+            and is not changed.
+        limit: The number of solutions after which to stop.
+        workers: The number of worker processes, or None for one per
+            CPU. With 1, the search runs in this process.
+        engine: The name of the solver engine, or None for the default.
+        limits: A (max_nodes, timeout) pair, or None for no limits. The
+            timeout covers the whole search, and max_nodes applies to
+            each subproblem.
+
+    Returns:
+        A solver.SearchResult, whose stats are None.
+
+    Raises:
+        SearchLimitExceeded: A subproblem used up its budget before the
+            answer was settled.
+    """
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    max_nodes, timeout = limits or (None, None)
+    if workers <= 1:
+        result = solver.search(board, limit, engine,
+                               solver.SearchBudget(max_nodes, timeout))
+        return solver.SearchResult(result.solution, result.count, None)
+    deadline = None if timeout is None else time.time() + timeout
+    subproblems, solved = split(board, workers * TASKS_PER_WORKER, limit)
+    count = len(solved)
+    first = solved[0] if solved else None
+    if count < limit and subproblems:
+        tasks = [(puzzle, limit - count, engine, max_nodes, deadline)
+                 for puzzle in subproblems]
+        pool = multiprocessing.Pool(workers)
+        try:
+            for found, solution, error in pool.imap_unordered(search_task, tasks):
+                if error is not None:
+                    raise solver.SearchLimitExceeded(error)
+                count += found
+                if first is None:
+                    first = solution
+                if count >= limit:
+                    break
+            pool.close()
+        finally:
+            # Stops any searches still running once the answer is settled
+            pool.terminate()
+            pool.join()
+    solution = None if first is None else board_from_string(first)
+    return solver.SearchResult(solution, min(count, limit), None)
+
+def fill_board(board, workers=None, engine=None, limits=None):
+    """Returns a solved copy of board, or None, as solver.fill_board.
+
+    The search stops as soon as any worker finds a solution.
+    """
+    return search(board, 1, workers, engine, limits).solution
+
+def count_solutions(board, workers=None, engine=None, limits=None):
+    """Returns 0, 1, or 2 for the solutions of board, as solver.count_solutions.
+
+    The search stops as soon as a second solution is found.
+    """
+    return search(board, 2, workers, engine, limits).count
+
+def solve(board, workers=None, engine=None, limits=None):
+    """Solves board on workers processes, with solver.solve's checks and errors.
+
+    Raises:
+        ValueError: The board has duplicate values in a row, column, or
+            box, or it does not have exactly one solution.
+        SearchLimitExceeded: The search used up its limits.
+    """
+    if not board._is_valid_board():
+        raise ValueError(solver.DUPLICATE_VALUES)
+    result = search(board, 2, workers, engine, limits)
+    if not result.count:
+        raise ValueError(solver.NO_SOLUTION)
+    elif result.count > 1:
+        raise ValueError(solver.MULTIPLE_SOLUTIONS)
+    return result.solution
@@ -0,0 +1,385 @@
+"""Constraint propagation for Sudoku boards.
+
+A Propagator keeps the remaining candidates for every empty cell of a
+board as a digit mask and applies logical rules until none of them can
+make progress. Each change is queued by the units (rows, columns, and
+boxes) it affects, so a rule only looks again at the units that changed.
+
+The rules are:
+    naked_single: A cell has only one candidate left.
+    hidden_single: A digit has only one place left in a unit.
+    naked_pair: Two cells in a unit have the same two candidates, so no
+        other cell in the unit can hold either of them.
+    hidden_pair: Two digits have the same two places left in a unit, so
+        those cells can't hold any other digit.
+    pointing: A digit's places in a box all lie in one row or column, so
+        it can't go anywhere else in that row or column.
+    claiming: A digit's places in a row or column all lie in one box, so
+        it can't go anywhere else in that box.
+
+Every change is recorded on a trail, so a search can try a move and
+undo everything that followed from it.
+
+Empty cells are also kept in buckets by their number of candidates,
+updated with every change and undo, so the search can find a most
+constrained cell without looking at every empty cell. Ties between the
+cells in the lowest bucket are broken by one of TIE_BREAKS:
+    any: Whichever cell the bucket gives first, which is the quickest.
+    first: The cell with the lowest number, as in reading order.
+    degree: The cell with the most empty peers, whose choice constrains
+        the most other cells.
+"""
+from collections import Counter, deque
+
+RULES = ('naked_single', 'hidden_single', 'naked_pair', 'hidden_pair',
+         'pointing', 'claiming')
+
+TIE_BREAKS = ('any', 'first', 'degree')
+
+class Propagator(object):
+    """Candidate state for a board, updated by propagation and undone by trail.
+
+    Moves made through the Propagator are also played on its board, so
+    the board should not be changed in any other way while in use.
+    The board's geometry supplies the lookup tables, so any board size
+    works; the tables are bound to the Propagator so the hot methods
+    look them up as cheaply as module globals.
+    """
+
+    def __init__(self, board, tie_break='any'):
+        """Builds the candidates for board and queues every unit.
+
+        Args:
+            board: The Board to propagate. It must not have duplicate values.
+            tie_break: How most_constrained chooses between cells with
+                the same number of candidates, one of TIE_BREAKS.
+
+        Raises:
+            ValueError: tie_break is not one of TIE_BREAKS.
+        """
+        if tie_break not in TIE_BREAKS:
+            raise ValueError("Tie break must be one of: " + ", ".join(TIE_BREAKS))
+        self.board = board
+        self.tie_break = tie_break
+        geometry = board.geometry
+        self.size = geometry.size
+        self.mask_digits = geometry.mask_digits
+        self.popcount = popcount = geometry.popcount
+        self._all_digits = geometry.all_digits
+        self._units = geometry.units
+        self._cell_units = geometry.cell_units
+        self._peers = geometry.peers
+        self._box_unit_start = geometry.box_unit_start
+        # Candidate mask for each cell, which is 0 once the cell is filled
+        self.candidates = [0] * geometry.cells
+        # Entries of (cell, old candidate mask, whether the cell was filled)
+        self.trail = []
+        # Number of times each rule made progress
+        self.counts = Counter()
+        self._singles = []
+        self._queue = deque()
+        self._queued = [False] * len(self._units)
+        # Sets of the empty cells with each number of candidates
+        self._buckets = buckets = [set() for _ in xrange(self.size + 1)]
+        for cell in xrange(geometry.cells):
+            if not board.cells[cell]:
+                mask = board.candidate_mask_at(cell)
+                self.candidates[cell] = mask
+                buckets[popcount[mask]].add(cell)
+                if popcount[mask] <= 1:
+                    self._singles.append(cell)
+        for unit in xrange(len(self._units)):
+            self._enqueue(unit)
+
+    def mark(self):
+        """Returns a position on the trail to pass to undo later."""
+        return len(self.trail)
+
+    def undo(self, mark):
+        """Takes back every change made since mark was returned."""
+        candidates, trail = self.candidates, self.trail
+        buckets, popcount = self._buckets, self.popcount
+        while len(trail) > mark:
+            cell, mask, filled = trail.pop()
+            if filled:
+                self.board.clear_at(cell)
+            else:
+                buckets[popcount[candidates[cell]]].remove(cell)
+            buckets[popcount[mask]].add(cell)
+            candidates[cell] = mask
+        self._clear_queue()
+
+    def empty_cells(self):
+        """Returns a list of the empty cell numbers."""
+        return [cell for cell, number in enumerate(self.board.cells)
+                if not number]
+
+    def most_constrained(self):
+        """Returns an empty cell with the fewest candidates, or None if solved.
+
+        Ties are broken as chosen by tie_break.
+        """
+        for bucket in self._buckets:
+            if bucket:
+                break
+        else:
+            return None
+        if self.tie_break == 'any' or len(bucket) == 1:
+            for cell in bucket:
+                return cell
+        elif self.tie_break == 'first':
+            return min(bucket)
+        candidates, peers = self.candidates, self._peers
+        return max(bucket, key=lambda cell: sum(1 for peer in peers[cell]
+                                                if candidates[peer]))
+
+    def assign(self, cell, number):
+        """Fills cell with number and removes number from its peers.
+
+        Returns:
+            False if this leaves a peer with no candidates, True otherwise.
+        """
+        old = self.candidates[cell]
+        self.trail.append((cell, old, True))
+        self._buckets[self.popcount[old]].remove(cell)
+        self.candidates[cell] = 0
+        self.board.place_at(cell, number)
+        bit = 1 << number
+        candidates = self.candidates
+        for peer in self._peers[cell]:
+            if candidates[peer] & bit and not self.eliminate(peer, bit):
+                return False
+        return True
+
+    def eliminate(self, cell, mask):
+        """Removes the digits in mask from the candidates of an empty cell.
+
+        Returns:
+            False if the cell has no candidates left, True otherwise.
+        """
+        old = self.candidates[cell]
+        remaining = old & ~mask
+        if remaining == old:
+            return True
+        self.trail.append((cell, old, False))
+        self.candidates[cell] = remaining
+        popcount, buckets = self.popcount, self._buckets
+        buckets[popcount[old]].remove(cell)
+        count = popcount[remaining]
+        buckets[count].add(cell)
+        if not count:
+            return False
+        if count == 1:
+            self._singles.append(cell)
+        for unit in self._cell_units[cell]:
+            self._enqueue(unit)
+        return True
+
+    def propagate(self):
+        """Applies the rules until none of them makes progress.
+
+        Returns:
+            False if the board was found to have no solution, True otherwise.
+        """
+        candidates = self.candidates
+        popcount, mask_digits = self.popcount, self.mask_digits
+        while self._singles or self._queue:
+            if self._singles:
+                cell = self._singles.pop()
+                mask = candidates[cell]
+                if not mask and not self._is_filled(cell):
+                    break
+                if popcount[mask] == 1:
+                    self.counts['naked_single'] += 1
+                    if not self.assign(cell, mask_digits[mask][0]):
+                        break
+                continue
+            unit = self._queue.popleft()
+            self._queued[unit] = False
+            if not self._apply_unit_rules(unit):
+                break
+        else:
+            return True
+        self._clear_queue()
+        return False
+
+    def step(self):
+        """Makes the next single deduction that propagate would make.
+
+        This is for showing the deductions one at a time; the changes it
+        made are the trail entries after a mark taken before the call.
+
+        Returns:
+            A (rule, unit) pair of the name of the rule that made the
+            deduction and the unit it was found in (None for a naked
+            single). None if no rule can make progress, and False if the
+            board was found to have no solution.
+        """
+        candidates = self.candidates
+        popcount, mask_digits = self.popcount, self.mask_digits
+        while self._singles or self._queue:
+            if self._singles:
+                cell = self._singles.pop()
+                mask = candidates[cell]
+                if not mask and not self._is_filled(cell):
+                    break
+                if popcount[mask] == 1:
+                    self.counts['naked_single'] += 1
+                    if not self.assign(cell, mask_digits[mask][0]):
+                        break
+                    return ('naked_single', None)
+                continue
+            unit = self._queue.popleft()
+            self._queued[unit] = False
+            before = self.counts.copy()
+            if not self._apply_unit_rules(unit):
+                break
+            progress = self.counts - before
+            if progress:
+                return (progress.keys()[0], unit)
+        else:
+            return None
+        self._clear_queue()
+        return False
+
+    def _is_filled(self, cell):
+        return self.board.cells[cell] != 0
+
+    def _enqueue(self, unit):
+        if not self._queued[unit]:
+            self._queued[unit] = True
+            self._queue.append(unit)
+
+    def _clear_queue(self):
+        del self._singles[:]
+        for unit in self._queue:
+            self._queued[unit] = False
+        self._queue.clear()
+
+    def _apply_unit_rules(self, unit):
+        """Makes the first deduction the rules find in unit.
+
+        A rule that makes progress re-queues unit, so that any further
+        deductions in it are found when it comes up again.
+
+        Returns:
+            False if the unit was found to have no solution, True otherwise.
+        """
+        cells = self._units[unit]
+        candidates = self.candidates
+        popcount, mask_digits = self.popcount, self.mask_digits
+        # Bit i of places[number] is set if number can go in cells[i]
+        places = [0] * (self.size + 1)
+        missing = 0
+        for i, cell in enumerate(cells):
+            mask = candidates[cell]
+            missing |= mask
+            for number in mask_digits[mask]:
+                places[number] |= 1 << i
+        if missing | self._unit_numbers(unit) != self._all_digits:
+            # Some digit has nowhere left to go
+            return False
+        pairs = []
+        for number in mask_digits[missing]:
+            count = popcount[places[number]]
+            if count == 1:
+                self.counts['hidden_single'] += 1
+                self._enqueue(unit)
+                cell = cells[places[number].bit_length() - 1]
+                return self.assign(cell, number)
+            elif count == 2:
+                pairs.append(number)
+        progress = self._naked_pair(cells)
+        if progress is None:
+            progress = self._hidden_pair(cells, places, pairs)
+        if progress is None:
+            progress = self._intersection(unit, cells, places, missing)
+        if progress is not None:
+            self._enqueue(unit)
+        return progress is not False
+
+    def _unit_numbers(self, unit):
+        """Returns the mask of numbers already placed in unit."""
+        board = self.board
+        if unit < self.size:
+            return board.row_masks[unit]
+        elif unit < self._box_unit_start:
+            return board.col_masks[unit - self.size]
+        return board.box_masks[unit - self._box_unit_start]
+
+    def _naked_pair(self, cells):
+        """Looks for two cells in the unit with the same two candidates.
+
+        Returns:
+            None if the rule made no progress, otherwise the result of
+            the eliminations it made.
+        """
+        candidates = self.candidates
+        popcount = self.popcount
+        seen = {}
+        for cell in cells:
+            mask = candidates[cell]
+            if popcount[mask] != 2:
+                continue
+            if mask not in seen:
+                seen[mask] = cell
+                continue
+            pair = (seen[mask], cell)
+            others = [other for other in cells
+                      if other not in pair and candidates[other] & mask]
+            if others:
+                self.counts['naked_pair'] += 1
+                return all(self.eliminate(other, mask) for other in others)
+        return None
+
+    def _hidden_pair(self, cells, places, numbers):
+        """Looks for two numbers with the same two places in the unit.
+
+        numbers lists the numbers that have exactly two places.
+
+        Returns:
+            None if the rule made no progress, otherwise the result of
+            the eliminations it made.
+        """
+        candidates = self.candidates
+        for i, first in enumerate(numbers):
+            for second in numbers[i + 1:]:
+                if places[first] != places[second]:
+                    continue
+                keep = (1 << first) | (1 << second)
+                pair = [cells[j] for j in xrange(self.size)
+                        if places[first] & (1 << j)]
+                if any(candidates[cell] & ~keep for cell in pair):
+                    self.counts['hidden_pair'] += 1
+                    return all(self.eliminate(cell, ~keep) for cell in pair)
+        return None
+
+    def _intersection(self, unit, cells, places, missing):
+        """Applies the pointing rule to a box, or claiming to a row or column.
+
+        Returns:
+            None if the rule made no progress, otherwise the result of
+            the eliminations it made.
+        """
+        candidates = self.candidates
+        cell_units = self._cell_units
+        positions = range(self.size)
+        if unit >= self._box_unit_start:
+            rule = 'pointing'
+            lines = [cell_units[cell][:2] for cell in cells]
+        else:
+            rule = 'claiming'
+            lines = [(cell_units[cell][2],) for cell in cells]
+        for number in self.mask_digits[missing]:
+            bit = 1 << number
+            spots = [i for i in positions if places[number] & (1 << i)]
+            for kind in xrange(len(lines[0])):
+                line = lines[spots[0]][kind]
+                if any(lines[i][kind] != line for i in spots):
+                    continue
+                others = [other for other in self._units[line]
+                          if other not in cells and candidates[other] & bit]
+                if others:
+                    self.counts[rule] += 1
+                    return all(self.eliminate(other, bit) for other in others)
+        return None
@@ -0,0 +1,155 @@
+"""A compact binary file format for large collections of 9x9 puzzles.
+
+A puzzle file is a fixed-size header followed by one fixed-size record
+for each puzzle. Each record packs the 81 cells at 4 bits a cell, two
+to a byte with the first cell in the high half, into 41 bytes; the
+last byte's low half is 0. Since every record is the same size, the
+offset of puzzle i is HEADER.size + i * RECORD_SIZE, so no separate
+offset index is stored.
+
+The header has the magic string MAGIC, the format VERSION, the record
+size, and the number of puzzles, as little-endian unsigned integers.
+
+PuzzleFile reads a file through mmap, so opening one reads nothing and
+a puzzle can be fetched from anywhere in the file without reading the
+ones before it.
+"""
+import mmap
+import struct
+from board import BOARD_SIZE
+
+MAGIC = "SDKP"
+VERSION = 1
+# Magic string, version, record size, and puzzle count
+HEADER = struct.Struct('<4sHHQ')
+
+_CELLS = BOARD_SIZE * BOARD_SIZE
+RECORD_SIZE = (_CELLS + 1) // 2
+
+# Packed byte for each pair of puzzle string characters
+_PACK = dict((a + b, chr(int(a) << 4 | int(b)))
+             for a in "0123456789" for b in "0123456789")
+# Pair of puzzle string characters for each packed byte. Halves above 9
+#   only come from a damaged file, and unpack to "?" so that
+#   Board.from_string rejects them.
+_UNPACK = [("0123456789??????"[byte >> 4] + "0123456789??????"[byte & 15])
+           for byte in xrange(256)]
+
+def pack_puzzle(puzzle):
+    """Returns the RECORD_SIZE-byte record for an 81-digit puzzle string.
+
+    Raises:
+        ValueError: puzzle is not 81 digits.
+    """
+    if len(puzzle) != _CELLS:
+        raise ValueError("Board string must be 81 characters")
+    padded = puzzle + "0"
+    try:
+        return "".join([_PACK[padded[i:i + 2]] for i in xrange(0, _CELLS + 1, 2)])
+    except KeyError:
+        raise ValueError("Board string must contain only digits")
+
+def unpack_puzzle(record):
+    """Returns the puzzle string for a record made by pack_puzzle."""
+    return "".join([_UNPACK[byte] for byte in bytearray(record)])[:_CELLS]
+
+def write_puzzles(path, puzzles):
+    """Writes puzzle strings to a new puzzle file at path.
+
+    The puzzles are written as they are read, so puzzles can be a
+    generator over any number of them.
+
+    Returns:
+        The number of puzzles written.
+
+    Raises:
+        ValueError: One of the puzzles is not an 81-digit string. The
+            file is left with the puzzles before it.
+    """
+    count = 0
+    with open(path, 'wb') as output:
+        output.write(HEADER.pack(MAGIC, VERSION, RECORD_SIZE, 0))
+        try:
+            for puzzle in puzzles:
+                output.write(pack_puzzle(puzzle))
+                count += 1
+        finally:
+            output.seek(0)
+            output.write(HEADER.pack(MAGIC, VERSION, RECORD_SIZE, count))
+    return count
+
+def is_puzzle_file(path):
+    """Returns True if the file at path starts with MAGIC."""
+    with open(path, 'rb') as data:
+        return data.read(len(MAGIC)) == MAGIC
+
+class PuzzleFile(object):
+    """Read-only, memory-mapped access to the puzzles in a puzzle file.
+
+    Puzzles are indexed from 0 like a list, and iterating gives them in
+    order. Use as a context manager, or call close when done.
+    """
+
+    def __init__(self, path):
+        """Opens the puzzle file at path.
+
+        Raises:
+            ValueError: The file is not a puzzle file this version can
+                read, or it is shorter than its header says.
+        """
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(self._map) < HEADER.size:
+                raise ValueError("Not a puzzle file")
+            magic, version, record_size, self.count = HEADER.unpack_from(self._map)
+            if magic != MAGIC:
+                raise ValueError("Not a puzzle file")
+            if version != VERSION or record_size != RECORD_SIZE:
+                raise ValueError("Unsupported puzzle file version {}".format(version))
+            if len(self._map) < HEADER.size + self.count * RECORD_SIZE:
+                raise ValueError("Puzzle file is truncated")
+        except (ValueError, EnvironmentError):
+            self.close()
+            raise
+
+    def __len__(self):
+        return self.count
+
+    def _offset(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("Puzzle index out of range")
+        return HEADER.size + index * RECORD_SIZE
+
+    def record(self, index):
+        """Returns a read-only buffer of a puzzle's record, without copying it."""
+        return buffer(self._map, self._offset(index), RECORD_SIZE)
+
+    def __getitem__(self, index):
+        """Returns the puzzle string at index."""
+        offset = self._offset(index)
+        return unpack_puzzle(self._map[offset:offset + RECORD_SIZE])
+
+    def __iter__(self):
+        data = self._map
+        for offset in xrange(HEADER.size, HEADER.size + self.count * RECORD_SIZE,
+                             RECORD_SIZE):
+            yield unpack_puzzle(data[offset:offset + RECORD_SIZE])
+
+    def items(self):
+        """Yields (1-based number, puzzle string), like bulk.read_puzzles."""
+        return enumerate(self, 1)
+
+    def close(self):
+        if getattr(self, '_map', None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,122 +1,405 @@
 from collections import namedtuple
-import copy
+import time
+from board import decode_board_string
+import dlx
+import propagation
+from propagation import Propagator
 
-# A move has a row, column, and other options to play instead
-Move = namedtuple('Move', 'row col options')
+# The result of a search has the first solved board found (or None),
+#   the number of solutions found, which stops at the search limit, and
+#   the search's SolveStats, or None if they weren't collected
+SearchResult = namedtuple('SearchResult', 'solution count stats')
+
+# Error messages raised by solve
+DUPLICATE_VALUES = "That board has duplicate values."
+NO_SOLUTION = "That board has no valid solutions."
+MULTIPLE_SOLUTIONS = "That board has more than one valid solution."
+TOO_HARD = "That board needs too much searching to solve."
+TIMED_OUT = "That board took too long to solve."
+
+class SearchLimitExceeded(Exception):
+    """Raised when a search uses up its SearchBudget.
+
+    This is not a ValueError, because it says nothing about whether the
+    board can be solved, only that the search stopped before finding out.
+    """
+
+class SearchBudget(object):
+    """Limits on the work one search may do.
+
+    Engines call spend once for each node of the search tree they visit,
+    and it raises SearchLimitExceeded as soon as either limit is passed.
+    A budget starts its clock when it is created, and is used up by
+    every search it is passed to, so make a new one for each request.
+    """
+
+    def __init__(self, max_nodes=None, timeout=None):
+        """Creates a budget.
+
+        Args:
+            max_nodes: The number of search nodes allowed, or None for
+                no limit.
+            timeout: The number of seconds allowed from now, or None for
+                no limit.
+        """
+        self.max_nodes = max_nodes
+        self.nodes = 0
+        self.deadline = None if timeout is None else time.time() + timeout
+
+    def spend(self):
+        """Counts one search node.
+
+        Raises:
+            SearchLimitExceeded: The node or time limit has been passed.
+        """
+        self.nodes += 1
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise SearchLimitExceeded(TOO_HARD)
+        if self.deadline is not None and time.time() > self.deadline:
+            raise SearchLimitExceeded(TIMED_OUT)
+
+class SolveStats(object):
+    """Counters and timings for the searches it is passed to.
+
+    Collecting stats is opt-in: pass a SolveStats to a search function,
+    or register a hook with add_stats_hook, and the engines fill it in.
+    A SolveStats passed to several searches adds them all up.
+
+    Attributes:
+        searches: The number of searches counted.
+        solutions: The number of solutions found.
+        nodes: The number of search tree nodes visited.
+        max_depth: The deepest guess in the search tree, where the root
+            is depth 0.
+        guessed: The number of cells filled by trying a candidate.
+        backtracks: The number of guesses that led to no solution.
+        propagated: The number of cells filled by propagation. The dlx
+            engine doesn't propagate, so this stays 0 for it.
+        candidate_calls: The number of cells whose candidates were read
+            from the board. Candidates are read once per empty cell
+            when a search is set up, and kept up to date from then on.
+        rules: The number of times each propagation rule made progress,
+            by name from propagation.RULES. These stay 0 for dlx.
+        phase_times: Seconds spent in each phase, by name: 'setup' builds
+            the search state, 'search' is the rest of the search, and
+            'propagate' is the part of 'search' spent in propagation.
+    """
+
+    def __init__(self):
+        self.searches = 0
+        self.solutions = 0
+        self.nodes = 0
+        self.max_depth = 0
+        self.guessed = 0
+        self.backtracks = 0
+        self.propagated = 0
+        self.candidate_calls = 0
+        self.rules = dict.fromkeys(propagation.RULES, 0)
+        self.phase_times = {'setup': 0.0, 'search': 0.0, 'propagate': 0.0}
+
+    def add(self, other):
+        """Adds the counts and times of another SolveStats to these."""
+        for name in _STATS_COUNTERS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.max_depth = max(self.max_depth, other.max_depth)
+        for rule, count in other.rules.iteritems():
+            self.rules[rule] = self.rules.get(rule, 0) + count
+        for phase, seconds in other.phase_times.iteritems():
+            self.phase_times[phase] = self.phase_times.get(phase, 0.0) + seconds
+
+    def as_dict(self):
+        """Returns the stats as a dictionary, such as for JSON output."""
+        result = dict((name, getattr(self, name)) for name in _STATS_COUNTERS)
+        result['max_depth'] = self.max_depth
+        result['rules'] = dict(self.rules)
+        result['phase_times'] = dict(self.phase_times)
+        return result
+
+# SolveStats attributes that add up across searches
+_STATS_COUNTERS = ('searches', 'solutions', 'nodes', 'guessed', 'backtracks',
+                   'propagated', 'candidate_calls')
+
+# Functions called with the SolveStats of every search, once it ends
+STATS_HOOKS = []
+
+def add_stats_hook(hook):
+    """Registers hook to be called with the SolveStats of every search.
+
+    While any hook is registered, every search collects stats, whether
+    or not its caller asked for them. Hooks run in the searching thread
+    (or worker process) as each search ends, including searches that
+    raise SearchLimitExceeded, so they should be quick, such as adding
+    the stats to a total or handing them to a metrics client.
+    """
+    STATS_HOOKS.append(hook)
+
+def remove_stats_hook(hook):
+    """Unregisters a hook added with add_stats_hook."""
+    STATS_HOOKS.remove(hook)
 
 def _find_empty_spots(board):
-    spots = []
-    for row in xrange(9):
-        spots.extend([(row, col) for col in xrange(9) if not board.board[row][col]])
-    return spots
-
-def _fill_simple(board):
-    '''Fills all the spots on the board that only have one possible move.'''
-    # Keep checking the full board as long as progress is being made
-    while True:
-        set_value = False
-        for row, col in _find_empty_spots(board):
-            remaining = board.valid_moves(row, col)
-            if not remaining:
-                # Dead-end position
-                return None
-            elif len(remaining) == 1:
-                # Make move and continue
-                board.board[row][col] = remaining.pop()
-                set_value = True
-        if not set_value:
-            # The board is valid, but no more spaces can be filled this way
-            return board
-
-def solve(board):
+    size = board.geometry.size
+    return [divmod(cell, size) for cell, number in enumerate(board.cells)
+            if not number]
+
+def _backtrack(board, limit, record, budget=None, stats=None, tie_break='any'):
+    if stats is not None:
+        started = time.time()
+    propagator = Propagator(board, tie_break)
+    if stats is not None:
+        stats.candidate_calls += len(propagator.empty_cells())
+        searching = time.time()
+        stats.phase_times['setup'] += searching - started
+    try:
+        return _search(propagator, limit, record, budget, stats)
+    finally:
+        # Put the board back if the budget ran out partway through
+        propagator.undo(0)
+        if stats is not None:
+            stats.phase_times['search'] += time.time() - searching
+            counts = propagator.counts
+            stats.propagated += counts['naked_single'] + counts['hidden_single']
+            for rule, count in counts.iteritems():
+                stats.rules[rule] += count
+
+# Search engines by name. Each takes a board, a solution limit, a
+#   function to call with each solved board, a SearchBudget or None, a
+#   SolveStats or None, and one of propagation.TIE_BREAKS for choosing
+#   between equally constrained cells (which dlx ignores), and returns
+#   the number of solutions found.
+ENGINES = {
+    'backtrack': _backtrack,
+    'dlx': dlx.search,
+}
+DEFAULT_ENGINE = 'backtrack'
+
+def _engine(name):
+    """Returns the search function for the named engine."""
+    if name is None:
+        name = DEFAULT_ENGINE
+    if name not in ENGINES:
+        raise KeyError("Unknown solver engine: {}".format(name))
+    return ENGINES[name]
+
+def _run(board, limit, record, engine, budget, stats, tie_break='any'):
+    """Runs the named engine, collecting stats if asked to or if hooked.
+
+    Returns:
+        A (number of solutions, SolveStats or None) pair.
+    """
+    search_engine = _engine(engine)
+    if stats is None and not STATS_HOOKS:
+        return search_engine(board, limit, record, budget,
+                             tie_break=tie_break), None
+    # Stats for this search alone, for the hooks
+    current = SolveStats()
+    current.searches = 1
+    try:
+        current.solutions = search_engine(board, limit, record, budget, current,
+                                          tie_break)
+        return current.solutions, current if stats is None else stats
+    finally:
+        if stats is not None:
+            stats.add(current)
+        for hook in list(STATS_HOOKS):
+            hook(current)
+
+def solve(board, engine=None, budget=None, stats=None, tie_break='any'):
     """
     Checks if board is valid, then solves if so.
 
+    A single search both finds the solution and confirms that it is
+    the only one. The board passed in is not changed.
+
+    Args:
+        board: The Board to solve.
+        engine: The name of the search engine in ENGINES to use, or None
+            for DEFAULT_ENGINE.
+        budget: A SearchBudget limiting the search, or None for no limit.
+        stats: A SolveStats to add this search's stats to, or None.
+        tie_break: How the backtrack engine chooses between cells with
+            the same number of candidates, one of propagation.TIE_BREAKS.
+
     Returns:
-        The solved board object if the board is valid and solvable.
-        If the board is valid but not solvable, returns None.
+        The solved board object if the board is valid and has exactly
+        one solution.
 
     Raises:
-        ValueError: The board has duplicate values in a row, column, or box.
+        ValueError: The board has duplicate values in a row, column, or box,
+            or it does not have exactly one solution.
+        SearchLimitExceeded: The search used up budget before finishing.
     """
-    # fill_board won't build an invalid board, so only check the initial board
+    # The search won't build an invalid board, so only check the initial board
     if not board._is_valid_board():
-        raise ValueError("That board has duplicate values.")
-    solutions = count_solutions(board)
-    if not solutions:
-        raise ValueError("That board has no valid solutions.")
-    elif solutions > 1:
-        raise ValueError("That board has more than one valid solution.")
-    return fill_board(board)
+        raise ValueError(DUPLICATE_VALUES)
+    return _solve_valid(board, engine, budget, stats, tie_break)
+
+def decode_board(board_string):
+    """Returns a Board for a puzzle string, checked for duplicates in one pass.
 
-def count_solutions(board):
+    Raises:
+        ValueError: board_string is not a valid puzzle string of any size,
+            or the board has duplicate values in a row, column, or box.
+    """
+    board, valid = decode_board_string(board_string)
+    if not valid:
+        raise ValueError(DUPLICATE_VALUES)
+    return board
+
+def solve_string(board_string, engine=None, budget=None, stats=None,
+                 tie_break='any'):
+    """Solves a puzzle string, as solve does for a Board.
+
+    The string is decoded and checked in a single pass, rather than built
+    into a Board and then checked by solve.
+
+    Returns:
+        The solved board object.
+
+    Raises:
+        ValueError: board_string is not a valid puzzle string, the board
+            has duplicate values, or it does not have exactly one solution.
+        SearchLimitExceeded: The search used up budget before finishing.
+    """
+    return _solve_valid(decode_board(board_string), engine, budget, stats,
+                        tie_break)
+
+def _solve_valid(board, engine, budget, stats, tie_break):
+    """Solves a board that has no duplicate values, as for solve."""
+    result = search(board, 2, engine, budget, stats, tie_break)
+    if not result.count:
+        raise ValueError(NO_SOLUTION)
+    elif result.count > 1:
+        raise ValueError(MULTIPLE_SOLUTIONS)
+    return result.solution
+
+def search(board, limit=2, engine=None, budget=None, stats=None,
+           tie_break='any'):
+    """
+    Searches for solutions to this board, stopping after limit are found.
+
+    The board is searched in place, and is left as it was passed in.
+
+    Args:
+        board: The Board to search. It must not have duplicate values.
+        limit: The positive integer number of solutions after which to
+            stop searching. A limit of 2 is enough to show whether a
+            board has a unique solution.
+        engine: The name of the search engine in ENGINES to use, or None
+            for DEFAULT_ENGINE.
+        budget: A SearchBudget limiting the search, or None for no limit.
+        stats: A SolveStats to add this search's stats to, or None.
+        tie_break: How the backtrack engine chooses between cells with
+            the same number of candidates, one of propagation.TIE_BREAKS.
+
+    Returns:
+        A SearchResult with a solved copy of the first solution found
+        (or None if there are no solutions), the number of solutions
+        found, which is at most limit, and the SolveStats, if any were
+        passed in or collected for a stats hook.
+
+    Raises:
+        SearchLimitExceeded: The search used up budget before finishing.
+            The board is still left as it was passed in.
+    """
+    first = []
+    def keep_first(solved):
+        if not first:
+            first.append(solved.copy())
+    count, stats = _run(board, limit, keep_first, engine, budget, stats,
+                        tie_break)
+    return SearchResult(first[0] if first else None, count, stats)
+
+def find_solutions(board, limit, engine=None, budget=None, stats=None,
+                   tie_break='any'):
+    """
+    Returns a list of up to limit solved copies of this board.
+
+    The board is searched in place, and is left as it was passed in.
+    SearchLimitExceeded is raised if the search uses up budget.
+    """
+    solutions = []
+    _run(board, limit, lambda solved: solutions.append(solved.copy()),
+         engine, budget, stats, tie_break)
+    return solutions
+
+def count_solutions(board, engine=None, budget=None, stats=None,
+                    tie_break='any'):
     """
     Counts the number of solutions for this board, up to 2.
 
     If the count is 0, the board cannot be solved from the current configuration.
 
     This function aborts counting after 2 solutions are found.
+    The board is searched in place, and is left as it was passed in.
 
     Returns:
         One of the integers 0, 1, or 2.
+
+    Raises:
+        SearchLimitExceeded: The search used up budget before finishing.
     """
-    # Fill in all single-solution positions and check for unwinnable positions
-    if not _fill_simple(board):
-        return 0 # Unwinnable position
-    for row, col in _find_empty_spots(board):
-        # Keep track of solutions from each position; there should be
-        #   multiple valid plays in different positions,
-        #   since _fill_simple handled the zero and single move cases.
-        solutions = 0
-        for move in board.valid_moves(row, col):
-            board_copy = copy.deepcopy(board)
-            # Make the move on this board, but don't keep all the changes
-            #    made by the recursive calls from here
-            board_copy.board[row][col] = move
-            if fill_board(board_copy):
-                # If it's possible to fill the board after making this move,
-                #   consider this move a valid solution
-                solutions += 1
-                if solutions >= 2:
-                    return solutions
-    # If solutions never reached more than 1, there is only one solution for the board
-    return 1
-
-# Recursive move searcher and implementer
-def fill_board(board):
+    return _run(board, 2, lambda solved: None, engine, budget, stats,
+                tie_break)[0]
+
+def fill_board(board, engine=None, budget=None, stats=None, tie_break='any'):
     """
     Fully solves the board, if possible, and returns the result.
 
+    The board is searched in place, and is left as it was passed in.
+
     Returns:
-        The solved board object if the board is solvable, None otherwise.
-    """
-    # Set a maximum value for moves remaining from a square
-    smallest_move = float("inf")
-    next_move = None
-    if not _fill_simple(board):
-        # Unwinnable board
-        return None
-    for row, col in _find_empty_spots(board):
-        remaining = board.valid_moves(row, col)
-        # Spots with fewer than 2 options are handled by _fill_simple,
-        # so pick any of the most constrained remaining positions
-        if len(remaining) < smallest_move:
-            smallest_move = len(remaining)
-            next_move = Move(row, col, remaining)
-    # Check for won position; board must be valid because moves were
-    #   chosen only from valid moves
-    if not next_move:
-        # Pass up the winning board
-        return board
-    for option in next_move.options:
-        board_copy = copy.deepcopy(board)
-        board_copy.board[next_move.row][next_move.col] = option
-        # fill_board will attempt to fill the board passed to it.
-        # If it's not successful, it will contain moves that don't lead to
-        #   a valid solution, with no path to undoing them, so make a copy.
-        end_result = fill_board(board_copy)
-        # end_result will be None unless it is fully complete.
-        if end_result:
-            # Pass up the winning board
-            return end_result
-    return None
\ No newline at end of file
+        A solved copy of the board if the board is solvable, None otherwise.
+
+    Raises:
+        SearchLimitExceeded: The search used up budget before finishing.
+    """
+    return search(board, 1, engine, budget, stats, tie_break).solution
+
+# Recursive move searcher
+def _search(propagator, limit, record, budget=None, stats=None, depth=0):
+    """Counts solutions reachable from the propagator's board, stopping at limit.
+
+    Propagation fills in every position the rules can deduce, then the
+    search tries each candidate of the most constrained empty position.
+    Each solved board is passed to record before the search goes on,
+    so record must copy the board if it keeps it.
+    All moves are undone before returning, unless budget runs out.
+    Node, guess, and propagation counts are added to stats, if given.
+    """
+    if budget is not None:
+        budget.spend()
+    if stats is not None:
+        stats.nodes += 1
+        stats.max_depth = max(stats.max_depth, depth)
+        started = time.time()
+    mark = propagator.mark()
+    solutions = 0
+    consistent = propagator.propagate()
+    if stats is not None:
+        stats.phase_times['propagate'] += time.time() - started
+    if consistent:
+        cell = propagator.most_constrained()
+        if cell is None:
+            # Check for won position; board must be valid because moves
+            #   were chosen only from valid moves
+            record(propagator.board)
+            solutions = 1
+        else:
+            for option in propagator.mask_digits[propagator.candidates[cell]]:
+                branch = propagator.mark()
+                found = 0
+                if propagator.assign(cell, option):
+                    found = _search(propagator, limit - solutions, record,
+                                    budget, stats, depth + 1)
+                    solutions += found
+                if stats is not None:
+                    stats.guessed += 1
+                    if not found:
+                        stats.backtracks += 1
+                # Take back this option and everything it led to
+                propagator.undo(branch)
+                if solutions >= limit:
+                    break
+    propagator.undo(mark)
+    return solutions
@@ -0,0 +1,154 @@
+import json
+from nose.tools import assert_equals
+import app
+
+PUZZLE = "000090052010000304002315009008746030070901020090253700400538200203000060150060000"
+SOLUTION = "736894152915627384842315679528746931374981526691253748469538217283179465157462893"
+
+def _post(data, content_type, workers=None):
+    url = '/api/solve'
+    if workers is not None:
+        url += '?workers={}'.format(workers)
+    client = app.app.test_client()
+    return client.post(url, data=data, content_type=content_type)
+
+def _lines(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+def test_api_solve_json_array():
+    response = _post(json.dumps([PUZZLE, "11", "abc", 7]), 'application/json')
+    assert_equals(response.status_code, 200)
+    assert_equals(response.mimetype, 'application/x-ndjson')
+    results = _lines(response)
+    assert_equals([r['index'] for r in results], [0, 1, 2, 3])
+    assert_equals(results[0]['status'], 'solved')
+    assert_equals(results[0]['solution'], SOLUTION)
+    assert_equals([r.get('code') for r in results[1:]],
+                  ['duplicate_values', 'invalid_puzzle', 'invalid_puzzle'])
+
+def test_api_solve_ndjson():
+    body = '"{}"\n\n"{}"\nnot json\n'.format(PUZZLE, "0" * 81)
+    results = _lines(_post(body, 'application/x-ndjson'))
+    assert_equals([r['index'] for r in results], [0, 1, 2])
+    assert_equals([r.get('code') for r in results],
+                  [None, 'multiple_solutions', 'invalid_json'])
+
+def test_api_solve_workers_unordered():
+    body = "\n".join(json.dumps(puzzle) for puzzle in [PUZZLE, "x", PUZZLE])
+    results = _lines(_post(body, 'application/x-ndjson', workers=2))
+    results.sort(key=lambda result: result['index'])
+    assert_equals([r['status'] for r in results], ['solved', 'error', 'solved'])
+
+def test_api_solve_workers_use_dispatcher():
+    app.dispatcher = app.dispatch.Dispatcher(2, 8)
+    puzzles = [PUZZLE[::-1], "x", PUZZLE[::-1], "0" * 81]
+    try:
+        body = "\n".join(json.dumps(puzzle) for puzzle in puzzles)
+        results = _lines(_post(body, 'application/x-ndjson', workers=2))
+        stats = app.dispatcher.stats()
+    finally:
+        app.dispatcher.close()
+        app.dispatcher = None
+    results.sort(key=lambda result: result['index'])
+    assert_equals([r.get('code') for r in results],
+                  [None, 'invalid_puzzle', None, 'multiple_solutions'])
+    assert_equals(stats['pending'], 0)
+
+def test_api_solve_rejects_non_array():
+    response = _post(json.dumps({"puzzle": PUZZLE}), 'application/json')
+    assert_equals(response.status_code, 400)
+    assert 'error' in json.loads(response.get_data(as_text=True))
+
+def test_index_reports_search_limit():
+    app.app.config['SOLVER_MAX_NODES'] = 1
+    try:
+        response = app.app.test_client().get('/?puzzle=123')
+    finally:
+        app.app.config['SOLVER_MAX_NODES'] = None
+    assert app.solver.TOO_HARD in response.get_data(as_text=True)
+    assert_equals(app.solution_cache.get(app.canonical.canonicalize("123" + "0" * 78)[0]), None)
+
+def test_stats_include_solver_totals():
+    app.app.test_client().get('/?puzzle=' + PUZZLE[::-1])
+    stats = json.loads(app.app.test_client().get('/stats').get_data(as_text=True))
+    assert stats['solver']['searches'] >= 1
+    assert 'propagate' in stats['solver']['phase_times']
+    assert stats['solver']['rules']['naked_single'] >= 1
+
+def test_api_solve_larger_board():
+    empty = "0" * 256
+    results = _lines(_post(json.dumps([empty, "g" + "0" * 255, "H" + "0" * 255]),
+                           'application/json'))
+    assert_equals([r.get('code') for r in results],
+                  ['multiple_solutions', 'multiple_solutions', 'invalid_puzzle'])
+    assert_equals(results[1]['puzzle'], "G" + "0" * 255)
+
+def test_full_dispatcher_gives_503():
+    app.dispatcher = app.dispatch.Dispatcher(1, 0)
+    try:
+        response = app.app.test_client().get('/?puzzle=' + PUZZLE[1:] + "0")
+        results = _lines(_post(json.dumps([PUZZLE[2:]]), 'application/json'))
+    finally:
+        app.dispatcher = None
+    assert_equals(response.status_code, 503)
+    assert_equals(results[0]['code'], 'busy')
+
+def test_api_solve_workers_respect_dispatcher_queue():
+    app.dispatcher = app.dispatch.Dispatcher(1, 0)
+    try:
+        body = json.dumps([PUZZLE[3:] + "000", PUZZLE[4:] + "0000"])
+        results = _lines(_post(body, 'application/json', workers=2))
+    finally:
+        app.dispatcher = None
+    assert_equals([r['code'] for r in results], ['busy', 'busy'])
+
+def test_build_puzzle_string():
+    args = {"00": "5", "01": "0", "02": "", "88": "9"}
+    assert_equals(app.build_puzzle_string(args), ("5" + "0" * 79 + "9", ""))
+    args.update({"10": "x", "11": "12"})
+    puzzle, error = app.build_puzzle_string(args)
+    assert_equals(puzzle, "5" + "0" * 79 + "9")
+    assert_equals(error, "12 is not a number in the range 0-9. ")
+
+def test_normalize_puzzle_string():
+    assert_equals(app.normalize_puzzle_string(u"12"), ("12" + "0" * 79, ""))
+    for puzzle in (u"1\u0663", "1x", "1 "):
+        assert_equals(app.normalize_puzzle_string(puzzle),
+                      (puzzle, "That string contains non-numeric characters. "))
+    assert_equals(app.normalize_puzzle_string("1" * 82)[1],
+                  "Puzzle strings must contain no more than 81 characters. ")
+
+def _fail(*args, **kwargs):
+    raise AssertionError("A cached page was solved or rendered again")
+
+def test_puzzle_page_caching_headers():
+    puzzle = PUZZLE[3:] + "000"
+    client = app.app.test_client()
+    response = client.get('/?puzzle=' + puzzle)
+    etag = response.headers['ETag'].strip('"')
+    assert_equals(etag, app.page_etag(puzzle, ""))
+    assert 'public' in response.headers['Cache-Control']
+    assert 'max-age=86400' in response.headers['Cache-Control']
+    cells = "&".join("{}={}".format(name, puzzle[i])
+                     for i, name in enumerate(app.CELL_ARGS))
+    solve, render = app.solve_puzzle_string, app.render_template
+    app.solve_puzzle_string = app.render_template = _fail
+    try:
+        conditional = client.get('/?puzzle=' + puzzle,
+                                 headers={'If-None-Match': '"{}"'.format(etag)})
+        repeat = client.get('/?' + cells)
+    finally:
+        app.solve_puzzle_string, app.render_template = solve, render
+    assert_equals(conditional.status_code, 304)
+    assert_equals(conditional.get_data(), "")
+    assert_equals(repeat.status_code, 200)
+    assert_equals(repeat.get_data(), response.get_data())
+
+def test_search_limit_page_is_not_cached():
+    app.app.config['SOLVER_MAX_NODES'] = 1
+    try:
+        response = app.app.test_client().get('/?puzzle=' + "0" * 80 + "1")
+    finally:
+        app.app.config['SOLVER_MAX_NODES'] = None
+    assert_equals(response.headers.get('ETag'), None)
+    assert 'no-store' in response.headers['Cache-Control']
@@ -0,0 +1,37 @@
+from nose.tools import assert_equals
+from parameterized import parameterized
+from board import Board
+from batch import solve_many
+import solver
+
+@parameterized([
+    # Easy: singles alone solve it
+    ("000090052010000304002315009008746030070901020090253700400538200203000060150060000",),
+    # "World's Hardest Sudoku": needs a search
+    ("100007090030020008009600500005300900010080002600004000300000010040000007007000300",),
+    # More than one solution
+    ("0" * 81,),
+    # Duplicate values
+    ("11" + "0" * 79,),
+    # No solution: the second cell of the first row has no moves left
+    ("307694152519070384862315009008746030070901020090253700400538200203000060150060000",),
+    # Malformed
+    ("123",),
+])
+def test_solve_many_matches_solve(puzzle):
+    try:
+        expected = (solver.solve(Board.from_string(puzzle)).to_puzzle_string(), None)
+    except ValueError as e:
+        expected = (None, str(e))
+    assert_equals(tuple(solve_many([puzzle])[0]), expected)
+
+def test_solve_many_keeps_order():
+    puzzles = ["11" + "0" * 79,
+               "000090052010000304002315009008746030070901020090253700400538200203000060150060000",
+               "0" * 81]
+    results = solve_many(puzzles)
+    assert_equals(len(results), 3)
+    assert_equals(results[0].error, solver.DUPLICATE_VALUES)
+    assert_equals(results[1].solution,
+                  "736894152915627384842315679528746931374981526691253748469538217283179465157462893")
+    assert_equals(results[2].error, solver.MULTIPLE_SOLUTIONS)
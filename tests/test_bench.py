@@ -0,0 +1,42 @@
+from nose.tools import assert_equals
+from parameterized import parameterized
+from bench import suite
+from board import Board
+import generator
+import solver
+
+@parameterized([('easy',), ('medium',), ('hard',), ('hardest',)])
+def test_corpus_puzzles_have_unique_solutions(name):
+    for puzzle in suite.load_corpus(name):
+        board = Board.from_string(puzzle)
+        assert solver.solve(board)
+        # Propagation changes can make a puzzle easier than its corpus says
+        if name in generator.DIFFICULTIES:
+            assert_equals((puzzle, generator.grade(board)), (puzzle, name))
+
+def test_invalid_corpus_is_rejected():
+    errors = []
+    for puzzle in suite.load_corpus('invalid'):
+        try:
+            solver.solve(Board.from_string(puzzle))
+        except ValueError as e:
+            errors.append(str(e))
+    assert_equals(sorted(set(errors)), sorted([
+        solver.DUPLICATE_VALUES, solver.NO_SOLUTION, solver.MULTIPLE_SOLUTIONS]))
+    assert_equals(len(errors), len(suite.load_corpus('invalid')))
+
+def test_percentile():
+    ordered = range(1, 101)
+    assert_equals([suite.percentile(ordered, p) for p in (50, 90, 99)], [50, 90, 99])
+    assert_equals(suite.percentile([7], 99), 7)
+
+def test_compare_flags_regressions():
+    baseline = {'results': {'easy': {'solve': {'p50_ms': 1.0, 'per_second': 100.0},
+                                     'peak_rss_kb': 100}}}
+    report = {'results': {'easy': {'solve': {'p50_ms': 1.05, 'per_second': 50.0},
+                                   'peak_rss_kb': 200}}}
+    regressions = suite.compare(report, baseline, 0.1)
+    assert_equals(len(regressions), 2)
+    assert 'peak_rss_kb' in regressions[0]
+    assert 'per_second' in regressions[1]
+    assert_equals(suite.compare(baseline, baseline), [])
@@ -0,0 +1,108 @@
+from nose.tools import assert_equals
+from board import Board
+from board import MASK_DIGITS
+from board import CELL_UNITS, PEERS, UNITS
+from board import Board16, Board25, board_from_string, decode_board_string
+
+def _sample_board():
+    return Board([
+                   [0, 0, 0, 0, 9, 0, 0, 5, 2],
+                   [0, 1, 0, 0, 0, 0, 3, 0, 4],
+                   [0, 0, 2, 3, 1, 5, 0, 0, 9],
+                   [0, 0, 8, 7, 4, 6, 0, 3, 0],
+                   [0, 7, 0, 9, 0, 1, 0, 2, 0],
+                   [0, 9, 0, 2, 5, 3, 7, 0, 0],
+                   [4, 0, 0, 5, 3, 8, 2, 0, 0],
+                   [2, 0, 3, 0, 0, 0, 0, 6, 0],
+                   [1, 5, 0, 0, 6, 0, 0, 0, 0]
+                  ])
+
+def test_valid_moves_uses_masks():
+    b = _sample_board()
+    assert_equals(b.valid_moves(0, 0), set([3, 6, 7, 8]))
+    assert_equals(set(MASK_DIGITS[b.candidate_mask(0, 0)]), set([3, 6, 7, 8]))
+
+def test_place_and_clear_update_masks():
+    b = _sample_board()
+    b.place(0, 0, 7)
+    assert_equals(b.board[0][0], 7)
+    assert 7 not in b.valid_moves(0, 1)
+    assert 7 not in b.valid_moves(1, 0)
+    assert 7 not in b.valid_moves(2, 1)
+    b.clear(0, 0)
+    assert_equals(b.board[0][0], 0)
+    assert_equals(b.valid_moves(0, 0), set([3, 6, 7, 8]))
+
+def test_from_string_round_trip():
+    puzzle = "000090052010000304002315009008746030070901020090253700400538200203000060150060000"
+    b = Board.from_string(puzzle)
+    assert_equals(b.to_puzzle_string(), puzzle)
+    assert_equals(b.board, Board.string_to_array(puzzle))
+    assert_equals(b.valid_moves(0, 0), _sample_board().valid_moves(0, 0))
+    assert_equals(b[4], 9)
+
+def test_from_string_invalid():
+    for puzzle in ("0" * 80, "0" * 82, "a" + "0" * 80, u"\u0663" + "0" * 80):
+        try:
+            Board.from_string(puzzle)
+        except ValueError:
+            continue
+        raise AssertionError("{} was accepted".format(puzzle))
+
+def test_decode_checks_duplicates():
+    puzzle = "000090052010000304002315009008746030070901020090253700400538200203000060150060000"
+    for bad, valid in ((puzzle, True), ("11" + puzzle[2:], False),
+                       ("1" + "0" * 8 + "1" + puzzle[10:], False), (puzzle[:-1] + "2", False)):
+        b, is_valid = Board.decode(bad)
+        assert_equals(is_valid, valid)
+        assert_equals(b._is_valid_board(), valid)
+        assert_equals(b.to_puzzle_string(), bad)
+    b, is_valid = decode_board_string("G" + "0" * 255)
+    assert_equals((type(b), is_valid), (Board16, True))
+
+def test_copy_is_independent():
+    b = _sample_board()
+    board_copy = b.copy()
+    board_copy.place(0, 0, 7)
+    assert_equals(b.board[0][0], 0)
+    assert_equals(b.valid_moves(0, 0), set([3, 6, 7, 8]))
+    assert_equals(board_copy.board[0][0], 7)
+
+def test_lookup_tables():
+    assert_equals(len(UNITS), 27)
+    assert_equals(UNITS[0], tuple(range(9)))
+    assert_equals(UNITS[9], tuple(range(0, 81, 9)))
+    assert_equals(UNITS[22], (30, 31, 32, 39, 40, 41, 48, 49, 50))
+    assert_equals(CELL_UNITS[40], (4, 13, 22))
+    for cell in xrange(81):
+        assert_equals(len(PEERS[cell]), 20)
+        assert cell not in PEERS[cell]
+
+def test_board16_strings_and_masks():
+    puzzle = "1" + "0" * 14 + "g" + "0" * 240
+    b = board_from_string(puzzle)
+    assert isinstance(b, Board16)
+    assert_equals(b.to_puzzle_string(), puzzle.upper())
+    assert_equals(b.board[0][15], 16)
+    assert_equals(Board16.string_to_array(puzzle)[0][:2], [1, 0])
+    assert_equals(b.valid_moves(0, 1), set(range(2, 16)))
+    b.place(1, 0, 10)
+    assert 10 not in b.valid_moves(0, 1)
+    assert_equals(b.copy().board, b.board)
+    assert_equals(Board16.geometry.peers[0], tuple(sorted(
+        set(range(1, 16)) | set(range(16, 256, 16)) | set([17, 18, 19, 33, 34, 35, 49, 50, 51]))))
+
+def test_larger_board_strings_invalid():
+    for puzzle in ("H" + "0" * 255, "0" * 255, "Q" + "0" * 624):
+        try:
+            board_from_string(puzzle)
+        except ValueError:
+            continue
+        raise AssertionError("{} was accepted".format(puzzle))
+
+def test_board25_geometry():
+    geometry = Board25.geometry
+    assert_equals((geometry.size, geometry.cells, len(geometry.units)), (25, 625, 75))
+    assert_equals(len(geometry.peers[0]), 64)
+    assert_equals(geometry.mask_digits[(1 << 25) | (1 << 3)], (3, 25))
+    assert_equals(Board25.from_string("P" + "0" * 624)[0], 25)
@@ -0,0 +1,42 @@
+from nose.tools import assert_equals
+import bulk
+import solver
+
+LINES = [
+    "000090052010000304002315009008746030070901020090253700400538200203000060150060000\n",
+    "\n",
+    "11" + "0" * 79 + "\n",
+    "406000000000900801800075020005060008260090034900020700010250007609003000000000103\n",
+    "abc\n",
+]
+
+def test_read_puzzles_skips_blank_lines():
+    indexes = [index for index, _ in bulk.read_puzzles(LINES)]
+    assert_equals(indexes, [1, 3, 4, 5])
+
+def test_solve_stream_in_process():
+    results = list(bulk.solve_stream(bulk.read_puzzles(LINES)))
+    assert_equals([r.index for r in results], [1, 3, 4, 5])
+    assert_equals(results[0].solution,
+                  "736894152915627384842315679528746931374981526691253748469538217283179465157462893")
+    assert_equals(results[1].error, solver.DUPLICATE_VALUES)
+    assert_equals(results[3].error, "Board string must be 81 characters")
+
+def test_solve_stream_pool_matches_in_process():
+    expected = list(bulk.solve_stream(bulk.read_puzzles(LINES)))
+    ordered = list(bulk.solve_stream(bulk.read_puzzles(LINES), workers=2))
+    assert_equals(ordered, expected)
+    unordered = bulk.solve_stream(bulk.read_puzzles(LINES), workers=2,
+                                  chunk_size=2, ordered=False)
+    assert_equals(sorted(unordered), expected)
+
+def test_solve_stream_tie_break():
+    expected = list(bulk.solve_stream(bulk.read_puzzles(LINES)))
+    results = bulk.solve_stream(bulk.read_puzzles(LINES), workers=2,
+                                tie_break='degree')
+    assert_equals(list(results), expected)
+
+def test_format_result():
+    result = bulk.BulkResult(3, "11", None, solver.DUPLICATE_VALUES)
+    assert_equals(bulk.format_result(result),
+                  "3\t11\terror\tThat board has duplicate values.")
@@ -0,0 +1,85 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from nose.tools import assert_equals
+from cache import SolutionCache
+
+SOLVED = ("736894152", None)
+FAILED = (None, "That board has duplicate values.")
+
+def test_get_and_put():
+    cache = SolutionCache(2)
+    assert_equals(cache.get("a"), None)
+    cache.put("a", SOLVED)
+    cache.put("b", FAILED)
+    assert_equals(cache.get("a"), SOLVED)
+    assert_equals(cache.get("b"), FAILED)
+    stats = cache.stats()
+    assert_equals((stats['hits'], stats['misses'], stats['size']), (2, 1, 2))
+
+def test_evicts_least_recently_used():
+    cache = SolutionCache(2)
+    cache.put("a", SOLVED)
+    cache.put("b", SOLVED)
+    cache.get("a")
+    cache.put("c", SOLVED)
+    assert_equals(cache.get("b"), None)
+    assert_equals(cache.get("a"), SOLVED)
+    assert_equals(cache.stats()['evictions'], 1)
+
+def test_expires_after_ttl():
+    cache = SolutionCache(2, ttl=0.01)
+    cache.put("a", SOLVED)
+    time.sleep(0.05)
+    assert_equals(cache.get("a"), None)
+    assert_equals(cache.stats()['expirations'], 1)
+
+def test_zero_size_disables_cache():
+    cache = SolutionCache(0)
+    cache.put("a", SOLVED)
+    assert_equals(cache.get("a"), None)
+
+def test_backing_store_survives_restart():
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, "solutions.db")
+        SolutionCache(2, path=path).put("a", FAILED)
+        restarted = SolutionCache(2, path=path)
+        assert_equals(restarted.get("a"), FAILED)
+        assert_equals(restarted.stats()['hits'], 1)
+    finally:
+        shutil.rmtree(directory)
+
+def _rows(path):
+    db = sqlite3.connect(path)
+    try:
+        return [row[0] for row in db.execute("SELECT puzzle FROM solutions ORDER BY puzzle")]
+    finally:
+        db.close()
+
+def test_backing_store_keeps_max_size():
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, "solutions.db")
+        cache = SolutionCache(2, path=path)
+        for puzzle in "abc":
+            cache.put(puzzle, SOLVED)
+            time.sleep(0.01)
+        assert_equals(_rows(path), ["b", "c"])
+    finally:
+        shutil.rmtree(directory)
+
+def test_backing_store_drops_expired_rows():
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, "solutions.db")
+        SolutionCache(2, ttl=0.01, path=path).put("a", SOLVED)
+        time.sleep(0.05)
+        restarted = SolutionCache(2, ttl=0.01, path=path)
+        assert_equals(restarted.get("a"), None)
+        assert_equals(restarted.stats()['expirations'], 1)
+        assert_equals(_rows(path), [])
+    finally:
+        shutil.rmtree(directory)
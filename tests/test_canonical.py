@@ -0,0 +1,47 @@
+from nose.tools import assert_equals
+from parameterized import parameterized
+import canonical
+from canonical import Transform
+
+PUZZLE = "890034000000008200400200009030000025007060400510000060100003004009700000000610072"
+SOLUTION = "892134756763958241451276389638497125927561438514382967176823594289745613345619872"
+
+def _transform(transpose, rows, cols, digits):
+    cells = [(col * 9 + row if transpose else row * 9 + col)
+             for row in rows for col in cols]
+    return Transform(tuple(cells), tuple([0] + digits))
+
+SYMMETRIES = [
+    # Transposed
+    _transform(True, range(9), range(9), range(1, 10)),
+    # Bands and rows within bands swapped, digits relabeled
+    _transform(False, [7, 6, 8, 0, 2, 1, 3, 4, 5], range(9),
+               [5, 3, 9, 1, 2, 8, 7, 6, 4]),
+    # Rotated 90 degrees
+    _transform(True, range(8, -1, -1), range(9), range(1, 10)),
+    # Stacks and columns within stacks swapped, then transposed
+    _transform(True, range(9), [4, 5, 3, 8, 6, 7, 1, 0, 2],
+               [2, 1, 4, 3, 6, 5, 8, 7, 9]),
+]
+
+def test_canonical_form_round_trip():
+    form, transform = canonical.canonicalize(PUZZLE)
+    assert_equals(canonical.apply(transform, PUZZLE), form)
+    assert_equals(canonical.invert(transform, form), PUZZLE)
+
+@parameterized([(symmetry,) for symmetry in SYMMETRIES])
+def test_equivalent_puzzles_share_canonical_form(symmetry):
+    equivalent = canonical.apply(symmetry, PUZZLE)
+    assert equivalent != PUZZLE
+    assert_equals(canonical.canonicalize(equivalent)[0],
+                  canonical.canonicalize(PUZZLE)[0])
+
+@parameterized([(symmetry,) for symmetry in SYMMETRIES])
+def test_invert_maps_solution_back(symmetry):
+    # Solve the canonical form of an equivalent puzzle, as the cache would
+    equivalent = canonical.apply(symmetry, PUZZLE)
+    form, transform = canonical.canonicalize(equivalent)
+    _, to_form = canonical.canonicalize(PUZZLE)
+    form_solution = canonical.apply(to_form, SOLUTION)
+    assert_equals(canonical.invert(transform, form_solution),
+                  canonical.apply(symmetry, SOLUTION))
@@ -0,0 +1,55 @@
+from nose.tools import assert_equals
+from parameterized import parameterized
+import bulk
+import classify
+
+UNIQUE = "000090052010000304002315009008746030070901020090253700400538200203000060150060000"
+HARDEST = "100007090030020008009600500005300900010080002600004000300000010040000007007000300"
+
+LINES = [
+    UNIQUE,
+    "",
+    "11" + "0" * 79,
+    "0" * 81,
+    "12345678" + "0" * 9 + "9" + "0" * 63,
+    "abc",
+    "0" * 256,
+]
+
+@parameterized([
+    (UNIQUE, classify.UNIQUE),
+    ("11" + "0" * 79, classify.DUPLICATES),
+    ("1" + "0" * 8 + "1" + "0" * 71, classify.DUPLICATES),
+    ("0" * 81, classify.MULTIPLE_SOLUTIONS),
+    ("12345678" + "0" * 9 + "9" + "0" * 63, classify.NO_SOLUTION),
+    ("abc", classify.MALFORMED),
+    ("0" * 256, classify.MULTIPLE_SOLUTIONS),
+])
+def test_classify(puzzle, status):
+    assert_equals(classify.classify(puzzle)[0], status)
+
+def test_classify_search_limit():
+    status, detail = classify.classify(HARDEST, limits=(1, None))
+    assert_equals(status, classify.SEARCH_LIMIT)
+    assert detail
+
+def test_classify_stream_pool_matches_in_process():
+    expected = list(classify.classify_stream(bulk.read_puzzles(LINES)))
+    assert_equals([r.index for r in expected], [1, 3, 4, 5, 6, 7])
+    assert_equals([r.status for r in expected],
+                  [classify.UNIQUE, classify.DUPLICATES, classify.MULTIPLE_SOLUTIONS,
+                   classify.NO_SOLUTION, classify.MALFORMED, classify.MULTIPLE_SOLUTIONS])
+    pooled = classify.classify_stream(bulk.read_puzzles(LINES), workers=2,
+                                      chunk_size=2, ordered=False)
+    assert_equals(sorted(pooled), expected)
+
+def test_summary_and_format():
+    summary = classify.Summary()
+    results = list(classify.classify_stream(bulk.read_puzzles(LINES)))
+    for result in results:
+        summary.add(result)
+    assert_equals(summary.counts[classify.MULTIPLE_SOLUTIONS], 2)
+    assert "6 puzzles (1 malformed, 1 duplicates" in summary.report()
+    assert_equals(classify.format_result(results[0]), "1\t{}\tunique".format(UNIQUE))
+    assert_equals(classify.format_result(results[4]).split("\t")[:3],
+                  ["6", "abc", "malformed"])
@@ -0,0 +1,61 @@
+import threading
+import time
+from nose.tools import assert_equals, assert_raises
+import bulk
+import dispatch
+import solver
+
+PUZZLE = "000090052010000304002315009008746030070901020090253700400538200203000060150060000"
+SOLUTION = "736894152915627384842315679528746931374981526691253748469538217283179465157462893"
+
+class _HeldResult(object):
+    """An AsyncResult whose solve waits until released."""
+
+    def __init__(self, task, release):
+        self.task = task
+        self.release = release
+
+    def get(self):
+        self.release.wait()
+        return bulk.solve_item(self.task)
+
+class _HeldPool(object):
+    """A pool whose results are held until release is set."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.submitted = 0
+
+    def apply_async(self, func, args):
+        self.submitted += 1
+        return _HeldResult(args[0], self.release)
+
+def test_dispatcher_solves():
+    dispatcher = dispatch.Dispatcher(1, 4)
+    try:
+        assert_equals(dispatcher.solve(PUZZLE), (SOLUTION, None))
+        assert_equals(dispatcher.solve("0" * 81, (1, None)),
+                      (None, solver.TOO_HARD))
+    finally:
+        dispatcher.close()
+
+def test_dispatcher_merges_and_rejects():
+    dispatcher = dispatch.Dispatcher(1, 1)
+    pool = dispatcher._pool = _HeldPool()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(dispatcher.solve(PUZZLE)))
+               for _ in xrange(3)]
+    for thread in threads:
+        thread.start()
+    deadline = time.time() + 10
+    while dispatcher.stats()['merged'] < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    assert_equals(dispatcher.stats()['merged'], 2)
+    assert_raises(dispatch.Busy, dispatcher.solve, PUZZLE[::-1])
+    pool.release.set()
+    for thread in threads:
+        thread.join()
+    assert_equals(results, [(SOLUTION, None)] * 3)
+    assert_equals(pool.submitted, 1)
+    stats = dispatcher.stats()
+    assert_equals((stats['pending'], stats['rejected']), (0, 1))
@@ -0,0 +1,47 @@
+import os
+import random
+import subprocess
+import sys
+from nose.tools import assert_equals, assert_raises
+from parameterized import parameterized
+from board import Board
+import generator
+import solver
+
+def test_random_grid_is_full_and_valid():
+    board = generator.random_grid(random.Random(1))
+    assert 0 not in board.cells
+    assert board._is_valid_board()
+    assert generator.random_grid(random.Random(2)).cells != board.cells
+
+@parameterized([('easy',), ('medium',), ('hard',)])
+def test_generated_puzzles_are_unique_at_difficulty(difficulty):
+    for result in generator.generate(2, difficulty, seed=3):
+        board = Board.from_string(result.puzzle)
+        assert_equals(solver.solve(board).to_puzzle_string(), result.solution)
+        assert_equals(generator.grade(board), difficulty)
+        assert_equals(result.clues, 81 - result.puzzle.count("0"))
+
+def test_seeded_runs_repeat_across_workers():
+    in_process = list(generator.generate(3, 'easy', seed=7))
+    assert_equals([r.index for r in in_process], [0, 1, 2])
+    assert_equals(list(generator.generate(3, 'easy', workers=2, seed=7)), in_process)
+
+def test_seeded_runs_repeat_across_hash_seeds():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = ("import generator; "
+              "print next(generator.generate(1, 'easy', seed=42)).puzzle")
+    outputs = []
+    for hash_seed in ("0", "1"):
+        env = dict(os.environ, PYTHONHASHSEED=hash_seed)
+        outputs.append(subprocess.check_output([sys.executable, "-c", script],
+                                               cwd=root, env=env))
+    assert_equals(outputs[0], outputs[1])
+
+def test_grade_samples():
+    assert_equals(generator.grade(Board.from_string(
+        "100007090030020008009600500005300900010080002600004000300000010040000007007000300")),
+        'hard')
+
+def test_unknown_difficulty():
+    assert_raises(ValueError, list, generator.generate(1, 'impossible'))
@@ -0,0 +1,106 @@
+import json
+from nose.tools import assert_equals, assert_raises
+import app
+import hints
+import propagation
+
+PUZZLE = "000090052010000304002315009008746030070901020090253700400538200203000060150060000"
+SOLUTION = "736894152915627384842315679528746931374981526691253748469538217283179465157462893"
+
+def test_hints_solve_the_puzzle():
+    session = hints.HintSession(PUZZLE, SOLUTION)
+    seen = set()
+    while True:
+        hint = session.next_hint()
+        if hint is None:
+            break
+        seen.add(hint.technique)
+        assert hint.placements or hint.eliminations
+        for row, col, number in hint.placements:
+            assert_equals(SOLUTION[row * 9 + col], str(number))
+    assert session.solved()
+    assert 'naked_single' in seen or 'hidden_single' in seen
+
+def test_hint_reveals_when_rules_are_stuck():
+    session = hints.HintSession("0" * 81, "123456789" * 9)
+    hint = session.next_hint()
+    assert_equals(hint.technique, hints.REVEAL)
+    row, col, number = hint.placements[0]
+    assert_equals(str(number), "123456789"[col])
+
+def test_place_checks_the_move():
+    session = hints.HintSession(PUZZLE, SOLUTION)
+    assert_equals(session.place(0, 0, 7), True)
+    assert_equals(session.place(0, 1, 4), False)
+    assert_raises(ValueError, session.place, 0, 4, 1)
+    assert_raises(ValueError, session.place, 0, 2, 7)
+    assert_raises(ValueError, session.place, 0, 0, 6)
+    assert_equals(session.place(0, 1, 0), True)
+    assert_equals(session.board.cells[1], 0)
+    assert_equals(session.board.cells[0], 7)
+
+def test_wrong_move_is_found():
+    session = hints.HintSession(PUZZLE, SOLUTION)
+    session.place(0, 0, 8)
+    with assert_raises(ValueError):
+        while session.next_hint():
+            pass
+    assert_equals(session.wrong_cells()[0], (0, 0))
+
+def test_wrong_move_stops_hints_until_taken_back():
+    session = hints.HintSession(PUZZLE, SOLUTION)
+    session.place(0, 0, 8)
+    with assert_raises(ValueError):
+        while session.next_hint():
+            pass
+    assert_raises(ValueError, session.next_hint)
+    assert_raises(ValueError, session.next_hint)
+    assert session.board._is_valid_board()
+    for row, column in session.wrong_cells():
+        session.place(row, column, 0)
+    while session.next_hint():
+        pass
+    assert session.solved()
+
+def test_session_store_drops_oldest():
+    store = hints.SessionStore(max_size=2)
+    first, second = store.add("a"), store.add("b")
+    store.get(first)
+    store.add("c")
+    assert_equals(store.get(second), None)
+    assert_equals(store.get(first), "a")
+    assert store.remove(first)
+    assert_equals(len(store), 1)
+
+def test_api_hint_session():
+    client = app.app.test_client()
+    response = client.post('/api/hint', data=json.dumps({'puzzle': PUZZLE}),
+                           content_type='application/json')
+    session_id = json.loads(response.get_data(as_text=True))['session']
+    url = '/api/hint/' + session_id
+    result = json.loads(client.post(url + '/place', data=json.dumps(
+        {'row': 0, 'col': 0, 'number': 7}), content_type='application/json').get_data(as_text=True))
+    assert_equals(result['correct'], True)
+    assert result['board'].startswith("7")
+    result = json.loads(client.post(url + '/next').get_data(as_text=True))
+    assert result['hint']['technique'] in propagation.RULES
+    assert_equals(client.delete(url).status_code, 204)
+    assert_equals(client.post(url + '/next').status_code, 404)
+
+def test_api_hint_retry_after_wrong_move():
+    client = app.app.test_client()
+    response = client.post('/api/hint', data=json.dumps({'puzzle': PUZZLE}),
+                           content_type='application/json')
+    session_id = json.loads(response.get_data(as_text=True))['session']
+    url = '/api/hint/' + session_id
+    client.post(url + '/place', data=json.dumps({'row': 0, 'col': 0, 'number': 8}),
+                content_type='application/json')
+    codes = [client.post(url + '/next').status_code for _ in xrange(81)]
+    assert_equals(codes[-2:], [409, 409])
+    assert app.hint_sessions.get(session_id).board._is_valid_board()
+
+def test_api_hint_rejects_bad_puzzle():
+    response = app.app.test_client().post(
+        '/api/hint', data=json.dumps({'puzzle': "0" * 81}), content_type='application/json')
+    assert_equals(response.status_code, 400)
+    assert_equals(json.loads(response.get_data(as_text=True))['code'], 'multiple_solutions')
@@ -0,0 +1,39 @@
+from nose.tools import assert_equals, assert_raises
+from parameterized import parameterized
+from bench import SAMPLE_PUZZLES
+from board import Board
+import parallel
+import solver
+
+@parameterized(SAMPLE_PUZZLES)
+def test_solve_matches_solver(name, puzzle):
+    board = Board.from_string(puzzle)
+    expected = solver.solve(board).to_puzzle_string()
+    assert_equals(parallel.solve(board, workers=2).to_puzzle_string(), expected)
+    assert_equals(board.to_puzzle_string(), puzzle)
+
+def test_split_covers_every_solution():
+    board = Board.from_string("0" * 81)
+    subproblems, solved = parallel.split(board, 16)
+    assert len(subproblems) >= 16
+    assert_equals(solved, [])
+    assert_equals(len(set(subproblems)), len(subproblems))
+
+def test_multiple_solutions_stop_early():
+    board = Board.from_string("0" * 81)
+    assert_equals(parallel.count_solutions(board, workers=2), 2)
+    solution = parallel.fill_board(board, workers=2)
+    assert solution._is_valid_board()
+    assert_equals(solution.to_puzzle_string().count("0"), 0)
+    assert_raises(ValueError, parallel.solve, board, 2)
+
+def test_no_solution():
+    puzzle = "12345678" + "0" * 9 + "9" + "0" * 63
+    board = Board.from_string(puzzle)
+    assert_equals(parallel.count_solutions(board, workers=2), 0)
+    assert_equals(parallel.fill_board(board, workers=2), None)
+
+def test_search_limit():
+    board = Board.from_string(SAMPLE_PUZZLES[-1][1])
+    assert_raises(solver.SearchLimitExceeded, parallel.count_solutions,
+                  board, 2, None, (1, None))
@@ -0,0 +1,108 @@
+from nose.tools import assert_equals, assert_raises
+from parameterized import parameterized
+from board import Board
+from propagation import Propagator, TIE_BREAKS
+
+@parameterized([
+    # Easy: naked singles alone solve it
+    ("000090052010000304002315009008746030070901020090253700400538200203000060150060000",
+     "736894152915627384842315679528746931374981526691253748469538217283179465157462893"),
+    # Hard: needs hidden singles, pairs, and box/line intersections
+    ("890034000000008200400200009030000025007060400510000060100003004009700000000610072",
+     "892134756763958241451276389638497125927561438514382967176823594289745613345619872"),
+])
+def test_propagate_solves_without_branching(puzzle, solution):
+    b = Board(Board.string_to_array(puzzle))
+    propagator = Propagator(b)
+    assert propagator.propagate()
+    assert_equals(b.to_puzzle_string(), solution)
+    assert_equals(propagator.empty_cells(), [])
+
+def test_propagate_counts_rules():
+    b = Board(Board.string_to_array(
+        "890034000000008200400200009030000025007060400510000060100003004009700000000610072"))
+    propagator = Propagator(b)
+    propagator.propagate()
+    assert propagator.counts['naked_single'] > 0
+    assert propagator.counts['hidden_single'] > 0
+    assert propagator.counts['hidden_pair'] > 0
+
+def test_undo_restores_board_and_candidates():
+    puzzle = "100007090030020008009600500005300900010080002600004000300000010040000007007000300"
+    b = Board(Board.string_to_array(puzzle))
+    propagator = Propagator(b)
+    assert propagator.propagate()
+    mark = propagator.mark()
+    candidates = list(propagator.candidates)
+    cell = propagator.most_constrained()
+    propagator.assign(cell, b.valid_moves(*divmod(cell, 9)).pop())
+    propagator.propagate()
+    propagator.undo(mark)
+    assert_equals(propagator.candidates, candidates)
+    propagator.undo(0)
+    assert_equals(b.to_puzzle_string(), puzzle)
+
+def test_propagate_finds_contradiction():
+    # The second cell of the first row has no moves left
+    b = Board(Board.string_to_array(
+        "307694152519070384862315009008746030070901020090253700400538200203000060150060000"))
+    assert not Propagator(b).propagate()
+
+HARDEST = "100007090030020008009600500005300900010080002600004000300000010040000007007000300"
+
+def _check_buckets(propagator):
+    for count, bucket in enumerate(propagator._buckets):
+        for cell in bucket:
+            assert_equals(propagator.popcount[propagator.candidates[cell]], count)
+    assert_equals(sorted(set().union(*propagator._buckets)), propagator.empty_cells())
+
+def test_buckets_follow_changes_and_undo():
+    propagator = Propagator(Board.from_string(HARDEST))
+    _check_buckets(propagator)
+    assert propagator.propagate()
+    _check_buckets(propagator)
+    mark = propagator.mark()
+    cell = propagator.most_constrained()
+    propagator.assign(cell, propagator.mask_digits[propagator.candidates[cell]][0])
+    propagator.propagate()
+    _check_buckets(propagator)
+    propagator.undo(mark)
+    _check_buckets(propagator)
+    propagator.undo(0)
+    _check_buckets(propagator)
+
+@parameterized([(tie_break,) for tie_break in TIE_BREAKS])
+def test_most_constrained_tie_breaks(tie_break):
+    propagator = Propagator(Board.from_string(HARDEST), tie_break)
+    assert propagator.propagate()
+    cell = propagator.most_constrained()
+    fewest = min(propagator.popcount[propagator.candidates[empty]]
+                 for empty in propagator.empty_cells())
+    assert_equals(propagator.popcount[propagator.candidates[cell]], fewest)
+    if tie_break == 'first':
+        assert_equals(cell, min(propagator._buckets[fewest]))
+
+def test_most_constrained_solved_and_bad_tie_break():
+    solved = "736894152915627384842315679528746931374981526691253748469538217283179465157462893"
+    assert_equals(Propagator(Board.from_string(solved)).most_constrained(), None)
+    assert_raises(ValueError, Propagator, Board.from_string(solved), 'random')
+
+def test_propagate_reaches_rule_fixpoint():
+    # Needs a unit re-queued after a pointing elimination outside it
+    puzzle = "000000003010046000080070009040000500090010200000002307000020100005007000007908002"
+    propagator = Propagator(Board.from_string(puzzle))
+    assert propagator.propagate()
+    assert_equals(propagator.empty_cells(), [])
+
+@parameterized([
+    ("890034000000008200400200009030000025007060400510000060100003004009700000000610072",),
+    (HARDEST,),
+    ("0" * 81,),
+])
+def test_no_rule_makes_progress_after_propagate(puzzle):
+    propagator = Propagator(Board.from_string(puzzle))
+    assert propagator.propagate()
+    counts = propagator.counts.copy()
+    for unit in xrange(len(propagator._units)):
+        assert propagator._apply_unit_rules(unit)
+    assert_equals(propagator.counts, counts)
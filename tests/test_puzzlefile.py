@@ -0,0 +1,83 @@
+import os
+import shutil
+import tempfile
+from nose.tools import assert_equals, assert_raises
+import cli
+import puzzlefile
+
+PUZZLES = [
+    "000090052010000304002315009008746030070901020090253700400538200203000060150060000",
+    "406000000000900801800075020005060008260090034900020700010250007609003000000000103",
+    "123456789" * 9,
+]
+
+def _directory():
+    directory = tempfile.mkdtemp()
+    return directory, lambda name: os.path.join(directory, name)
+
+def test_pack_round_trip():
+    for puzzle in PUZZLES:
+        record = puzzlefile.pack_puzzle(puzzle)
+        assert_equals(len(record), puzzlefile.RECORD_SIZE)
+        assert_equals(puzzlefile.unpack_puzzle(record), puzzle)
+    assert_equals(puzzlefile.pack_puzzle("9" + "0" * 80)[0], "\x90")
+
+def test_pack_invalid():
+    for puzzle in ("0" * 80, "0" * 82, "a" + "0" * 80):
+        assert_raises(ValueError, puzzlefile.pack_puzzle, puzzle)
+
+def test_write_and_read():
+    directory, path = _directory()
+    try:
+        assert_equals(puzzlefile.write_puzzles(path("p.sdk"), iter(PUZZLES)), 3)
+        assert_equals(os.path.getsize(path("p.sdk")),
+                      puzzlefile.HEADER.size + 3 * puzzlefile.RECORD_SIZE)
+        assert puzzlefile.is_puzzle_file(path("p.sdk"))
+        with puzzlefile.PuzzleFile(path("p.sdk")) as puzzles:
+            assert_equals(len(puzzles), 3)
+            assert_equals(list(puzzles), PUZZLES)
+            assert_equals(puzzles[-1], PUZZLES[2])
+            assert_equals(puzzles[1], PUZZLES[1])
+            assert_equals(str(puzzles.record(0)), puzzlefile.pack_puzzle(PUZZLES[0]))
+            assert_raises(IndexError, lambda: puzzles[3])
+    finally:
+        shutil.rmtree(directory)
+
+def test_write_stops_at_invalid_puzzle():
+    directory, path = _directory()
+    try:
+        assert_raises(ValueError, puzzlefile.write_puzzles, path("p.sdk"),
+                      [PUZZLES[0], "x"])
+        with puzzlefile.PuzzleFile(path("p.sdk")) as puzzles:
+            assert_equals(list(puzzles), PUZZLES[:1])
+    finally:
+        shutil.rmtree(directory)
+
+def test_rejects_bad_files():
+    directory, path = _directory()
+    try:
+        puzzlefile.write_puzzles(path("p.sdk"), PUZZLES)
+        with open(path("p.sdk"), 'rb') as data:
+            content = data.read()
+        for name, data in (("text", PUZZLES[0] + "\n"), ("short", content[:-1]),
+                           ("empty", "")):
+            with open(path(name), 'wb') as output:
+                output.write(data)
+            assert_raises(ValueError, puzzlefile.PuzzleFile, path(name))
+    finally:
+        shutil.rmtree(directory)
+
+def test_cli_convert_round_trip():
+    directory, path = _directory()
+    try:
+        with open(path("p.txt"), 'w') as output:
+            output.write("\n".join(PUZZLES) + "\n\n")
+        assert_equals(cli.main(['convert', path("p.txt"), path("p.sdk")]), 0)
+        assert_equals(cli.main(['convert', path("p.sdk"), path("q.txt")]), 0)
+        with open(path("q.txt")) as lines:
+            assert_equals(lines.read().split(), PUZZLES)
+        with open(path("bad.txt"), 'w') as output:
+            output.write(PUZZLES[0] + "\nabc\n")
+        assert_equals(cli.main(['convert', path("bad.txt"), path("bad.sdk")]), 1)
+    finally:
+        shutil.rmtree(directory)
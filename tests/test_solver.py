@@ -2,8 +2,20 @@ import random
 from nose.tools import assert_equals
 from parameterized import parameterized
 from board import Board
+from board import Board16
+from board import board_from_string
 from solver import fill_board
+from solver import count_solutions
+from solver import find_solutions
+from solver import search
+from solver import solve
 from solver import _find_empty_spots
+from solver import SearchBudget
+from solver import SearchLimitExceeded
+from solver import SolveStats
+import propagation
+import solver
+from nose.tools import assert_raises
 import copy
 
 # These boards don't need to be accessible to more than one test,
@@ -192,4 +204,267 @@ def test_find_empty_spots_edge_rows():
                       [2, 8, 9, 7, 4, 5, 6, 1, 3],
                       [3, 4, 5, 6, 1, 9, 0, 7, 2]
                       ])
-    assert_equals(_find_empty_spots(b), [(0, 2), (8, 6)])
\ No newline at end of file
+    assert_equals(_find_empty_spots(b), [(0, 2), (8, 6)])
+
+def test_fill_board_failed_board_is_restored():
+    # A failed search undoes its moves instead of leaving them on the board
+    input_array = [
+                   [3, 0, 7, 6, 9, 4, 1, 5, 2],
+                   [5, 1, 9, 0, 7, 0, 3, 8, 4],
+                   [8, 6, 2, 3, 1, 5, 0, 0, 9],
+                   [0, 0, 8, 7, 4, 6, 0, 3, 0],
+                   [0, 7, 0, 9, 0, 1, 0, 2, 0],
+                   [0, 9, 0, 2, 5, 3, 7, 0, 0],
+                   [4, 0, 0, 5, 3, 8, 2, 0, 0],
+                   [2, 0, 3, 0, 0, 0, 0, 6, 0],
+                   [1, 5, 0, 0, 6, 0, 0, 0, 0]
+                  ]
+    b = Board(copy.deepcopy(input_array))
+    assert not fill_board(b)
+    assert_equals(b.board, input_array)
+
+@parameterized([
+    (board1, 1),
+    (board5, 1),
+    (Board([[0] * 9 for _ in xrange(9)]), 2),
+])
+def test_count_solutions_leaves_board_unchanged(start_board, expected):
+    board_copy = copy.deepcopy(start_board)
+    assert_equals(count_solutions(board_copy), expected)
+    assert_equals(board_copy.board, start_board.board)
+
+def test_search_returns_solution_and_count():
+    result = search(copy.deepcopy(board5), 2)
+    assert_equals(result.count, 1)
+    assert_equals(result.solution.board, board5_result.board)
+
+def test_find_solutions_up_to_limit():
+    empty = Board([[0] * 9 for _ in xrange(9)])
+    solutions = find_solutions(empty, 3)
+    assert_equals(len(solutions), 3)
+    assert_equals(len(set(s.to_puzzle_string() for s in solutions)), 3)
+    for s in solutions:
+        assert s._is_valid_board()
+        assert_equals(_find_empty_spots(s), [])
+    assert_equals(empty.to_puzzle_string(), "0" * 81)
+
+def test_solve_does_not_change_board():
+    board_copy = copy.deepcopy(board2)
+    assert_equals(solve(board_copy).board, board2_result.board)
+    assert_equals(board_copy.board, board2.board)
+
+def test_solve_string():
+    assert_equals(solver.solve_string(board2.to_puzzle_string()).board,
+                  board2_result.board)
+    for puzzle, message in (("11" + "0" * 79, solver.DUPLICATE_VALUES),
+                            ("0" * 81, solver.MULTIPLE_SOLUTIONS)):
+        with assert_raises(ValueError) as raised:
+            solver.solve_string(puzzle)
+        assert_equals(str(raised.exception), message)
+    assert_raises(ValueError, solver.solve_string, "x" * 81)
+
+@parameterized([
+    (board1,), (board2,), (board3,), (board4,), (board5,),
+    (board1_result,),
+    (Board([[0] * 9 for _ in xrange(9)]),),
+])
+def test_engines_agree(start_board):
+    backtrack = search(copy.deepcopy(start_board), 2, 'backtrack')
+    dancing_links = search(copy.deepcopy(start_board), 2, 'dlx')
+    assert_equals(dancing_links.count, backtrack.count)
+    if backtrack.count == 1:
+        assert_equals(dancing_links.solution.board, backtrack.solution.board)
+
+def test_dlx_failed_board():
+    b = Board([
+                   [3, 0, 7, 6, 9, 4, 1, 5, 2],
+                   [5, 1, 9, 0, 7, 0, 3, 8, 4],
+                   [8, 6, 2, 3, 1, 5, 0, 0, 9],
+                   [0, 0, 8, 7, 4, 6, 0, 3, 0],
+                   [0, 7, 0, 9, 0, 1, 0, 2, 0],
+                   [0, 9, 0, 2, 5, 3, 7, 0, 0],
+                   [4, 0, 0, 5, 3, 8, 2, 0, 0],
+                   [2, 0, 3, 0, 0, 0, 0, 6, 0],
+                   [1, 5, 0, 0, 6, 0, 0, 0, 0]
+                  ])
+    assert_equals(count_solutions(b, 'dlx'), 0)
+    assert not fill_board(b, 'dlx')
+
+@parameterized([
+    ('backtrack', SearchBudget(max_nodes=1)),
+    ('dlx', SearchBudget(max_nodes=1)),
+    ('backtrack', SearchBudget(timeout=-1)),
+    ('dlx', SearchBudget(timeout=-1)),
+])
+def test_budget_exceeded_restores_board(engine, budget):
+    board = Board([[0] * 9 for _ in xrange(9)])
+    board.place(0, 0, 5)
+    before = board.board
+    assert_raises(SearchLimitExceeded, count_solutions, board, engine, budget)
+    assert_equals(board.board, before)
+
+def test_budget_within_limit():
+    budget = SearchBudget(max_nodes=10000, timeout=60)
+    assert_equals(solve(copy.deepcopy(board2), budget=budget).board,
+                  board2_result.board)
+    assert budget.nodes > 0
+
+@parameterized([('backtrack',), ('dlx',)])
+def test_solve_stats(engine):
+    stats = SolveStats()
+    result = search(copy.deepcopy(board2), 2, engine, stats=stats)
+    assert result.stats is stats
+    assert_equals((stats.searches, stats.solutions), (1, 1))
+    assert stats.nodes >= 1
+    assert stats.guessed >= stats.backtracks
+    assert_equals(stats.candidate_calls, len(_find_empty_spots(board2)))
+    search(copy.deepcopy(board2), 2, engine, stats=stats)
+    assert_equals(stats.as_dict()['searches'], 2)
+
+def test_solve_stats_count_rules():
+    stats = SolveStats()
+    search(copy.deepcopy(board2), 2, stats=stats)
+    rules = stats.as_dict()['rules']
+    assert_equals(sorted(rules), sorted(propagation.RULES))
+    assert_equals(stats.propagated,
+                  rules['naked_single'] + rules['hidden_single'])
+    other = SolveStats()
+    other.add(stats)
+    other.add(stats)
+    assert_equals(other.rules['naked_single'], 2 * rules['naked_single'])
+
+@parameterized([(tie_break,) for tie_break in propagation.TIE_BREAKS])
+def test_tie_breaks_find_the_same_solution(tie_break):
+    stats = SolveStats()
+    result = search(copy.deepcopy(board2), 2, stats=stats, tie_break=tie_break)
+    assert_equals((result.solution.board, result.count),
+                  (board2_result.board, 1))
+    assert stats.nodes >= 1
+    assert_equals(count_solutions(Board([[0] * 9 for _ in xrange(9)]),
+                                  tie_break=tie_break), 2)
+
+def test_unknown_tie_break():
+    assert_raises(ValueError, search, copy.deepcopy(board2), 2,
+                  tie_break='random')
+
+def test_stats_hook_sees_each_search():
+    seen = []
+    solver.add_stats_hook(seen.append)
+    try:
+        count_solutions(Board([[0] * 9 for _ in xrange(9)]))
+        assert_raises(SearchLimitExceeded, solve, copy.deepcopy(board2),
+                      None, SearchBudget(max_nodes=0))
+    finally:
+        solver.remove_stats_hook(seen.append)
+    assert_equals([stats.solutions for stats in seen], [2, 0])
+    assert seen[0].guessed > 0
+
+# Larger boards, one row per line
+PUZZLE_16 = (
+    "0G80206000F91004"
+    "64000800005000EG"
+    "A0090054013E006B"
+    "00DEB0170A000053"
+    "1F0D9G7000C05640"
+    "00C04BA50620003F"
+    "5A23610F000G00B0"
+    "G900ED0CBF000100"
+    "D300000A08000500"
+    "B8F000E02G0D0001"
+    "95000FDG00703000"
+    "70G10400000F0020"
+    "00000000F300EBG0"
+    "2E00000000B86000"
+    "410F0600E0GA0090"
+    "0B9GF00300000000"
+)
+SOLUTION_16 = (
+    "3G852A6EDBF917C4"
+    "641B38FDC257A9EG"
+    "A279GC54813EFD6B"
+    "FCDEB917GA642853"
+    "1FBD9G72AEC35648"
+    "E7C84BA59621DG3F"
+    "5A23618F7D4GCEB9"
+    "G946ED3CBF8571A2"
+    "D3E472BA189CG5F6"
+    "B8FC53E62GAD9471"
+    "95A21FDG647B3C8E"
+    "76G1C49835EFBA2D"
+    "CD6A8749F312EBG5"
+    "2E37A5G149B86FDC"
+    "415FD62BECGA8397"
+    "8B9GFEC357D6421A"
+)
+PUZZLE_25 = (
+    "D03000BO0400P000HMC000I00"
+    "O00000000060M3N25B000E0D0"
+    "K600J9EN050LFD0G004O80B0A"
+    "7F500D2ILG04OC00K8E903000"
+    "P0BH0600K000910NFD00OC005"
+    "030ONE0G00H000LK0A0J7B80P"
+    "00I0A0CK480D0P0070600000N"
+    "0H0M05PLJ70NC0ABO0006IE02"
+    "6DPE0AO000030M00G050J0K0C"
+    "0087000B030JGE2P00ILD0000"
+    "J49000000M00000ID00G01A00"
+    "BKO0G0AC008620040000050P9"
+    "00MC0LJPHD0O0910200K0760B"
+    "I0N80005B0LP0H0690A02GDJ0"
+    "20HD6O3000000N40PJ00I000E"
+    "000G7B00AO0168FDN02E509CI"
+    "50EB08I0DN47HO0106900J00M"
+    "HC0KO0G90EN00237000008PB0"
+    "0MF0100400EI0B000GOHK0000"
+    "0060I00002DCA000L0000O004"
+    "39K0D0120CJM07GE80LA0050F"
+    "MIGJ0000E0F0D00560K004020"
+    "N0A00GM00L5H000O0204E9003"
+    "E0000I7000P2040000G0A0M80"
+    "000204065F3000000I1DN00O0"
+)
+SOLUTION_25 = (
+    "D239EJBO14AKP58LHMC6FNIG7"
+    "OALI8HF7CP6GM3N25BJ19E4DK"
+    "K6C1J9EN352LFD7GIP4O8MBHA"
+    "7F5NMD2ILGB4OCHAK8E9P316J"
+    "PGBH468MKAIE91JNFD37OC2L5"
+    "C32ONEDG9IHF46LK1AMJ7B85P"
+    "1JILA2CK48OD5PBH7E63MFG9N"
+    "GH4M95PLJ71NCKABOFD86IE32"
+    "6DPEBAO1FH738MI9GN52JLK4C"
+    "F587KMNB639JGE2P4CILDAO1H"
+    "J49PL76E2MKB3F5IDOHGC1AN8"
+    "BKOFGNACI1862JD4EL7M35HP9"
+    "AEMC5LJPHDGOI91823NK476FB"
+    "I7N83F45BKLPEHM691AC2GDJO"
+    "21HD6O38G9CA7N4FPJB5IKLME"
+    "4PJG7BL3AOM168FDNK2E5H9CI"
+    "5LEB28IFDN47HOK1C69PGJ3AM"
+    "HCDKO1G9MEN5J237A4FIL8PB6"
+    "8MFA1C54P6EILB9J3GOHK2N7D"
+    "9N63IKHJ72DCAGPML58B1OFE4"
+    "39K4DP12OCJMN7GE8HLAB65IF"
+    "MIGJP39AEBF8DLO567KNH4C21"
+    "NBA6FGMD8L5H1ICOJ2P4E97K3"
+    "EO15CI7HNJP2K463B9GFADM8L"
+    "L872H4K65F39BAECMI1DNPJOG"
+)
+
+@parameterized([
+    (PUZZLE_16, SOLUTION_16, 'backtrack'),
+    (PUZZLE_16, SOLUTION_16, 'dlx'),
+    (PUZZLE_25, SOLUTION_25, 'backtrack'),
+    (PUZZLE_25, SOLUTION_25, 'dlx'),
+])
+def test_solve_larger_boards(puzzle, solution, engine):
+    board = board_from_string(puzzle)
+    assert_equals(solve(board, engine).to_puzzle_string(), solution)
+    assert_equals(board.to_puzzle_string(), puzzle)
+
+def test_count_solutions_larger_board():
+    # Blanking the first row leaves it for the other rows to pin down
+    board = board_from_string("0" * 16 + SOLUTION_16[16:])
+    assert_equals(count_solutions(board), 1)
+    assert_equals(count_solutions(Board16.from_string("0" * 256)), 2)
+    assert_equals(len(_find_empty_spots(board)), 16)